@@ -0,0 +1,100 @@
+"""
+Throughput and latency of Workers.AIWorker per micro-batch size, against the
+in-process Kafka stand-in and the stub backend (no broker or model needed).
+
+Requests are published to Chat_message at --rate per second; latency is the time
+from publish until the reply shows up on ai_response:
+
+    cd backend/ChatAPI
+    python -m Benchmarks.AIWorkerBenchmark --requests 2000 --rate 400 --batch-sizes 1,4,16,32
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from datetime import datetime
+from Benchmarks.InProcessKafka import InProcessBroker, InProcessConsumer, InProcessProducer
+from Benchmarks.PostMessageBenchmark import Percentile
+from ChatShared.LogPipeline import LogPipeline
+from Workers.AIWorker import AIWorker, DecodeChatMessage
+from Workers.GenerationBackends import StubBackend
+
+
+async def _Publish(producer: InProcessProducer, requests: int, rate: float, users: int, sent_at: dict):
+    started = time.perf_counter()
+    for i in range(requests):
+        if rate > 0:
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        user = f"bench-{i % users}@example.com"
+        payload = {"id": i, "user": user, "message": f"benchmark question {i % 50}", "created_at": datetime.now().isoformat()}
+        sent_at[i] = time.perf_counter()
+        # Same double encoding as SendMessage
+        await producer.send_and_wait("Chat_message", value=json.dumps(payload), key=user.encode("utf-8"))
+
+async def _Collect(broker: InProcessBroker, requests: int, sent_at: dict) -> list[float]:
+    consumer = InProcessConsumer(
+        "ai_response", broker=broker, auto_offset_reset="earliest",
+        value_deserializer=lambda m: json.loads(m.decode("utf-8"))
+    )
+    await consumer.start()
+    latencies = []
+    while len(latencies) < requests:
+        batches = await consumer.getmany(timeout_ms=1000)
+        received = time.perf_counter()
+        for messages in batches.values():
+            latencies.extend(received - sent_at[msg.value["request_id"]] for msg in messages)
+    return latencies
+
+async def _RunOnce(args, batch_size: int):
+    broker = InProcessBroker(partitions=args.partitions)
+    logger = LogPipeline("AIWorkerBenchmark", log_dir=tempfile.gettempdir())
+    consumer = InProcessConsumer(
+        "Chat_message", broker=broker, group_id="ai_worker_group",
+        enable_auto_commit=False, auto_offset_reset="earliest", value_deserializer=DecodeChatMessage
+    )
+    producer = InProcessProducer(broker, value_serializer=lambda v: json.dumps(v).encode("utf-8"))
+    backend = StubBackend(batch_latency_ms=args.batch_latency_ms, item_cpu_ms=args.item_cpu_ms)
+    await consumer.start()
+    worker = AIWorker(consumer, producer, backend, logger, max_batch_size=batch_size, max_wait_ms=args.max_wait_ms, concurrency=args.concurrency)
+    worker_task = asyncio.create_task(worker.Run())
+
+    sent_at = {}
+    started = time.perf_counter()
+    collector = asyncio.create_task(_Collect(broker, args.requests, sent_at))
+    await _Publish(producer, args.requests, args.rate, args.users, sent_at)
+    latencies = await collector
+    elapsed = time.perf_counter() - started
+
+    worker_task.cancel()
+    await asyncio.gather(worker_task, return_exceptions=True)
+    stats = worker.Stats()
+    print(
+        f"batch<={batch_size:>3}: {args.requests / elapsed:8.1f} req/s  avg batch={stats['average_batch_size']:5.1f}  "
+        f"p50={Percentile(latencies, 50) * 1000:7.1f}ms p95={Percentile(latencies, 95) * 1000:7.1f}ms "
+        f"p99={Percentile(latencies, 99) * 1000:7.1f}ms"
+    )
+
+async def _Run(args):
+    for batch_size in (int(size) for size in args.batch_sizes.split(",")):
+        await _RunOnce(args, batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=400, help="requests per second; 0 publishes all at once")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--partitions", type=int, default=4)
+    parser.add_argument("--batch-sizes", default="1,4,16,32")
+    parser.add_argument("--max-wait-ms", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--batch-latency-ms", type=float, default=40, help="stub cost per batch")
+    parser.add_argument("--item-cpu-ms", type=float, default=2, help="stub CPU cost per request")
+    asyncio.run(_Run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+ChatHistory page reads from the Parquet archive against the same pages from
+the live table.
+
+Seeds synthetic history as Benchmarks.ChatHistoryBenchmark does (IDs from
+--id-offset, bench-* users), writes those rows to a fresh archive directory
+without deleting them, then walks --pages pages back for sampled users through
+the (USER_KEY, CREATED_AT, ID) keyset query and through ChatArchive.ReadUserPage:
+
+    cd backend/ChatAPI
+    python -m Benchmarks.ArchiveBenchmark --rows 1000000 --users 5000 --cleanup
+
+--sqlite runs on a throwaway SQLite database instead of the configured MySQL;
+it needs aiosqlite from requirements-dev.txt.
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import tempfile
+import time
+
+
+def _Report(label: str, latencies: list[float], rows: int):
+    ordered = sorted(latencies)
+    pick = lambda pct: ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))] * 1000
+    print(f"{label:>8}: {len(ordered)} pages, {rows} rows p50={pick(50):.2f}ms p95={pick(95):.2f}ms p99={pick(99):.2f}ms")
+
+async def _Run(args):
+    from sqlalchemy import delete, select
+    from Benchmarks.ChatHistoryBenchmark import _BenchUser, _PageQuery, _Seed
+    from Config.dbConnection import async_engine_chatbot
+    from Migrations.Migrate import RunMigrations
+    from Models.shared import customerChatMessages
+    from Services.ChatArchive import ChatArchive
+
+    c = customerChatMessages.c
+    archive_dir = tempfile.mkdtemp(prefix="chat-archive-bench-")
+    archive = ChatArchive(archive_dir)
+    try:
+        if args.sqlite:
+            await RunMigrations()
+        if args.rows:
+            await _Seed(args.rows, args.users, args.id_offset)
+
+        started = time.perf_counter()
+        last_id = args.id_offset - 1
+        async with async_engine_chatbot.connect() as conn:
+            while True:
+                rows = (await conn.execute(
+                    select(c.ID, c.USER, c.USER_KEY, c.MESSAGE, c.CREATED_AT, c.IS_BOT, c.RESPONSE_TO)
+                    .where(c.ID > last_id).order_by(c.ID).limit(args.chunk_rows)
+                )).fetchall()
+                if not rows:
+                    break
+                archive.Commit(archive.WriteChunk([dict(row._mapping) for row in rows]))
+                last_id = rows[-1].ID
+        stats = archive.Stats()
+        print(
+            f"archived {stats['rows']:,} rows into {stats['files']} files, {stats['bytes'] / 1024 / 1024:.1f} MiB "
+            f"({stats['bytes'] / max(1, stats['rows']):.0f} B/row) in {time.perf_counter() - started:.1f}s"
+        )
+
+        users = [_BenchUser(random.randrange(args.users)) for _ in range(args.samples)]
+        live, cold, live_rows, cold_rows = [], [], 0, 0
+        async with async_engine_chatbot.connect() as conn:
+            for user in users:
+                before = None
+                for _ in range(args.pages):
+                    started = time.perf_counter()
+                    rows = (await conn.execute(_PageQuery("keyset", user, before, args.page_size))).fetchall()
+                    live.append(time.perf_counter() - started)
+                    live_rows += len(rows)
+                    if len(rows) < args.page_size:
+                        break
+                    before = (rows[-1].CREATED_AT, rows[-1].ID)
+        for user in users:
+            before = None
+            for _ in range(args.pages):
+                started = time.perf_counter()
+                rows = archive.ReadUserPage(user.lower(), before, args.page_size)
+                cold.append(time.perf_counter() - started)
+                cold_rows += len(rows)
+                if len(rows) < args.page_size:
+                    break
+                before = (rows[0]["CREATED_AT"], rows[0]["ID"])
+        _Report("live", live, live_rows)
+        _Report("archive", cold, cold_rows)
+    finally:
+        shutil.rmtree(archive_dir, ignore_errors=True)
+        if args.cleanup:
+            async with async_engine_chatbot.begin() as conn:
+                await conn.execute(delete(customerChatMessages).where(c.ID >= args.id_offset))
+        await async_engine_chatbot.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows to seed; 0 reuses an earlier seed")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--samples", type=int, default=50, help="users sampled")
+    parser.add_argument("--pages", type=int, default=10, help="pages walked back per sampled user")
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--chunk-rows", type=int, default=50000, help="rows per archive file")
+    parser.add_argument("--id-offset", type=int, default=1_000_000_000)
+    parser.add_argument("--sqlite", action="store_true", help="use a throwaway SQLite database")
+    parser.add_argument("--cleanup", action="store_true")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        # Read by Config.dbConnection at import time
+        db_path = os.path.join(tempfile.gettempdir(), "chatapi-archive-bench.db")
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        os.environ["DB_CHATBOT_URL"] = f"sqlite+aiosqlite:///{db_path}"
+    asyncio.run(_Run(args))
+
+
+if __name__ == "__main__":
+    main()
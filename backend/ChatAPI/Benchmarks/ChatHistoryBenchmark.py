@@ -0,0 +1,106 @@
+"""
+Seeds CUSTOMER_CHAT_MESSAGES with synthetic history and reports per-page
+ChatHistory latency for the old LOWER(USER) filter and the (USER_KEY, CREATED_AT, ID)
+keyset scan.
+
+Seeded rows use IDs from --id-offset upward and bench-* users; --cleanup removes
+them afterwards:
+
+    cd backend/ChatAPI
+    python -m Benchmarks.ChatHistoryBenchmark --rows 2000000 --users 5000 --pages 20 --cleanup
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import and_, delete, desc, func, insert, or_, select
+from Config.dbConnection import async_engine_chatbot
+from Models.shared import customerChatMessages
+
+SEED_CHUNK = 5000
+
+
+def _BenchUser(i: int) -> str:
+    return f"Bench-{i}@Example.com"
+
+async def _Seed(rows: int, users: int, id_offset: int):
+    started_at = datetime.now() - timedelta(days=365)
+    for start in range(0, rows, SEED_CHUNK):
+        chunk = [
+            {
+                "ID": id_offset + n,
+                "USER": _BenchUser(n % users),
+                "MESSAGE": f"seeded message {n}",
+                "CREATED_AT": started_at + timedelta(seconds=n),
+                "IS_BOT": n % 2 == 1,
+                "RESPONSE_TO": None
+            }
+            for n in range(start, min(rows, start + SEED_CHUNK))
+        ]
+        async with async_engine_chatbot.begin() as conn:
+            await conn.execute(insert(customerChatMessages).values(chunk))
+        print(f"\rseeded {min(rows, start + SEED_CHUNK):,}/{rows:,}", end="", flush=True)
+    print()
+
+def _PageQuery(mode: str, user: str, before, page_size: int):
+    """before is the (CREATED_AT, ID) of the last row of the previous page, or None."""
+    c = customerChatMessages.c
+    stmt = select(c.ID, c.USER, c.MESSAGE, c.CREATED_AT, c.IS_BOT, c.RESPONSE_TO)
+    if mode == "legacy":
+        stmt = stmt.where(func.lower(c.USER) == user.lower())
+        if before:
+            stmt = stmt.where(c.ID < before[1])
+        return stmt.order_by(desc(c.ID)).limit(page_size)
+    stmt = stmt.where(c.USER_KEY == user.lower())
+    if before:
+        stmt = stmt.where(or_(c.CREATED_AT < before[0], and_(c.CREATED_AT == before[0], c.ID < before[1])))
+    return stmt.order_by(desc(c.CREATED_AT), desc(c.ID)).limit(page_size)
+
+async def _Measure(mode: str, users: int, samples: int, pages: int, page_size: int) -> list[float]:
+    latencies = []
+    async with async_engine_chatbot.connect() as conn:
+        for _ in range(samples):
+            user = _BenchUser(random.randrange(users))
+            before = None
+            for _ in range(pages):
+                started = time.perf_counter()
+                rows = (await conn.execute(_PageQuery(mode, user, before, page_size))).fetchall()
+                latencies.append(time.perf_counter() - started)
+                if len(rows) < page_size:
+                    break
+                before = (rows[-1].CREATED_AT, rows[-1].ID)
+    return latencies
+
+def _Report(mode: str, latencies: list[float]):
+    ordered = sorted(latencies)
+    pick = lambda pct: ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))] * 1000
+    print(f"{mode:>7}: {len(ordered)} pages p50={pick(50):.2f}ms p95={pick(95):.2f}ms p99={pick(99):.2f}ms")
+
+async def _Run(args):
+    if args.rows:
+        await _Seed(args.rows, args.users, args.id_offset)
+    try:
+        for mode in ("legacy", "keyset"):
+            _Report(mode, await _Measure(mode, args.users, args.samples, args.pages, args.page_size))
+    finally:
+        if args.cleanup:
+            async with async_engine_chatbot.begin() as conn:
+                await conn.execute(delete(customerChatMessages).where(customerChatMessages.c.ID >= args.id_offset))
+        await async_engine_chatbot.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows to seed; 0 reuses earlier seed")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--samples", type=int, default=50, help="users sampled per mode")
+    parser.add_argument("--pages", type=int, default=10, help="pages walked back per sampled user")
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--id-offset", type=int, default=1_000_000_000)
+    parser.add_argument("--cleanup", action="store_true")
+    asyncio.run(_Run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Per-turn cost of building Chat_message context for long conversations: the
+incremental ConversationContextBuilder against rebuilding the window from the
+history every turn. The rebuild stops at the window edge and skips the DB, so
+it is a lower bound for a worker that re-queries history per message.
+
+Every turn the incremental window is also checked against a brute-force suffix
+of the full history, so a wrong truncation fails the run. Runs in memory:
+
+    cd backend/ChatAPI
+    python -m Benchmarks.ConversationContextBenchmark --users 20 --turns 5000 --max-turns 20 --max-tokens 2000
+"""
+import argparse
+import asyncio
+import random
+import time
+from Benchmarks.PostMessageBenchmark import Percentile
+from Schemas.shared import CustomerChatMessageSchema
+from Services.ConversationContext import ConversationContextBuilder, EstimateTokens
+
+WORDS = "the a chat bot message reply question answer order account balance payment card transfer help please thanks".split()
+
+
+def _Message(rng: random.Random, message_id: int, user: str, is_bot: bool) -> CustomerChatMessageSchema:
+    # Mostly short turns with the odd very long one, so both limits get exercised
+    length = rng.choice([5, 10, 20, 40, 80, 400]) if is_bot else rng.choice([3, 8, 15, 30])
+    text = " ".join(rng.choice(WORDS) for _ in range(length)) + "."
+    return CustomerChatMessageSchema(id=message_id, user=user, message=text, is_bot=is_bot)
+
+def _ReferenceWindow(history: list, max_turns: int, max_tokens: int) -> list[dict]:
+    # Longest suffix of the full history within both limits, rebuilt from scratch
+    turns, tokens = [], 0
+    for message in reversed(history):
+        cost = EstimateTokens(message.message)
+        if len(turns) == max_turns or tokens + cost > max_tokens:
+            break
+        turns.append({"role": "assistant" if message.is_bot else "user", "content": message.message})
+        tokens += cost
+    return list(reversed(turns))
+
+async def _Run(args):
+    rng = random.Random(args.seed)
+    histories: dict[str, list] = {f"user-{u}": [] for u in range(args.users)}
+    loads = 0
+
+    async def loader(user_key: str, limit: int):
+        nonlocal loads
+        loads += 1
+        return histories[user_key][-limit:]
+
+    builder = ConversationContextBuilder(max_turns=args.max_turns, max_tokens=args.max_tokens, loader=loader)
+    incremental, rebuilt = [], []
+    next_id = 1
+    for turn in range(args.turns):
+        for user_key, history in histories.items():
+            started = time.perf_counter()
+            context = await builder.Build(user_key)
+            incremental.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            expected = _ReferenceWindow(history, args.max_turns, args.max_tokens)
+            rebuilt.append(time.perf_counter() - started)
+            if context != expected:
+                raise AssertionError(f"{user_key} turn {turn}: window of {len(context)} turns, expected {len(expected)}")
+
+            for is_bot in (False, True):
+                message = _Message(rng, next_id, user_key, is_bot)
+                next_id += 1
+                history.append(message)
+                builder.Append(user_key, message)
+
+    print(f"{args.users} users x {args.turns} turns, window <= {args.max_turns} turns / {args.max_tokens} tokens, {loads} DB loads")
+    for name, samples in (("incremental", incremental), ("rebuild", rebuilt)):
+        print(
+            f"{name:>11}: p50={Percentile(samples, 50) * 1e6:8.1f}us p99={Percentile(samples, 99) * 1e6:8.1f}us "
+            f"total={sum(samples):.2f}s"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=2000, help="user/bot exchanges per conversation")
+    parser.add_argument("--max-turns", type=int, default=20)
+    parser.add_argument("--max-tokens", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(_Run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
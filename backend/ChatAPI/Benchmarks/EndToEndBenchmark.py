@@ -0,0 +1,262 @@
+"""
+End-to-end load test of one chat session per simulated user:
+
+    /Auth/login -> websocket /initialize/{email} -> /Chat/PostMessage and wait
+    for the bot reply on the socket (x --messages) -> /Chat/ChatHistory
+
+Reports throughput, p50/p95/p99 per step and the end-to-end reply time (from
+sending PostMessage to the reply arriving on the socket). By default it starts
+Benchmarks.StandInStack (SQLite, in-process Kafka, fake ChatAuth, stub AI
+worker) in a subprocess; --url points it at a stack that is already running.
+
+Results are written as JSON; --compare prints the change against an earlier run:
+
+    cd backend/ChatAPI
+    python -m Benchmarks.EndToEndBenchmark --users 2000 --concurrency 200 --output before.json
+    python -m Benchmarks.EndToEndBenchmark --users 2000 --concurrency 200 --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+import httpx
+import websockets
+from Benchmarks.PostMessageBenchmark import Percentile
+
+STEPS = ("login", "ws_connect", "post_message", "reply", "chat_history")
+
+
+class _Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.requests = 0
+        self.users_completed = 0
+
+    def Record(self, step: str, seconds: float):
+        self.latencies[step].append(seconds)
+
+    def Fail(self, step: str, reason: str):
+        self.errors[f"{step}: {reason}"] += 1
+
+
+class _Session:
+    # One simulated user: logs in, keeps a socket open and matches bot replies to questions
+    def __init__(self, client: httpx.AsyncClient, ws_url: str, email: str, results: _Results, timeout: float):
+        self.client = client
+        self.ws_url = ws_url
+        self.email = email
+        self.results = results
+        self.timeout = timeout
+        self.headers = {}
+        self.replies = {}
+        self.arrived = {}
+
+    async def _Call(self, step: str, method: str, path: str, **kwargs):
+        self.results.requests += 1
+        started = time.perf_counter()
+        response = await self.client.request(method, path, headers=self.headers, **kwargs)
+        self.results.Record(step, time.perf_counter() - started)
+        body = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+        if response.status_code != 200 or body.get("Status") != "OK":
+            raise RuntimeError(f"HTTP {response.status_code} {body.get('Message') or body.get('detail') or ''}".strip())
+        return body["Result"]
+
+    async def _ReadReplies(self, ws):
+        async for raw in ws:
+            data = json.loads(raw)
+            if not data.get("is_bot") or data.get("response_to") is None:
+                continue
+            # A cached answer can arrive before PostMessage has returned its id
+            future = self.replies.get(data["response_to"])
+            if future is None:
+                self.arrived[data["response_to"]] = time.perf_counter()
+            elif not future.done():
+                future.set_result(time.perf_counter())
+
+    async def Run(self, messages: int):
+        step = "login"
+        try:
+            result = await self._Call(step, "POST", "/Auth/login", json={"token": self.email})
+            self.headers = {"Authorization": f"Bearer {result['token']}"}
+
+            step = "ws_connect"
+            started = time.perf_counter()
+            async with websockets.connect(f"{self.ws_url}/initialize/{self.email}", open_timeout=self.timeout) as ws:
+                self.results.Record(step, time.perf_counter() - started)
+                reader = asyncio.create_task(self._ReadReplies(ws))
+                try:
+                    for i in range(messages):
+                        step = "post_message"
+                        sent_at = time.perf_counter()
+                        question = await self._Call(step, "POST", "/Chat/PostMessage", json={"message": f"{self.email} question {i}"})
+                        reply = self.replies[question["ID"]] = asyncio.get_running_loop().create_future()
+                        if question["ID"] in self.arrived:
+                            reply.set_result(self.arrived.pop(question["ID"]))
+
+                        step = "reply"
+                        try:
+                            self.results.Record(step, await asyncio.wait_for(reply, self.timeout) - sent_at)
+                        except asyncio.TimeoutError:
+                            raise RuntimeError("no reply on the websocket")
+                finally:
+                    reader.cancel()
+
+            step = "chat_history"
+            history = await self._Call(step, "GET", "/Chat/ChatHistory", params={"page_size": min(100, 2 * messages)})
+            if len(history["messages"]) < min(100, 2 * messages):
+                raise RuntimeError("history is missing messages")
+            self.results.users_completed += 1
+        except Exception as ex:
+            self.results.Fail(step, str(ex) or type(ex).__name__)
+
+
+def _Summary(samples: list[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "p50_ms": round(Percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(Percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(Percentile(samples, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3)
+    }
+
+async def _Run(args, url: str) -> dict:
+    results = _Results()
+    run_id = uuid.uuid4().hex[:8]
+    emails = iter(f"e2e-{run_id}-{i}@example.com" for i in range(args.users))
+    ws_url = url.replace("http", "ws", 1)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=args.timeout) as client:
+        async def user_loop():
+            for email in emails:
+                await _Session(client, ws_url, email, results, args.timeout).Run(args.messages)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user_loop() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "run_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput": {
+            "http_requests_per_second": round(results.requests / elapsed, 2),
+            "messages_per_second": round(len(results.latencies["reply"]) / elapsed, 2),
+            "users_per_second": round(results.users_completed / elapsed, 2)
+        },
+        "users_completed": results.users_completed,
+        "latency": {step: _Summary(results.latencies[step]) for step in STEPS},
+        "errors": dict(results.errors)
+    }
+
+def _Print(report: dict, baseline: dict = None):
+    throughput = report["throughput"]
+    print(
+        f"{report['users_completed']}/{report['config']['users']} users in {report['elapsed_seconds']:.1f}s: "
+        f"{throughput['http_requests_per_second']:,.0f} HTTP req/s, {throughput['messages_per_second']:,.0f} replies/s"
+    )
+    for step, summary in report["latency"].items():
+        if not summary["count"]:
+            continue
+        line = f"{step:>13}: n={summary['count']:<7} " + " ".join(
+            f"{key[:-3]}={summary[key]:9.1f}ms" for key in ("p50_ms", "p95_ms", "p99_ms")
+        )
+        before = (baseline or {}).get("latency", {}).get(step, {})
+        if before.get("count"):
+            line += "   vs baseline " + " ".join(
+                f"{key[:-3]} {(summary[key] - before[key]) / before[key] * 100:+.0f}%" if before[key] else f"{key[:-3]} n/a"
+                for key in ("p50_ms", "p95_ms", "p99_ms")
+            )
+        print(line)
+    if baseline:
+        before = baseline["throughput"]["http_requests_per_second"]
+        if before:
+            print(f"   throughput vs baseline: {(throughput['http_requests_per_second'] - before) / before * 100:+.1f}%")
+    for error, count in report["errors"].items():
+        print(f"  error x{count}: {error}")
+
+async def _WaitHealthy(url: str, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError("Stand-in stack exited during startup")
+            try:
+                if (await client.get(f"{url}/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"Stand-in stack at {url} did not become healthy")
+
+def _RaiseOpenFileLimit():
+    # Every active user holds a socket; the default soft limit is often 1024
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="running ChatAPI stand-in stack; started automatically when omitted")
+    parser.add_argument("--port", type=int, default=18100)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200, help="users in a session at the same time")
+    parser.add_argument("--messages", type=int, default=3, help="questions per user")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--ai-latency-ms", type=float, default=40)
+    parser.add_argument("--auth-latency-ms", type=float, default=0)
+    parser.add_argument("--output", default="e2e-results.json")
+    parser.add_argument("--compare", help="earlier --output file to compare against")
+    args = parser.parse_args()
+
+    _RaiseOpenFileLimit()
+    url = args.url
+    process = None
+    if url is None:
+        url = f"http://127.0.0.1:{args.port}"
+        process = subprocess.Popen(
+            [
+                sys.executable, "-m", "Benchmarks.StandInStack", "--port", str(args.port),
+                "--ai-latency-ms", str(args.ai_latency_ms), "--auth-latency-ms", str(args.auth_latency_ms)
+            ],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        )
+    try:
+        if process is not None:
+            asyncio.run(_WaitHealthy(url, process))
+        report = asyncio.run(_Run(args, url))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    _Print(report, baseline)
+    print(f"Results written to {args.output}")
+    sys.exit(1 if report["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+In-process stand-in for the parts of aiokafka the services use, so workers and
+consumers can be benchmarked without a broker.
+
+One InProcessBroker holds every topic in memory. InProcessConsumer and
+InProcessProducer take it in place of bootstrap_servers and otherwise accept the
+same arguments as AIOKafkaConsumer/AIOKafkaProducer. Consumers sharing a
+group_id split the partitions between them and share committed offsets;
+group_id=None reads every partition.
+"""
+import asyncio
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+
+class TopicPartition(NamedTuple):
+    topic: str
+    partition: int
+
+
+@dataclass
+class ConsumerRecord:
+    topic: str
+    partition: int
+    offset: int
+    timestamp: int
+    key: Optional[bytes]
+    value: Any
+    headers: list = field(default_factory=list)
+
+
+class InProcessBroker:
+    def __init__(self, partitions: int = 4):
+        self.partitions = partitions
+        self._logs: Dict[str, List[List[tuple]]] = {}
+        self._committed: Dict[str, Dict[TopicPartition, int]] = {}
+        self._members: Dict[str, List["InProcessConsumer"]] = {}
+        self._appended = asyncio.Event()
+        self._round_robin = 0
+
+    def _Log(self, topic: str) -> List[List[tuple]]:
+        if topic not in self._logs:
+            self._logs[topic] = [[] for _ in range(self.partitions)]
+        return self._logs[topic]
+
+    def Append(self, topic: str, value: bytes, key: Optional[bytes] = None, headers: Optional[list] = None) -> TopicPartition:
+        if key is not None:
+            partition = zlib.crc32(key) % self.partitions
+        else:
+            partition = self._round_robin % self.partitions
+            self._round_robin += 1
+        log = self._Log(topic)[partition]
+        log.append((key, value, int(time.time() * 1000), list(headers or [])))
+        # Wake every waiting consumer; the next append gets a fresh event
+        self._appended.set()
+        self._appended = asyncio.Event()
+        return TopicPartition(topic, partition)
+
+    def Size(self, topic: str) -> int:
+        return sum(len(log) for log in self._Log(topic))
+
+    def HighWater(self, tp: TopicPartition) -> int:
+        return len(self._Log(tp.topic)[tp.partition])
+
+    async def WaitForAppend(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._appended.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class InProcessConsumer:
+    def __init__(
+        self,
+        *topics: str,
+        broker: InProcessBroker,
+        group_id: Optional[str] = None,
+        value_deserializer: Optional[Callable[[bytes], Any]] = None,
+        enable_auto_commit: bool = True,
+        auto_offset_reset: str = "latest",
+        **kwargs
+    ):
+        self.topics = topics
+        self.broker = broker
+        self.group_id = group_id
+        self.value_deserializer = value_deserializer
+        self.enable_auto_commit = enable_auto_commit
+        self.auto_offset_reset = auto_offset_reset
+        self._positions: Dict[TopicPartition, int] = {}
+
+    async def start(self):
+        if self.group_id is not None:
+            self.broker._members.setdefault(self.group_id, []).append(self)
+            self.broker._committed.setdefault(self.group_id, {})
+        for topic in self.topics:
+            self.broker._Log(topic)
+
+    async def stop(self):
+        if self.group_id is not None and self in self.broker._members.get(self.group_id, []):
+            self.broker._members[self.group_id].remove(self)
+
+    def assignment(self) -> List[TopicPartition]:
+        partitions = [TopicPartition(topic, p) for topic in self.topics for p in range(self.broker.partitions)]
+        if self.group_id is None:
+            return partitions
+        members = self.broker._members[self.group_id]
+        index = members.index(self)
+        return [tp for i, tp in enumerate(partitions) if i % len(members) == index]
+
+    def _Position(self, tp: TopicPartition) -> int:
+        if tp not in self._positions:
+            committed = self.broker._committed.get(self.group_id, {}).get(tp) if self.group_id else None
+            if committed is not None:
+                self._positions[tp] = committed
+            else:
+                self._positions[tp] = 0 if self.auto_offset_reset == "earliest" else self.broker.HighWater(tp)
+        return self._positions[tp]
+
+    def _Fetch(self, max_records: int) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        batches = {}
+        for tp in self.assignment():
+            if max_records <= 0:
+                break
+            log = self.broker._Log(tp.topic)[tp.partition]
+            position = self._Position(tp)
+            entries = log[position:position + max_records]
+            if not entries:
+                continue
+            batches[tp] = [
+                ConsumerRecord(
+                    tp.topic, tp.partition, position + i, timestamp, key,
+                    self.value_deserializer(value) if self.value_deserializer else value,
+                    headers
+                )
+                for i, (key, value, timestamp, headers) in enumerate(entries)
+            ]
+            self._positions[tp] = position + len(entries)
+            max_records -= len(entries)
+        if batches and self.enable_auto_commit and self.group_id is not None:
+            self.broker._committed[self.group_id].update(self._positions)
+        return batches
+
+    async def getmany(self, *partitions, timeout_ms: int = 0, max_records: Optional[int] = None) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        max_records = max_records or 10000
+        deadline = time.monotonic() + timeout_ms / 1000
+        while True:
+            batches = self._Fetch(max_records)
+            remaining = deadline - time.monotonic()
+            if batches or remaining <= 0:
+                return batches
+            await self.broker.WaitForAppend(remaining)
+
+    async def getone(self) -> ConsumerRecord:
+        while True:
+            batches = await self.getmany(timeout_ms=1000, max_records=1)
+            for messages in batches.values():
+                return messages[0]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ConsumerRecord:
+        return await self.getone()
+
+    async def commit(self, offsets: Optional[Dict[TopicPartition, int]] = None):
+        if self.group_id is None:
+            return
+        self.broker._committed[self.group_id].update(offsets if offsets is not None else self._positions)
+
+    def seek(self, tp: TopicPartition, offset: int):
+        self._positions[tp] = offset
+
+    def highwater(self, tp: TopicPartition) -> int:
+        return self.broker.HighWater(tp)
+
+
+class InProcessProducer:
+    def __init__(self, broker: InProcessBroker, value_serializer: Optional[Callable[[Any], bytes]] = None, **kwargs):
+        self.broker = broker
+        self.value_serializer = value_serializer
+        self.sent = 0
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def flush(self):
+        pass
+
+    async def partitions_for(self, topic: str) -> set:
+        return set(range(self.broker.partitions))
+
+    async def send(self, topic: str, value: Any = None, key: Optional[bytes] = None, headers: Optional[list] = None) -> asyncio.Future:
+        tp = self.broker.Append(topic, self.value_serializer(value) if self.value_serializer else value, key, headers)
+        self.sent += 1
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(tp)
+        return future
+
+    async def send_and_wait(self, topic: str, value: Any = None, key: Optional[bytes] = None, headers: Optional[list] = None):
+        return await (await self.send(topic, value=value, key=key, headers=headers))
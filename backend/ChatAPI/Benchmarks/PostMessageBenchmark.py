@@ -0,0 +1,71 @@
+"""
+Load test for /Chat/PostMessage reporting throughput and p50/p99 latency.
+
+Point it at a running ChatAPI with a valid bearer token, once on the old build
+and once on the new one, and compare the printed lines:
+
+    cd backend/ChatAPI
+    python -m Benchmarks.PostMessageBenchmark --url http://localhost:1002 --token <jwt> --requests 2000 --concurrency 100
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+
+def Percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _Run(url: str, token: str, requests: int, concurrency: int) -> tuple[list[float], int, float]:
+    latencies: list[float] = []
+    failures = 0
+    remaining = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal failures
+            for i in remaining:
+                started = time.perf_counter()
+                try:
+                    response = await client.post(
+                        "/Chat/PostMessage",
+                        json={"message": f"benchmark message {i}"},
+                        headers={"Authorization": f"Bearer {token}"}
+                    )
+                    if response.status_code != 200 or response.json().get("Status") != "OK":
+                        failures += 1
+                except httpx.HTTPError:
+                    failures += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, failures, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:1002")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    latencies, failures, elapsed = asyncio.run(_Run(args.url, args.token, args.requests, args.concurrency))
+    print(
+        f"{len(latencies)} requests in {elapsed:.2f}s ({len(latencies) / elapsed:,.0f} req/s), failures={failures}\n"
+        f"p50={Percentile(latencies, 50) * 1000:.1f}ms p99={Percentile(latencies, 99) * 1000:.1f}ms "
+        f"mean={statistics.fmean(latencies) * 1000:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+/Chat/Search query latency over a seeded corpus.
+
+Seeds CUSTOMER_CHAT_MESSAGES with synthetic messages (IDs from --id-offset,
+bench-* users as in Benchmarks.ChatHistoryBenchmark) whose words follow a Zipf
+distribution over a --vocabulary word list, so common terms have long posting
+lists. The rows are indexed with Workers.RebuildSearchIndex, then sampled users
+run 1-3 term queries through SearchUserMessages for the first --pages pages:
+
+    cd backend/ChatAPI
+    python -m Benchmarks.SearchBenchmark --rows 2000000 --users 5000 --cleanup
+
+--sqlite runs on a throwaway SQLite database instead of the configured MySQL;
+it needs aiosqlite from requirements-dev.txt.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SEED_CHUNK = 5000
+
+
+def _Vocabulary(size: int) -> list[str]:
+    """size distinct pronounceable words, none of them a stop word."""
+    from Services.SearchIndex import STOP_WORDS
+    letters = "bcdfghjklmnpqrstvwxz"
+    vowels = "aeiou"
+    words, i = [], 0
+    while len(words) < size:
+        i += 1
+        word, n = "", i
+        while n:
+            n, consonant = divmod(n, len(letters))
+            n, vowel = divmod(n, len(vowels))
+            word += letters[consonant] + vowels[vowel]
+        if word not in STOP_WORDS:
+            words.append(word)
+    return words
+
+def _Report(label: str, latencies: list[float], hits: int):
+    ordered = sorted(latencies)
+    pick = lambda pct: ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))] * 1000
+    print(f"{label:>8}: {len(ordered)} queries, {hits / max(1, len(ordered)):.0f} matches/query p50={pick(50):.2f}ms p95={pick(95):.2f}ms p99={pick(99):.2f}ms")
+
+async def _Seed(rows: int, users: int, id_offset: int, words: list[str], weights: list[float], words_per_message: int):
+    from sqlalchemy import insert
+    from Benchmarks.ChatHistoryBenchmark import _BenchUser
+    from Config.dbConnection import async_engine_chatbot
+    from Models.shared import customerChatMessages
+
+    started_at = datetime.now() - timedelta(days=365)
+    for start in range(0, rows, SEED_CHUNK):
+        count = min(rows, start + SEED_CHUNK) - start
+        sampled = random.choices(words, weights, k=count * words_per_message)
+        chunk = [
+            {
+                "ID": id_offset + n,
+                "USER": _BenchUser(n % users),
+                "MESSAGE": " ".join(sampled[(n - start) * words_per_message:(n - start + 1) * words_per_message]),
+                "CREATED_AT": started_at + timedelta(seconds=n),
+                "IS_BOT": n % 2 == 1,
+                "RESPONSE_TO": None
+            }
+            for n in range(start, start + count)
+        ]
+        async with async_engine_chatbot.begin() as conn:
+            await conn.execute(insert(customerChatMessages).values(chunk))
+        print(f"\rseeded {start + count:,}/{rows:,}", end="", flush=True)
+    print()
+
+async def _Run(args):
+    from sqlalchemy import delete
+    from Benchmarks.ChatHistoryBenchmark import _BenchUser
+    from Config.dbConnection import async_engine_chatbot
+    from Migrations.Migrate import RunMigrations
+    from Models.shared import chatSearchDocs, chatSearchPostings, customerChatMessages
+    from Services.SearchIndex import SearchUserMessages
+    from Workers.RebuildSearchIndex import IndexTable
+
+    words = _Vocabulary(args.vocabulary)
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    try:
+        if args.sqlite:
+            await RunMigrations()
+        if args.rows:
+            await _Seed(args.rows, args.users, args.id_offset, words, weights, args.words)
+            started = time.perf_counter()
+
+            def progress(messages: int, postings: int):
+                print(f"\rindexed {messages:,} messages, {postings:,} postings", end="", flush=True)
+
+            messages, postings = await IndexTable(batch_rows=args.batch_rows, progress=progress)
+            elapsed = time.perf_counter() - started
+            print(f"\nindexed in {elapsed:.1f}s ({messages / elapsed:,.0f} messages/s)")
+
+        # Queries mix frequent and rare terms, drawn with the same skew as the corpus
+        for terms in (1, 2, 3):
+            for page in range(1, args.pages + 1):
+                latencies, hits = [], 0
+                for _ in range(args.samples):
+                    user = _BenchUser(random.randrange(args.users)).lower()
+                    query = " ".join(random.choices(words, weights, k=terms))
+                    started = time.perf_counter()
+                    total, _ = await SearchUserMessages(user, query, page, args.page_size)
+                    latencies.append(time.perf_counter() - started)
+                    hits += total
+                _Report(f"{terms}t p{page}", latencies, hits)
+    finally:
+        if args.cleanup:
+            async with async_engine_chatbot.begin() as conn:
+                for table in (chatSearchPostings, chatSearchDocs):
+                    await conn.execute(delete(table).where(table.c.MESSAGE_ID >= args.id_offset))
+                await conn.execute(delete(customerChatMessages).where(customerChatMessages.c.ID >= args.id_offset))
+        await async_engine_chatbot.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000, help="messages to seed and index; 0 reuses an earlier seed")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=10, help="words per message")
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--samples", type=int, default=200, help="queries per term count and page")
+    parser.add_argument("--pages", type=int, default=2)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--batch-rows", type=int, default=5000, help="messages per index transaction")
+    parser.add_argument("--id-offset", type=int, default=1_000_000_000)
+    parser.add_argument("--sqlite", action="store_true", help="use a throwaway SQLite database")
+    parser.add_argument("--cleanup", action="store_true")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        # Read by Config.dbConnection at import time
+        db_path = os.path.join(tempfile.gettempdir(), "chatapi-search-bench.db")
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        os.environ["DB_CHATBOT_URL"] = f"sqlite+aiosqlite:///{db_path}"
+    asyncio.run(_Run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+The ChatAPI app on local stand-ins, for end-to-end benchmarks without MySQL,
+Kafka, ChatAuth or a model:
+
+- SQLite (aiosqlite) in place of MySQL, recreated on every start
+- an InProcessBroker in place of Kafka
+- a fake ChatAuth that accepts any email as the Google token
+- the reference AIWorker with the StubBackend, consuming from the same broker
+
+Everything runs in one process and one event loop, so this measures the
+ChatAPI code paths, not the throughput of a deployment:
+
+    cd backend/ChatAPI
+    pip install -r requirements-dev.txt
+    python -m Benchmarks.StandInStack --port 18100
+
+Benchmarks.EndToEndBenchmark starts it on its own unless given --url.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import httpx
+from fastapi import FastAPI, Header, HTTPException
+from pydantic import BaseModel
+
+STANDIN_TOKEN_PREFIX = "standin."
+
+
+class _LoginRequest(BaseModel):
+    token: str
+
+
+def CreateFakeChatAuth(latency_ms: float = 0) -> FastAPI:
+    """
+    /GoogleAuth routes with ChatAuth's response shapes. The Google token is the
+    user's email; the issued token is that email with STANDIN_TOKEN_PREFIX.
+    """
+    app = FastAPI()
+
+    def user_info(email: str) -> dict:
+        return {"id": email, "email": email, "name": email.split("@")[0], "picture": ""}
+
+    @app.post("/GoogleAuth/Login")
+    async def Login(request: _LoginRequest):
+        await asyncio.sleep(latency_ms / 1000)
+        if "@" not in request.token:
+            raise HTTPException(status_code=401, detail="Invalid Google token")
+        return {"token": STANDIN_TOKEN_PREFIX + request.token, "user": user_info(request.token)}
+
+    @app.get("/GoogleAuth/VerifyToken")
+    async def VerifyToken(authorization: str = Header("")):
+        await asyncio.sleep(latency_ms / 1000)
+        token = authorization.split(" ", 1)[-1]
+        if not token.startswith(STANDIN_TOKEN_PREFIX):
+            raise HTTPException(status_code=401, detail="Invalid token")
+        return {"valid": True, "user": user_info(token[len(STANDIN_TOKEN_PREFIX):])}
+
+    @app.post("/GoogleAuth/Logout")
+    async def Logout():
+        return {"message": "Logged out successfully"}
+
+    return app
+
+
+def _ConfigureEnvironment(db_path: str):
+    # Read by the app modules at import time, so this runs before they are imported
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    os.environ["DB_CHATBOT_URL"] = f"sqlite+aiosqlite:///{db_path}"
+    os.environ.setdefault("LOG_DIR", os.path.join(os.path.dirname(db_path), "standin-logs"))
+    os.environ.setdefault("WS_FANOUT_ENABLED", "false")
+    os.environ.setdefault("RATE_LIMIT_BACKEND", "MEMORY")
+    os.environ.setdefault("NODE_ID", "standin")
+
+async def _Serve(args):
+    import uvicorn
+    from Benchmarks.InProcessKafka import InProcessBroker, InProcessConsumer, InProcessProducer
+    from Config.dbConnection import async_engine_chatbot
+    from Migrations.Migrate import RunMigrations
+    from Services import ChatAuthClient, KafkaMessageProducer
+    from Services.BatchInserter import chatMessageInserter
+    from Services.SearchIndex import searchIndexer
+    from Services.ConnectionManager import connectionManager
+    from Services.LogServices import logPipeline
+    from Services.RateLimiter import StartRateLimiter, StopRateLimiter
+    from Services.Tracing import tracer
+    from Workers.AIWorker import AIWorker, AI_WORKER_GROUP, DecodeChatMessage
+    from Workers.GenerationBackends import StubBackend
+    from Workers.KafkaMessageConsumer import ConsumeResponse
+    from index import app
+
+    # WAL lets history reads run beside the inserter
+    async with async_engine_chatbot.connect() as conn:
+        await conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+    await RunMigrations()
+
+    def serialize(value) -> bytes:
+        return json.dumps(value).encode("utf-8")
+
+    def deserialize(raw: bytes):
+        return json.loads(raw.decode("utf-8"))
+
+    broker = InProcessBroker(partitions=args.partitions)
+    KafkaMessageProducer.producer = InProcessProducer(broker, value_serializer=serialize)
+    ChatAuthClient._client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=CreateFakeChatAuth(args.auth_latency_ms)),
+        base_url="http://chatauth"
+    )
+    worker = AIWorker(
+        InProcessConsumer(
+            "Chat_message", broker=broker, group_id=AI_WORKER_GROUP, enable_auto_commit=False,
+            auto_offset_reset="earliest", value_deserializer=DecodeChatMessage
+        ),
+        InProcessProducer(broker, value_serializer=serialize),
+        StubBackend(batch_latency_ms=args.ai_latency_ms, item_cpu_ms=args.ai_item_cpu_ms),
+        logPipeline
+    )
+    response_consumer = InProcessConsumer(
+        "ai_response", broker=broker, group_id="ai_consumer_group", enable_auto_commit=False,
+        auto_offset_reset="earliest", value_deserializer=deserialize
+    )
+
+    await worker.consumer.start()
+    await logPipeline.Start()
+    await tracer.Start()
+    await StartRateLimiter()
+    await chatMessageInserter.Start()
+    await searchIndexer.Start()
+    tasks = [asyncio.create_task(ConsumeResponse(response_consumer)), asyncio.create_task(worker.Run())]
+    server = uvicorn.Server(uvicorn.Config(app, host=args.host, port=args.port, lifespan="off", log_level="warning"))
+    print(f"Stand-in ChatAPI listening on http://{args.host}:{args.port} (SQLite at {args.db})", flush=True)
+    try:
+        await server.serve()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await connectionManager.CloseAll()
+        await chatMessageInserter.Stop()
+        await searchIndexer.Stop()
+        await ChatAuthClient.StopChatAuthClient()
+        await StopRateLimiter()
+        await tracer.Stop()
+        await logPipeline.Stop()
+        await async_engine_chatbot.dispose()
+        print(f"Stand-in stack stopped: AI worker {worker.Stats()}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18100)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "chatapi-standin.db"))
+    parser.add_argument("--partitions", type=int, default=4)
+    parser.add_argument("--auth-latency-ms", type=float, default=0)
+    parser.add_argument("--ai-latency-ms", type=float, default=40, help="fixed cost of one stub model batch")
+    parser.add_argument("--ai-item-cpu-ms", type=float, default=2, help="CPU cost per request in a batch")
+    args = parser.parse_args()
+
+    _ConfigureEnvironment(args.db)
+    asyncio.run(_Serve(args))
+
+
+if __name__ == "__main__":
+    main()
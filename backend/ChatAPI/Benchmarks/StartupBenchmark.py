@@ -0,0 +1,78 @@
+"""
+Cold start of ChatAPI: time from spawning the process to the first 200 from
+/health, over --runs fresh processes. Also reports how long `import index` takes
+in a fresh interpreter, the part every uvicorn worker pays before serving.
+
+With the services configured by the usual environment variables:
+
+    cd backend/ChatAPI
+    python -m Benchmarks.StartupBenchmark --runs 5
+
+--standin starts Benchmarks.StandInStack instead, which needs no MySQL or Kafka.
+Its time includes creating and migrating the SQLite database.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import httpx
+from Benchmarks.PostMessageBenchmark import Percentile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_PROBE = "import time; started = time.perf_counter(); import index; print(time.perf_counter() - started)"
+
+
+def _MeasureImport() -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=APP_DIR, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+async def _WaitHealthy(url: str, process: subprocess.Popen, timeout: float) -> float:
+    started = time.perf_counter()
+    async with httpx.AsyncClient(timeout=2) as client:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"Process exited with code {process.returncode} before /health succeeded")
+            try:
+                if (await client.get(f"{url}/health")).status_code == 200:
+                    return time.perf_counter()
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.01)
+    raise RuntimeError(f"/health did not return 200 within {timeout:.0f}s")
+
+def _MeasureColdStart(args) -> float:
+    if args.standin:
+        command = [sys.executable, "-m", "Benchmarks.StandInStack", "--port", str(args.port)]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "index:app", "--host", "127.0.0.1", "--port", str(args.port), "--log-level", "warning"]
+    spawned_at = time.perf_counter()
+    process = subprocess.Popen(command, cwd=APP_DIR, stdout=subprocess.DEVNULL)
+    try:
+        healthy_at = asyncio.run(_WaitHealthy(f"http://127.0.0.1:{args.port}", process, args.timeout))
+        return healthy_at - spawned_at
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=18200)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--standin", action="store_true", help="start the SQLite/in-process stand-in stack")
+    args = parser.parse_args()
+
+    imports = [_MeasureImport() for _ in range(args.runs)]
+    cold_starts = [_MeasureColdStart(args) for _ in range(args.runs)]
+    for name, samples in (("import index", imports), ("spawn -> /health 200", cold_starts)):
+        print(
+            f"{name:>20}: min={min(samples) * 1000:8.0f}ms p50={Percentile(samples, 50) * 1000:8.0f}ms "
+            f"max={max(samples) * 1000:8.0f}ms ({len(samples)} runs)"
+        )
+
+
+if __name__ == "__main__":
+    main()
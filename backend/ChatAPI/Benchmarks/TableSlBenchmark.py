@@ -0,0 +1,77 @@
+"""
+Compares table serial allocation throughput of the per-call CHATBOT_GetTableSl
+procedure against the block allocator, and checks that serials handed out by
+several worker processes never collide.
+
+Runs against the database configured by the DB_CHATBOT_* variables:
+
+    cd backend/ChatAPI
+    python -m Benchmarks.TableSlBenchmark --concurrency 50 --count 2000 --processes 4
+"""
+import argparse
+import asyncio
+import multiprocessing
+import time
+from Config.dbConnection import AsyncSessionLocalChatBot, async_engine_chatbot
+from Services.CallChatBotSPServices import sp_get_table_sl
+from Services.TableSlAllocator import TableSlAllocator
+
+BENCHMARK_TABLE_NM = "benchmarkTableSl"
+
+
+async def _ProcedureSl() -> int:
+    db_session = AsyncSessionLocalChatBot()
+    try:
+        return await sp_get_table_sl(db_session, BENCHMARK_TABLE_NM)
+    finally:
+        await db_session.close()
+
+
+async def _Run(mode: str, concurrency: int, count: int, block_size: int) -> tuple[list[int], float]:
+    allocator = TableSlAllocator(BENCHMARK_TABLE_NM, block_size=block_size)
+    next_sl = allocator.NextSl if mode == "block" else _ProcedureSl
+    per_task = max(1, count // concurrency)
+
+    async def worker():
+        return [await next_sl() for _ in range(per_task)]
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await async_engine_chatbot.dispose()
+    return [sl for chunk in results for sl in chunk], elapsed
+
+
+def _RunInProcess(args) -> list[int]:
+    mode, concurrency, count, block_size = args
+    sls, _ = asyncio.run(_Run(mode, concurrency, count, block_size))
+    return sls
+
+
+def _Report(mode: str, sls: list[int], elapsed: float):
+    duplicates = len(sls) - len(set(sls))
+    print(f"{mode:>9}: {len(sls)} serials in {elapsed:.3f}s -> {len(sls) / elapsed:,.0f}/s, duplicates={duplicates}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--block-size", type=int, default=1000)
+    parser.add_argument("--processes", type=int, default=1)
+    args = parser.parse_args()
+
+    for mode in ("procedure", "block"):
+        started = time.perf_counter()
+        if args.processes > 1:
+            job = (mode, args.concurrency, args.count, args.block_size)
+            with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+                sls = [sl for chunk in pool.map(_RunInProcess, [job] * args.processes) for sl in chunk]
+            elapsed = time.perf_counter() - started
+        else:
+            sls, elapsed = asyncio.run(_Run(mode, args.concurrency, args.count, args.block_size))
+        _Report(mode, sls, elapsed)
+
+
+if __name__ == "__main__":
+    main()
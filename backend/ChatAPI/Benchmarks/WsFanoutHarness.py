@@ -0,0 +1,115 @@
+"""
+Multi-process check that bot replies reach a user's socket whichever ChatAPI
+worker consumed them from ai_response.
+
+Starts --nodes uvicorn processes (needs the Kafka and MySQL configured by the
+usual environment variables), connects each simulated user to one node, publishes
+one ai_response per user and waits for every reply to arrive:
+
+    cd backend/ChatAPI
+    KAFKA_BOOTSTRAP_SERVERS=localhost:9092 python -m Benchmarks.WsFanoutHarness --nodes 3 --users 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+import httpx
+import websockets
+from aiokafka import AIOKafkaProducer
+
+
+def _StartNodes(nodes: int, base_port: int) -> list[subprocess.Popen]:
+    processes = []
+    for i in range(nodes):
+        env = dict(os.environ, NODE_ID=f"harness-node-{i}")
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "index:app", "--host", "127.0.0.1", "--port", str(base_port + i)],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            env=env
+        ))
+    return processes
+
+async def _WaitHealthy(ports: list[int], timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        for port in ports:
+            while True:
+                try:
+                    if (await client.get(f"http://127.0.0.1:{port}/health")).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Node on port {port} did not become healthy")
+                await asyncio.sleep(0.5)
+
+async def _Run(nodes: int, base_port: int, users: int, timeout: float) -> int:
+    ports = [base_port + i for i in range(nodes)]
+    await _WaitHealthy(ports)
+    # Give the fan-out consumers time to join their topics before publishing
+    await asyncio.sleep(5)
+
+    run_id = uuid.uuid4().hex[:8]
+    emails = [f"fanout-{run_id}-{i}@example.com" for i in range(users)]
+    sockets = [
+        await websockets.connect(f"ws://127.0.0.1:{ports[i % nodes]}/initialize/{email}")
+        for i, email in enumerate(emails)
+    ]
+
+    producer = AIOKafkaProducer(
+        bootstrap_servers=os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'kafka:9092'),
+        value_serializer=lambda v: json.dumps(v).encode("utf-8")
+    )
+    await producer.start()
+    sent_at = time.perf_counter()
+    for email in emails:
+        await producer.send("ai_response", {"user": email, "response": f"reply for {email}", "request_id": None})
+    await producer.flush()
+    await producer.stop()
+
+    async def receive(ws, email):
+        while True:
+            data = json.loads(await ws.recv())
+            if data.get("message") == f"reply for {email}":
+                return time.perf_counter() - sent_at
+
+    results = await asyncio.gather(
+        *(asyncio.wait_for(receive(ws, email), timeout) for ws, email in zip(sockets, emails)),
+        return_exceptions=True
+    )
+    for ws in sockets:
+        await ws.close()
+
+    latencies = sorted(r for r in results if isinstance(r, float))
+    missing = len(results) - len(latencies)
+    print(f"nodes={nodes} users={users} delivered={len(latencies)} missing={missing}")
+    if latencies:
+        print(f"delivery latency p50={latencies[len(latencies) // 2] * 1000:.0f}ms max={latencies[-1] * 1000:.0f}ms")
+    return 1 if missing else 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=2)
+    parser.add_argument("--base-port", type=int, default=18000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    processes = _StartNodes(args.nodes, args.base_port)
+    try:
+        exit_code = asyncio.run(_Run(args.nodes, args.base_port, args.users, args.timeout))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,13 @@
-from typing import Dict
-from fastapi import WebSocket
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import MetaData
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 import os
 from contextlib import asynccontextmanager
-from sqlalchemy import MetaData
 
 meta = MetaData()
 
-# WebSocket connections dictionary
-ws_connections: Dict[str, WebSocket] = {}
-
-CHATBOT_DB_URL = (
+# DB_CHATBOT_URL overrides the MySQL settings, e.g. sqlite+aiosqlite:///chatbot.db for local stand-ins
+CHATBOT_DB_URL = os.getenv("DB_CHATBOT_URL") or (
     f"mysql+asyncmy://{os.getenv('DB_CHATBOT_USER', 'chatbot_user')}:"
     f"{os.getenv('DB_CHATBOT_PASSWORD', 'chatbot_password')}@"
     f"{os.getenv('DB_CHATBOT_HOST', 'mysql-chatbot')}:"
@@ -29,13 +24,6 @@ async_engine_chatbot = create_async_engine(
     pool_recycle=3600
 )
 
-sync_engine_chatbot = create_engine(
-    CHATBOT_DB_URL.replace("+asyncmy", "+pymysql"),
-    pool_pre_ping=True,
-    pool_recycle=3600
-)
-engine = sync_engine_chatbot
-
 # Async session makers
 AsyncSessionLocalChatBot = sessionmaker(
     bind=async_engine_chatbot,
@@ -0,0 +1,130 @@
+"""
+Versioned schema migrations for the ChatBot database, run once per deploy
+before the API starts (the chatapi-migrate service in docker-compose):
+
+    cd backend/ChatAPI
+    python -m Migrations.Migrate            # apply pending migrations
+    python -m Migrations.Migrate --status   # list applied and pending versions
+
+A migration is a module Migrations/V<NNN>_<Name>.py with a DESCRIPTION and an
+async Upgrade(conn). Applied versions are recorded in SCHEMA_MIGRATIONS. On
+MySQL a named lock makes concurrent runs wait instead of applying a version twice.
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import pkgutil
+import re
+from datetime import datetime
+from typing import Awaitable, Callable, List, NamedTuple
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from Config.dbConnection import async_engine_chatbot
+
+MIGRATION_LOCK_TIMEOUT = int(os.getenv("MIGRATION_LOCK_TIMEOUT", "300"))
+MIGRATION_LOCK_NAME = "chatbot_schema_migrations"
+_MODULE_PATTERN = re.compile(r"^V(\d+)_\w+$")
+
+# Kept out of the application metadata: only this runner reads or writes it
+schemaMigrations = Table(
+    "SCHEMA_MIGRATIONS", MetaData(),
+    Column("VERSION", Integer, primary_key=True, autoincrement=False),
+    Column("NAME", String(200), nullable=False),
+    Column("APPLIED_AT", DateTime, nullable=False)
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    description: str
+    upgrade: Callable[[AsyncConnection], Awaitable[None]]
+
+
+def DiscoverMigrations() -> List[Migration]:
+    migrations = []
+    for module_info in pkgutil.iter_modules([os.path.dirname(os.path.abspath(__file__))]):
+        match = _MODULE_PATTERN.match(module_info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"Migrations.{module_info.name}")
+        migrations.append(Migration(int(match.group(1)), module_info.name, module.DESCRIPTION, module.Upgrade))
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return migrations
+
+async def _AppliedVersions(conn: AsyncConnection) -> set:
+    await conn.run_sync(schemaMigrations.metadata.create_all)
+    return set((await conn.execute(select(schemaMigrations.c.VERSION))).scalars())
+
+async def _Lock(conn: AsyncConnection):
+    if conn.dialect.name == "mysql":
+        locked = (await conn.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"),
+            {"name": MIGRATION_LOCK_NAME, "timeout": MIGRATION_LOCK_TIMEOUT}
+        )).scalar()
+        if locked != 1:
+            raise RuntimeError("Timed out waiting for another migration run to finish")
+
+async def _Unlock(conn: AsyncConnection):
+    if conn.dialect.name == "mysql":
+        await conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK_NAME})
+
+async def RunMigrations(engine: AsyncEngine = async_engine_chatbot) -> List[Migration]:
+    """Applies every pending migration in version order and returns the ones applied."""
+    migrations = DiscoverMigrations()
+    applied = []
+    async with engine.connect() as conn:
+        await _Lock(conn)
+        try:
+            done = await _AppliedVersions(conn)
+            await conn.commit()
+            for migration in migrations:
+                if migration.version in done:
+                    continue
+                print(f"Applying {migration.name}: {migration.description}")
+                try:
+                    await migration.upgrade(conn)
+                    await conn.execute(insert(schemaMigrations).values(
+                        VERSION=migration.version, NAME=migration.name, APPLIED_AT=datetime.now()
+                    ))
+                    await conn.commit()
+                except Exception:
+                    # MySQL commits DDL implicitly, so migrations must be safe to re-run
+                    await conn.rollback()
+                    raise
+                applied.append(migration)
+        finally:
+            await _Unlock(conn)
+            await conn.commit()
+    return applied
+
+async def MigrationStatus(engine: AsyncEngine = async_engine_chatbot) -> List[tuple]:
+    async with engine.connect() as conn:
+        done = await _AppliedVersions(conn)
+        await conn.commit()
+    return [(migration, migration.version in done) for migration in DiscoverMigrations()]
+
+async def _Main(args):
+    try:
+        if args.status:
+            for migration, is_applied in await MigrationStatus():
+                print(f"{'applied' if is_applied else 'pending'}  {migration.name}: {migration.description}")
+        else:
+            applied = await RunMigrations()
+            print(f"Applied {len(applied)} migration(s); schema is up to date")
+    finally:
+        await async_engine_chatbot.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--status", action="store_true", help="list migrations without applying them")
+    asyncio.run(_Main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Tables the models used to create on import, as they were defined then.
+Pinned here rather than taken from Models: every later change to them is a
+migration of its own. checkfirst keeps it a no-op on databases that already
+have them.
+"""
+from datetime import datetime
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, MetaData, String, Table, Text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+DESCRIPTION = "Create CUSTOMER_CHAT_MESSAGES, SYSTEM_LOG_ERROR and SYSTEM_TABLE_SL"
+
+baseline = MetaData()
+
+Table(
+    "CUSTOMER_CHAT_MESSAGES", baseline,
+    Column("ID", Integer, primary_key=True, autoincrement=False),
+    Column("USER", String(500)),
+    Column("MESSAGE", Text),
+    Column("CREATED_AT", DateTime, default=datetime.now),
+    Column("IS_BOT", Boolean),
+    Column("RESPONSE_TO", Integer, ForeignKey("CUSTOMER_CHAT_MESSAGES.ID")),
+)
+
+Table(
+    "SYSTEM_LOG_ERROR", baseline,
+    Column("SL", Integer, primary_key=True, autoincrement=True),
+    Column("ERR_DT", DateTime),
+    Column("ERR_TYPE", String(10)),
+    Column("ERR_MSG", String(length=4000)),
+    Column("MODULE_NAME", String(100)),
+    Column("CREATED_BY", String(100))
+)
+
+Table(
+    "SYSTEM_TABLE_SL", baseline,
+    Column("TABLE_NM", String(500), primary_key=True),
+    Column("TABLE_SL", Integer, nullable=False, default=1)
+)
+
+
+async def Upgrade(conn: AsyncConnection):
+    await conn.run_sync(baseline.create_all, checkfirst=True)
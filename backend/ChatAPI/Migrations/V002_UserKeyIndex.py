@@ -0,0 +1,51 @@
+"""
+Adds the USER_KEY column and (USER_KEY, ID) index to CUSTOMER_CHAT_MESSAGES.
+
+USER_KEY is a virtual generated column, so MySQL computes it for existing rows
+without rebuilding the table, and the index is built online (LOCK=NONE).
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+DESCRIPTION = "Add CUSTOMER_CHAT_MESSAGES.USER_KEY and IX_CUSTOMER_CHAT_MESSAGES_USER_KEY_ID"
+
+ADD_COLUMN = (
+    "ALTER TABLE CUSTOMER_CHAT_MESSAGES "
+    "ADD COLUMN USER_KEY VARCHAR(500) GENERATED ALWAYS AS (LOWER(`USER`)) VIRTUAL"
+)
+ADD_INDEX = (
+    "ALTER TABLE CUSTOMER_CHAT_MESSAGES "
+    "ADD INDEX IX_CUSTOMER_CHAT_MESSAGES_USER_KEY_ID (USER_KEY, ID), ALGORITHM=INPLACE, LOCK=NONE"
+)
+
+
+async def _Exists(conn: AsyncConnection, query: str) -> bool:
+    result = await conn.execute(text(query))
+    return result.scalar() > 0
+
+async def Upgrade(conn: AsyncConnection):
+    if conn.dialect.name != "mysql":
+        # table_xinfo, unlike table_info, lists generated columns
+        columns = (await conn.execute(text("PRAGMA table_xinfo(CUSTOMER_CHAT_MESSAGES)"))).fetchall()
+        if "USER_KEY" not in [column[1] for column in columns]:
+            await conn.execute(text(
+                'ALTER TABLE CUSTOMER_CHAT_MESSAGES ADD COLUMN USER_KEY VARCHAR(500) GENERATED ALWAYS AS (LOWER("USER")) VIRTUAL'
+            ))
+        await conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS IX_CUSTOMER_CHAT_MESSAGES_USER_KEY_ID ON CUSTOMER_CHAT_MESSAGES (USER_KEY, ID)"
+        ))
+        return
+    has_column = await _Exists(conn, (
+        "SELECT COUNT(*) FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'CUSTOMER_CHAT_MESSAGES' AND COLUMN_NAME = 'USER_KEY'"
+    ))
+    if not has_column:
+        await conn.execute(text(ADD_COLUMN))
+
+    has_index = await _Exists(conn, (
+        "SELECT COUNT(*) FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'CUSTOMER_CHAT_MESSAGES' "
+        "AND INDEX_NAME = 'IX_CUSTOMER_CHAT_MESSAGES_USER_KEY_ID'"
+    ))
+    if not has_index:
+        await conn.execute(text(ADD_INDEX))
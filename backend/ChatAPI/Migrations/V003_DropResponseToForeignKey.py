@@ -0,0 +1,21 @@
+"""
+Drops the CUSTOMER_CHAT_MESSAGES.RESPONSE_TO self-reference. The archiver
+moves rows out in CREATED_AT order, so a question can leave MySQL in an
+earlier chunk than its reply, and deleting it would violate the key. No query
+joins through it.
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+DESCRIPTION = "Drop the CUSTOMER_CHAT_MESSAGES.RESPONSE_TO foreign key"
+
+
+async def Upgrade(conn: AsyncConnection):
+    if conn.dialect.name != "mysql":
+        return
+    result = await conn.execute(text(
+        "SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS "
+        "WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = 'CUSTOMER_CHAT_MESSAGES'"
+    ))
+    for (name,) in result.fetchall():
+        await conn.execute(text(f"ALTER TABLE CUSTOMER_CHAT_MESSAGES DROP FOREIGN KEY `{name}`"))
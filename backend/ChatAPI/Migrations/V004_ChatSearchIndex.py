@@ -0,0 +1,33 @@
+"""
+Tables of the per-user full-text index behind /Chat/Search, as first defined
+in Models/customer/chatSearchIndex. They start empty; new messages are indexed
+as they are written, and existing history is indexed with:
+
+    python -m Workers.RebuildSearchIndex
+"""
+from sqlalchemy import Column, Integer, MetaData, SmallInteger, String, Table
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+DESCRIPTION = "Create CHAT_SEARCH_POSTINGS and CHAT_SEARCH_DOCS"
+
+searchTables = MetaData()
+
+Table(
+    "CHAT_SEARCH_POSTINGS", searchTables,
+    Column("USER_KEY", String(500), primary_key=True),
+    Column("TERM", String(64), primary_key=True),
+    Column("MESSAGE_ID", Integer, primary_key=True, autoincrement=False),
+    Column("TF", SmallInteger, nullable=False),
+    Column("DOC_LENGTH", SmallInteger, nullable=False),
+)
+
+Table(
+    "CHAT_SEARCH_DOCS", searchTables,
+    Column("USER_KEY", String(500), primary_key=True),
+    Column("MESSAGE_ID", Integer, primary_key=True, autoincrement=False),
+    Column("LENGTH", Integer, nullable=False),
+)
+
+
+async def Upgrade(conn: AsyncConnection):
+    await conn.run_sync(searchTables.create_all, checkfirst=True)
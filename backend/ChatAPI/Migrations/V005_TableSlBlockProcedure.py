@@ -0,0 +1,47 @@
+"""
+Creates CHATBOT_GetTableSlBlock on databases initialised before it was added
+to database/chatbot/ChatBot_Prcedures.sql; the init script only runs on an
+empty data directory. TableSlAllocator reserves its ID blocks through it.
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+DESCRIPTION = "Create the CHATBOT_GetTableSlBlock procedure"
+
+# Same body as database/chatbot/ChatBot_Prcedures.sql, without the DELIMITER lines
+CREATE_PROCEDURE = """
+CREATE PROCEDURE CHATBOT_GetTableSlBlock (
+    IN input_table_nm VARCHAR(500),
+    IN input_block_size INT
+)
+BEGIN
+    DECLARE current_sl INT;
+
+    SELECT TABLE_SL INTO current_sl
+    FROM SYSTEM_TABLE_SL
+    WHERE TABLE_NM = input_table_nm
+    FOR UPDATE;
+
+    IF current_sl IS NULL THEN
+        SET current_sl = 1;
+        INSERT INTO SYSTEM_TABLE_SL (TABLE_NM, TABLE_SL) VALUES (input_table_nm, current_sl + input_block_size);
+    ELSE
+        UPDATE SYSTEM_TABLE_SL SET TABLE_SL = current_sl + input_block_size WHERE TABLE_NM = input_table_nm;
+    END IF;
+
+    SELECT current_sl AS output_start_sl, current_sl + input_block_size - 1 AS output_end_sl;
+
+    COMMIT;
+END
+"""
+
+
+async def Upgrade(conn: AsyncConnection):
+    if conn.dialect.name != "mysql":
+        return
+    exists = (await conn.execute(text(
+        "SELECT COUNT(*) FROM information_schema.ROUTINES "
+        "WHERE ROUTINE_SCHEMA = DATABASE() AND ROUTINE_NAME = 'CHATBOT_GetTableSlBlock'"
+    ))).scalar() > 0
+    if not exists:
+        await conn.execute(text(CREATE_PROCEDURE))
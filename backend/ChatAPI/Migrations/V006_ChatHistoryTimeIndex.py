@@ -0,0 +1,30 @@
+"""
+Adds the (USER_KEY, CREATED_AT, ID) index that ChatHistory and the
+conversation context now scan. Message IDs are handed out in per-process
+blocks, so they are unique but not in time order across ChatAPI processes;
+history is ordered by CREATED_AT with ID as the tie-breaker.
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+DESCRIPTION = "Add IX_CUSTOMER_CHAT_MESSAGES_USER_KEY_CREATED_AT_ID"
+
+INDEX_NAME = "IX_CUSTOMER_CHAT_MESSAGES_USER_KEY_CREATED_AT_ID"
+ADD_INDEX = (
+    "ALTER TABLE CUSTOMER_CHAT_MESSAGES "
+    f"ADD INDEX {INDEX_NAME} (USER_KEY, CREATED_AT, ID), ALGORITHM=INPLACE, LOCK=NONE"
+)
+
+
+async def Upgrade(conn: AsyncConnection):
+    if conn.dialect.name == "mysql":
+        has_index = (await conn.execute(text(
+            "SELECT COUNT(*) FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'CUSTOMER_CHAT_MESSAGES' AND INDEX_NAME = :name"
+        ), {"name": INDEX_NAME})).scalar() > 0
+        if not has_index:
+            await conn.execute(text(ADD_INDEX))
+        return
+    await conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON CUSTOMER_CHAT_MESSAGES (USER_KEY, CREATED_AT, ID)"
+    ))
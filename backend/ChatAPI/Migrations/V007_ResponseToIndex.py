@@ -0,0 +1,25 @@
+"""
+Adds an index on CUSTOMER_CHAT_MESSAGES.RESPONSE_TO. The ai_response consumer
+looks up the request_ids of each batch there so a replayed reply is not
+written twice.
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+DESCRIPTION = "Add IX_CUSTOMER_CHAT_MESSAGES_RESPONSE_TO"
+
+INDEX_NAME = "IX_CUSTOMER_CHAT_MESSAGES_RESPONSE_TO"
+
+
+async def Upgrade(conn: AsyncConnection):
+    if conn.dialect.name == "mysql":
+        has_index = (await conn.execute(text(
+            "SELECT COUNT(*) FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'CUSTOMER_CHAT_MESSAGES' AND INDEX_NAME = :name"
+        ), {"name": INDEX_NAME})).scalar() > 0
+        if not has_index:
+            await conn.execute(text(
+                f"ALTER TABLE CUSTOMER_CHAT_MESSAGES ADD INDEX {INDEX_NAME} (RESPONSE_TO), ALGORITHM=INPLACE, LOCK=NONE"
+            ))
+        return
+    await conn.execute(text(f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON CUSTOMER_CHAT_MESSAGES (RESPONSE_TO)"))
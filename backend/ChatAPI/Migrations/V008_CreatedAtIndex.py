@@ -0,0 +1,25 @@
+"""
+Adds an index on CUSTOMER_CHAT_MESSAGES.CREATED_AT. The archiver picks rows
+older than its cutoff in (CREATED_AT, ID) order across all users; InnoDB
+appends the ID to the index, so that is a range scan.
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+DESCRIPTION = "Add IX_CUSTOMER_CHAT_MESSAGES_CREATED_AT"
+
+INDEX_NAME = "IX_CUSTOMER_CHAT_MESSAGES_CREATED_AT"
+
+
+async def Upgrade(conn: AsyncConnection):
+    if conn.dialect.name == "mysql":
+        has_index = (await conn.execute(text(
+            "SELECT COUNT(*) FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'CUSTOMER_CHAT_MESSAGES' AND INDEX_NAME = :name"
+        ), {"name": INDEX_NAME})).scalar() > 0
+        if not has_index:
+            await conn.execute(text(
+                f"ALTER TABLE CUSTOMER_CHAT_MESSAGES ADD INDEX {INDEX_NAME} (CREATED_AT), ALGORITHM=INPLACE, LOCK=NONE"
+            ))
+        return
+    await conn.execute(text(f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON CUSTOMER_CHAT_MESSAGES (CREATED_AT)"))
@@ -0,0 +1,25 @@
+"""
+Widens CUSTOMER_CHAT_MESSAGES.CREATED_AT to DATETIME(6). History, context and
+the archiver order by (CREATED_AT, ID); with whole seconds a question and its
+reply written in the same second tie, and IDs from per-process blocks do not
+break the tie in time order. Rows written before keep .000000.
+
+Changing the column type copies the table and blocks writes while it runs; on
+a large table apply it in a maintenance window. SQLite keeps the microseconds
+it is given, so there is nothing to do there.
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+DESCRIPTION = "Change CUSTOMER_CHAT_MESSAGES.CREATED_AT to DATETIME(6)"
+
+
+async def Upgrade(conn: AsyncConnection):
+    if conn.dialect.name != "mysql":
+        return
+    precision = (await conn.execute(text(
+        "SELECT DATETIME_PRECISION FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'CUSTOMER_CHAT_MESSAGES' AND COLUMN_NAME = 'CREATED_AT'"
+    ))).scalar()
+    if precision is not None and precision < 6:
+        await conn.execute(text("ALTER TABLE CUSTOMER_CHAT_MESSAGES MODIFY COLUMN CREATED_AT DATETIME(6) NULL"))
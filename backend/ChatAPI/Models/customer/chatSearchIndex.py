@@ -0,0 +1,21 @@
+from sqlalchemy import Table, Column, Integer, SmallInteger, String
+from Config.dbConnection import meta
+
+# Inverted index over CUSTOMER_CHAT_MESSAGES.MESSAGE, scoped by user (Services/SearchIndex)
+chatSearchPostings = Table(
+    "CHAT_SEARCH_POSTINGS", meta,
+    Column("USER_KEY", String(500), primary_key=True),
+    Column("TERM", String(64), primary_key=True),
+    Column("MESSAGE_ID", Integer, primary_key=True, autoincrement=False),
+    Column("TF", SmallInteger, nullable=False),
+    # Copied from CHAT_SEARCH_DOCS so ranking needs no join
+    Column("DOC_LENGTH", SmallInteger, nullable=False),
+)
+
+# One row per indexed message; per-user document count and average length for ranking
+chatSearchDocs = Table(
+    "CHAT_SEARCH_DOCS", meta,
+    Column("USER_KEY", String(500), primary_key=True),
+    Column("MESSAGE_ID", Integer, primary_key=True, autoincrement=False),
+    Column("LENGTH", Integer, nullable=False),
+)
@@ -1,16 +1,26 @@
-from sqlalchemy import Boolean, Table, Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Boolean, Table, Column, Integer, String, DateTime, Text, Computed, Index
+from sqlalchemy.dialects.mysql import DATETIME
 from datetime import datetime
-from Config.dbConnection import meta, engine
+from Config.dbConnection import meta
 
 customerChatMessages = Table(
     "CUSTOMER_CHAT_MESSAGES", meta,
     Column("ID", Integer, primary_key=True, autoincrement=False),
     Column("USER", String(500)),
     Column("MESSAGE", Text),
-    Column("CREATED_AT", DateTime, default=datetime.now),
+    # Microseconds (V009): messages of one second would otherwise tie and fall back to ID order
+    Column("CREATED_AT", DateTime().with_variant(DATETIME(fsp=6), "mysql"), default=datetime.now),
     Column("IS_BOT", Boolean), 
-    Column("RESPONSE_TO", Integer, ForeignKey("CUSTOMER_CHAT_MESSAGES.ID")),
+    # No foreign key (V003): a question can move to the archive before its reply
+    Column("RESPONSE_TO", Integer),
+    # Normalized user for indexed history lookups; virtual so adding it needs no table rebuild
+    Column("USER_KEY", String(500), Computed("LOWER(`USER`)", persisted=False)),
+    Index("IX_CUSTOMER_CHAT_MESSAGES_USER_KEY_ID", "USER_KEY", "ID"),
+    # IDs come from per-process blocks, so history is ordered by (CREATED_AT, ID) instead
+    Index("IX_CUSTOMER_CHAT_MESSAGES_USER_KEY_CREATED_AT_ID", "USER_KEY", "CREATED_AT", "ID"),
+    # Replayed ai_response messages are checked against the replies already written
+    Index("IX_CUSTOMER_CHAT_MESSAGES_RESPONSE_TO", "RESPONSE_TO"),
+    # The archiver selects rows older than its cutoff across all users
+    Index("IX_CUSTOMER_CHAT_MESSAGES_CREATED_AT", "CREATED_AT"),
 )
 
-
-meta.create_all(bind=engine)
@@ -1,5 +1,5 @@
-
 from .customer.customerChatMessages import customerChatMessages
+from .customer.chatSearchIndex import chatSearchPostings, chatSearchDocs
 
 from .system.systemLogError import systemLogError
 from .system.systemTableSl import systemTableSl
\ No newline at end of file
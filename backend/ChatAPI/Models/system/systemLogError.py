@@ -1,5 +1,5 @@
 from sqlalchemy import Table, Column, Integer, String, DateTime
-from Config.dbConnection import meta, engine
+from Config.dbConnection import meta
 
 systemLogError = Table(
     "SYSTEM_LOG_ERROR", meta,
@@ -10,6 +10,3 @@ systemLogError = Table(
     Column("MODULE_NAME", String(100)),
     Column("CREATED_BY", String(100))
 )
-
-
-meta.create_all(bind=engine)
\ No newline at end of file
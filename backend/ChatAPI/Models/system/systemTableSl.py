@@ -1,5 +1,5 @@
 from sqlalchemy import Table, Column, String, Integer
-from Config.dbConnection import meta, engine
+from Config.dbConnection import meta
 
 systemTableSl = Table(
     "SYSTEM_TABLE_SL", meta,
@@ -7,5 +7,3 @@ systemTableSl = Table(
     Column("TABLE_SL", Integer, nullable=False, default=1)
 )
 
-# Create the table in the DB
-meta.create_all(bind=engine)
@@ -5,8 +5,9 @@ import httpx
 from Schemas.shared import SystemLogErrorSchema, StatusResult, GoogleAuthRequest
 from Services.CommonServices import GetErrorMessage
 from Services.LogServices import AddLogOrError
-
-CHAT_AUTH_URL = "http://chatauth:1001"
+from Services.AuthCache import GetTokenHash
+from Services.VerifyAuth import InvalidateToken
+from Services.ChatAuthClient import RequestChatAuth
 
 ChatAuthRoutes = APIRouter(prefix="/Auth")
 
@@ -14,21 +15,21 @@ ChatAuthRoutes = APIRouter(prefix="/Auth")
 async def login(request: GoogleAuthRequest):
     status = StatusResult()
     try:
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    f"{CHAT_AUTH_URL}/GoogleAuth/Login",
-                    json={"token": request.token}
-                )
-                if response.status_code == 200:
-                    result = response.json()
-                    status.Status = "OK"
-                    status.Message = None
-                    status.Result = result
-                else:
-                    raise ValueError("Authentication failed")
-            except httpx.RequestError:
-                raise ValueError("Authentication service unavailable")
+        try:
+            response = await RequestChatAuth(
+                "POST",
+                "/GoogleAuth/Login",
+                json={"token": request.token}
+            )
+            if response.status_code == 200:
+                result = response.json()
+                status.Status = "OK"
+                status.Message = None
+                status.Result = result
+            else:
+                raise ValueError("Authentication failed")
+        except httpx.RequestError:
+            raise ValueError("Authentication service unavailable")
     except Exception as ex:
         error_msg = f"{str(ex)}\n{traceback.format_exc()}"
         await AddLogOrError(SystemLogErrorSchema(
@@ -45,20 +46,23 @@ async def login(request: GoogleAuthRequest):
 async def logout(request:Request):
     status = StatusResult()
     try:
-        async with httpx.AsyncClient() as client:
-            try:
-                token = request.headers.get("Authorization")
-                if token:
-                    response = await client.post(
-                        f"{CHAT_AUTH_URL}/GoogleAuth/Logout",
-                        headers={"Authorization": token}
-                    )
-                    result = response.json()
-                status.Status = "OK"
-                status.Message = None
-                status.Result = None
-            except httpx.RequestError:
-                raise ValueError("Authentication service unavailable")
+        try:
+            token = request.headers.get("Authorization")
+            if token:
+                # Dropped here first so a failed call or reply cannot leave it cached;
+                # ChatAuth tells the other replicas (auth_invalidation)
+                InvalidateToken(GetTokenHash(token.split(" ", 1)[-1]))
+                response = await RequestChatAuth(
+                    "POST",
+                    "/GoogleAuth/Logout",
+                    headers={"Authorization": token}
+                )
+                result = response.json()
+            status.Status = "OK"
+            status.Message = None
+            status.Result = None
+        except httpx.RequestError:
+            raise ValueError("Authentication service unavailable")
     except Exception as ex:
         error_msg = f"{str(ex)}\n{traceback.format_exc()}"
         await AddLogOrError(SystemLogErrorSchema(
@@ -1,25 +1,95 @@
+import asyncio
 from datetime import datetime
+import os
 import traceback
-from typing import Optional
-from fastapi import APIRouter, Depends
-from sqlalchemy import desc, func, select
+from typing import Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import and_, desc, or_, select
 from Models.shared import customerChatMessages
 from Schemas.shared import SystemLogErrorSchema, StatusResult, CustomerChatMessageSchema, ChatRequestSchema
-from Services.CommonServices import GetErrorMessage, GetTableSl
+from Services.CommonServices import GetErrorMessage, GetTableSl, GetUserKey
 from Services.KafkaMessageProducer import SendMessage
 from Services.LogServices import AddLogOrError
-from Services.GenericCRUDServices import GenericInserter
+from Services.BatchInserter import chatMessageInserter
+from Services.ChatArchive import chatArchive, CHAT_ARCHIVE_ENABLED
+from Services.ConversationContext import contextBuilder
+from Services.HistoryCache import historyCache
+from Services.Instrumentation import Timed
+from Services.RateLimiter import AdmitAIRequest, EnforceUserRateLimit, ReleaseAIRequest
+from Services.SearchIndex import searchIndexer, SearchUserMessages
+from Services.ResponseCache import responseCache, ContextDigest, RESPONSE_CACHE_ENABLED
+from Services.WebSocketDelivery import DeliverToUser, ShareMessage
 from Services.VerifyAuth import GetCurrentUser
 from sqlalchemy.ext.asyncio import AsyncSession
 from Config.dbConnection import AsyncSessionLocalChatBot
 
+CHAT_HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "10"))
+CHAT_HISTORY_MAX_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_MAX_PAGE_SIZE", "100"))
+CHAT_SEARCH_PAGE_SIZE = int(os.getenv("CHAT_SEARCH_PAGE_SIZE", "10"))
+
 ChatRoutes = APIRouter(prefix="/Chat")
 
+@Timed("context_build")
+async def _BuildContext(user_key: str) -> list:
+    try:
+        return await contextBuilder.Build(user_key)
+    except Exception as ex:
+        # The message still goes out, only without context
+        error_msg = f"{str(ex)}\n{traceback.format_exc()}"
+        await AddLogOrError(SystemLogErrorSchema(
+            Msg=error_msg,
+            Type="ERROR",
+            ModuleName="ChatRoutes/_BuildContext",
+            CreatedBy=user_key
+        ))
+        return []
+
+@Timed("archive_read")
+async def _ReadArchivedHistory(user_key: str, before: Optional[Tuple[datetime, int]], limit: int) -> list:
+    rows = await asyncio.to_thread(chatArchive.ReadUserPage, user_key, before, limit)
+    return [CustomerChatMessageSchema(**row) for row in rows]
+
+async def _HistoryCursor(db_session: AsyncSession, user_key: str, previous_id: int) -> Optional[Tuple[datetime, int]]:
+    """(CREATED_AT, ID) of the message the client paged back from, from either tier."""
+    c = customerChatMessages.c
+    row = (await db_session.execute(
+        select(c.CREATED_AT, c.ID).where(c.ID == previous_id, c.USER_KEY == user_key)
+    )).first()
+    if row is not None:
+        return row.CREATED_AT, row.ID
+    if CHAT_ARCHIVE_ENABLED and chatArchive.MayHoldBefore(None):
+        for archived in await asyncio.to_thread(chatArchive.ReadMessages, user_key, [previous_id]):
+            return archived["CREATED_AT"], archived["ID"]
+    return None
+
+async def _ReplyFromCache(user_key: str, question: CustomerChatMessageSchema, response: str):
+    # Same row and websocket payload ConsumeResponse would produce, without the model round trip
+    chat_response_msg = CustomerChatMessageSchema(
+        id= await GetTableSl("customerChatMessages"),
+        user=question.user,
+        message = response,
+        is_bot = True,
+        response_to = question.id,
+        created_at = datetime.now()
+    )
+    await chatMessageInserter.insert_record(chat_response_msg)
+    historyCache.Append(user_key, chat_response_msg)
+    contextBuilder.Append(user_key, chat_response_msg)
+    searchIndexer.Add(user_key, chat_response_msg)
+    await DeliverToUser(chat_response_msg.user, chat_response_msg.model_dump_json(), message=True)
+
 @ChatRoutes.post("/PostMessage")
-async def PostMessage(data: ChatRequestSchema, user: dict = Depends(GetCurrentUser))-> StatusResult:
+async def PostMessage(data: ChatRequestSchema, user: dict = Depends(EnforceUserRateLimit))-> StatusResult:
     status = StatusResult()
+    admitted_id = None
     try:
-        
+        user_key = GetUserKey(user.get("email"))
+        # Turns before this message; loaded from the DB only for a user not seen yet
+        context = await _BuildContext(user_key)
+        # Cached replies are keyed on the question and the turns before it
+        context_digest = ContextDigest(context)
+        cache_hit = responseCache.Lookup(data.message, context_digest) if RESPONSE_CACHE_ENABLED else None
+
         chat_response_msg = CustomerChatMessageSchema(
             id= await GetTableSl("customerChatMessages"),
             user=user.get("email"),
@@ -28,18 +98,29 @@ async def PostMessage(data: ChatRequestSchema, user: dict = Depends(GetCurrentUs
             response_to = None,
             created_at = datetime.now()
         )
-        await GenericInserter[CustomerChatMessageSchema].insert_record(
-            table=customerChatMessages,
-            schema_model=CustomerChatMessageSchema,
-            data=chat_response_msg,
-            returning_fields=[]
-        )
+        if cache_hit is None:
+            # Rejected with 429 before anything is written when the AI side is saturated
+            await AdmitAIRequest(chat_response_msg.id)
+            admitted_id = chat_response_msg.id
+
+        await chatMessageInserter.insert_record(chat_response_msg)
+        historyCache.Append(user_key, chat_response_msg)
+        contextBuilder.Append(user_key, chat_response_msg)
+        searchIndexer.Add(user_key, chat_response_msg)
+        await ShareMessage(chat_response_msg)
         
-        await SendMessage(chat_response_msg)
+        if cache_hit is None:
+            responseCache.Remember(chat_response_msg.id, chat_response_msg.message, context_digest)
+            await SendMessage(chat_response_msg, context, context_digest)
+        else:
+            await _ReplyFromCache(user_key, chat_response_msg, cache_hit.response)
         status.Status = "OK"
         status.Message = None
         status.Result = chat_response_msg
+    except HTTPException:
+        raise
     except Exception as ex:
+        await ReleaseAIRequest(admitted_id)
         error_msg = f"{str(ex)}\n{traceback.format_exc()}"
         await AddLogOrError(SystemLogErrorSchema(
             Msg=error_msg,
@@ -53,7 +134,7 @@ async def PostMessage(data: ChatRequestSchema, user: dict = Depends(GetCurrentUs
 
 
 @ChatRoutes.get("/ChatHistory")
-async def ChatHistory(previous_id: Optional[int] = None, user: dict = Depends(GetCurrentUser)) -> StatusResult:
+async def ChatHistory(previous_id: Optional[int] = None, page_size: Optional[int] = None, user: dict = Depends(GetCurrentUser)) -> StatusResult:
     status = StatusResult()
     db_session = None
     try:
@@ -63,9 +144,34 @@ async def ChatHistory(previous_id: Optional[int] = None, user: dict = Depends(Ge
             status.Message = "User not authenticated"
             return status
         
+        user_key = GetUserKey(user_id)
+        limit = min(max(1, page_size or CHAT_HISTORY_PAGE_SIZE), CHAT_HISTORY_MAX_PAGE_SIZE)
+        first_page = previous_id is None or previous_id <= 0
+
+        # Latest page of an active user comes straight from memory
+        cached = historyCache.GetLatestPage(user_key, limit) if first_page else None
+        if cached is not None:
+            status.Status = "OK"
+            status.Message = None
+            status.Result = {
+                "messages": cached,
+                "last_id": cached[0].id if cached else 0
+            }
+            return status
+
         db_session = AsyncSessionLocalChatBot()
         chatList = []
-        
+        before = None
+        if not first_page:
+            before = await _HistoryCursor(db_session, user_key, previous_id)
+            if before is None:
+                # The cursor message is not the caller's or no longer exists
+                status.Status = "OK"
+                status.Message = None
+                status.Result = {"messages": [], "last_id": 0}
+                return status
+
+        # Range scan on (USER_KEY, CREATED_AT, ID), newest first; IDs are not in time order across processes
         stmt = (
             select(
                 customerChatMessages.c.ID,
@@ -75,13 +181,16 @@ async def ChatHistory(previous_id: Optional[int] = None, user: dict = Depends(Ge
                 customerChatMessages.c.IS_BOT,
                 customerChatMessages.c.RESPONSE_TO
             )
-            .where(func.lower(customerChatMessages.c.USER) == user_id.lower())
-            .order_by(desc(customerChatMessages.c.ID))
-            .limit(10)
+            .where(customerChatMessages.c.USER_KEY == user_key)
+            .order_by(desc(customerChatMessages.c.CREATED_AT), desc(customerChatMessages.c.ID))
+            .limit(limit)
         )
 
-        if previous_id is not None and previous_id > 0:
-            stmt = stmt.where(customerChatMessages.c.ID < previous_id)
+        if before is not None:
+            stmt = stmt.where(or_(
+                customerChatMessages.c.CREATED_AT < before[0],
+                and_(customerChatMessages.c.CREATED_AT == before[0], customerChatMessages.c.ID < before[1])
+            ))
 
         result = await db_session.execute(stmt)
         rows = result.fetchall()
@@ -92,6 +201,24 @@ async def ChatHistory(previous_id: Optional[int] = None, user: dict = Depends(Ge
             chatList = [CustomerChatMessageSchema(**dict(row._mapping)) for row in reversed_rows]
         else:
             chatList = []
+
+        # Fewer rows than asked for: the rest of this page, if any, has moved to the archive
+        if chatList:
+            before = chatList[0].OrderKey()
+        if CHAT_ARCHIVE_ENABLED and len(chatList) < limit and chatArchive.MayHoldBefore(before):
+            try:
+                chatList = await _ReadArchivedHistory(user_key, before, limit - len(chatList)) + chatList
+            except Exception as ex:
+                # Serve what MySQL has rather than fail the whole page
+                await AddLogOrError(SystemLogErrorSchema(
+                    Msg=f"{str(ex)}\n{traceback.format_exc()}",
+                    Type="ERROR",
+                    ModuleName="ChatRoutes/ChatHistory",
+                    CreatedBy=user_id
+                ))
+
+        if first_page:
+            historyCache.Fill(user_key, chatList, complete=len(chatList) < limit)
         
         status.Status = "OK"
         status.Message = None
@@ -115,4 +242,40 @@ async def ChatHistory(previous_id: Optional[int] = None, user: dict = Depends(Ge
         if db_session:
             await db_session.close()
             
-    return status
\ No newline at end of file
+    return status
+
+
+@ChatRoutes.get("/Search")
+async def Search(q: str, page: int = 1, page_size: Optional[int] = None, user: dict = Depends(GetCurrentUser)) -> StatusResult:
+    status = StatusResult()
+    user_id = None
+    try:
+        user_id = user.get("email")
+        if not user_id:
+            status.Status = "FAILED"
+            status.Message = "User not authenticated"
+            return status
+
+        page = max(1, page)
+        limit = min(max(1, page_size or CHAT_SEARCH_PAGE_SIZE), CHAT_HISTORY_MAX_PAGE_SIZE)
+        total, hits = await SearchUserMessages(GetUserKey(user_id), q, page, limit)
+
+        status.Status = "OK"
+        status.Message = None
+        status.Result = {
+            "results": [{"message": message, "score": round(score, 4)} for message, score in hits],
+            "total": total,
+            "page": page,
+            "page_size": limit
+        }
+    except Exception as ex:
+        error_msg = f"{str(ex)}\n{traceback.format_exc()}"
+        await AddLogOrError(SystemLogErrorSchema(
+            Msg=error_msg,
+            Type="ERROR",
+            ModuleName="ChatRoutes/Search",
+            CreatedBy=user_id or ""
+        ))
+        status.Status = "FAILED"
+        status.Message = await GetErrorMessage(ex)
+    return status
@@ -0,0 +1,40 @@
+from typing import Optional
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+from Schemas.shared import StatusResult
+from Services.HealthServices import healthChecker
+from Services.MetricsServices import RenderMetrics
+from Services.Tracing import tracer
+
+MonitoringRoutes = APIRouter()
+
+@MonitoringRoutes.get("/metrics")
+async def Metrics():
+    return PlainTextResponse(RenderMetrics(), media_type="text/plain; version=0.0.4")
+
+@MonitoringRoutes.get("/health")
+async def health_check():
+    report = await healthChecker.Check()
+    return JSONResponse(report, status_code=200 if report["healthy"] else 503)
+
+@MonitoringRoutes.get("/Tracing/Stages")
+async def TracingStages(window_seconds: Optional[float] = None) -> StatusResult:
+    """Per-stage latency over the spans this node still holds, optionally only the last window_seconds."""
+    status = StatusResult()
+    status.Status = "OK"
+    status.Result = {
+        "stages": tracer.StageBreakdown(window_seconds),
+        "tracer": tracer.Stats()
+    }
+    return status
+
+@MonitoringRoutes.get("/Tracing/Trace/{trace_id}")
+async def TracingTrace(trace_id: str) -> StatusResult:
+    status = StatusResult()
+    spans = tracer.GetTrace(trace_id)
+    if spans:
+        status.Status = "OK"
+        status.Result = {"trace_id": trace_id, "spans": spans}
+    else:
+        status.Message = "Trace not found on this node; it may have been sampled out or evicted."
+    return status
@@ -1,16 +1,31 @@
-from fastapi import WebSocket, WebSocketDisconnect, APIRouter
-from typing import Dict
-from Config.dbConnection import ws_connections
+from fastapi import WebSocket, WebSocketDisconnect, APIRouter, Depends
+from Schemas.shared import StatusResult
 from Services.CommonServices import GetSha1Hash
+from Services.ConnectionManager import connectionManager
+from Services.VerifyAuth import GetCurrentUser
 
 WebSocketRoutes = APIRouter()
 
 @WebSocketRoutes.websocket("/initialize/{user}")
 async def websocket_initialization(websocket: WebSocket, user: str):
     await websocket.accept()
-    ws_connections[await GetSha1Hash(user)] = websocket
+    connection = connectionManager.Connect(await GetSha1Hash(user), websocket)
     try:
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
-        ws_connections.pop(await GetSha1Hash(user), None)
+        pass
+    finally:
+        await connectionManager.Disconnect(connection)
+
+@WebSocketRoutes.get("/WebSocket/Stats")
+async def websocket_stats(user: dict = Depends(GetCurrentUser)) -> StatusResult:
+    status = StatusResult()
+    status.Status = "OK"
+    status.Result = {
+        "connections": connectionManager.ConnectionCount(),
+        "users": connectionManager.UserCount(),
+        "max_queue_depth": connectionManager.MaxQueueDepth(),
+        "own_connections": connectionManager.Stats(await GetSha1Hash(user.get("email", "")))
+    }
+    return status
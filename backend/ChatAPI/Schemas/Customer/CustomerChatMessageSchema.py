@@ -10,6 +10,10 @@ class CustomerChatMessageSchema(BaseModel):
     is_bot: Optional[bool] = Field(False, alias="IS_BOT")
     response_to: Optional[int] = Field(None, alias="RESPONSE_TO") 
 
+    def OrderKey(self) -> tuple:
+        """Position in the conversation; IDs alone are not in time order across processes."""
+        return (self.created_at or datetime.min, self.id or 0)
+
     class Config:
         populate_by_name = True
         from_attributes = True
@@ -0,0 +1,92 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Tuple
+import jwt
+from Services.MetricsServices import GetCounter, GetGauge
+
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+AUTH_CACHE_MAX_TTL = float(os.getenv("AUTH_CACHE_MAX_TTL", "120"))
+AUTH_CACHE_NEGATIVE_TTL = float(os.getenv("AUTH_CACHE_NEGATIVE_TTL", "30"))
+
+authCacheLookups = GetCounter("chatapi_auth_cache_lookups_total", "Token verification cache lookups", ["result"])
+
+
+def GetTokenHash(token: str) -> str:
+    # Same key as ChatAuth's session store, so its auth_invalidation events match cache entries
+    return hashlib.sha1(token.encode('utf-8')).hexdigest()
+
+def GetTokenExpiry(token: str) -> Optional[datetime]:
+    # Only used to bound the cache TTL; ChatAuth remains the verifier
+    try:
+        payload = jwt.decode(token, options={"verify_signature": False})
+        expiry_date_str = payload.get("ExpiryDate")
+        return datetime.fromisoformat(expiry_date_str) if expiry_date_str else None
+    except Exception:
+        return None
+
+
+class TokenVerificationCache:
+    """
+    LRU cache of ChatAuth verification results keyed by token hash.
+
+    Valid tokens are kept until the earlier of their ExpiryDate and max_ttl.
+    Rejected tokens are cached for negative_ttl so repeated bad tokens do not
+    reach ChatAuth. Entries are evicted least-recently-used past max_entries.
+    """
+
+    def __init__(self, max_entries: int = AUTH_CACHE_MAX_ENTRIES, max_ttl: float = AUTH_CACHE_MAX_TTL, negative_ttl: float = AUTH_CACHE_NEGATIVE_TTL):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        # token hash -> (expires at monotonic, user or None for rejected tokens)
+        self._entries: "OrderedDict[str, Tuple[float, Optional[dict]]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def Get(self, token_hash: str) -> Tuple[bool, Optional[dict]]:
+        entry = self._entries.get(token_hash)
+        if entry is None:
+            authCacheLookups.inc(result="miss")
+            return False, None
+        expires_at, user = entry
+        if expires_at <= time.monotonic():
+            del self._entries[token_hash]
+            authCacheLookups.inc(result="miss")
+            return False, None
+        self._entries.move_to_end(token_hash)
+        authCacheLookups.inc(result="hit" if user is not None else "negative_hit")
+        return True, user
+
+    def PutValid(self, token_hash: str, user: dict, expiry: Optional[datetime] = None):
+        ttl = self.max_ttl
+        if expiry is not None:
+            ttl = min(ttl, (expiry - datetime.now()).total_seconds())
+        if ttl > 0:
+            self._Put(token_hash, time.monotonic() + ttl, user)
+
+    def PutInvalid(self, token_hash: str):
+        self._Put(token_hash, time.monotonic() + self.negative_ttl, None)
+
+    def Invalidate(self, token_hash: str):
+        self._entries.pop(token_hash, None)
+
+    def HitRatio(self) -> float:
+        hits = authCacheLookups.value(result="hit") + authCacheLookups.value(result="negative_hit")
+        total = hits + authCacheLookups.value(result="miss")
+        return hits / total if total else 0.0
+
+    def _Put(self, token_hash: str, expires_at: float, user: Optional[dict]):
+        self._entries[token_hash] = (expires_at, user)
+        self._entries.move_to_end(token_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+tokenCache = TokenVerificationCache()
+
+GetGauge("chatapi_auth_cache_hit_ratio", "Share of token verifications served from cache", callback=tokenCache.HitRatio)
+GetGauge("chatapi_auth_cache_entries", "Token verification cache entries", callback=lambda: len(tokenCache))
@@ -0,0 +1,215 @@
+import asyncio
+import os
+import time
+import traceback
+from typing import Generic, List, Optional, Tuple, TypeVar
+from pydantic import BaseModel
+from sqlalchemy import Table, insert
+from Config.dbConnection import AsyncSessionLocalChatBot
+from Models.shared import customerChatMessages
+from Schemas.shared import SystemLogErrorSchema, CustomerChatMessageSchema
+from Services.GenericCRUDServices import GenericInserter
+from Services.Instrumentation import Timed
+from Services.LogServices import AddLogOrError
+from Services.MetricsServices import GetCounter, GetHistogram, GetGauge, DEFAULT_SIZE_BUCKETS
+
+CHAT_INSERT_BATCH_SIZE = int(os.getenv("CHAT_INSERT_BATCH_SIZE", "200"))
+CHAT_INSERT_MAX_WAIT_MS = float(os.getenv("CHAT_INSERT_MAX_WAIT_MS", "5"))
+CHAT_INSERT_QUEUE_SIZE = int(os.getenv("CHAT_INSERT_QUEUE_SIZE", "10000"))
+
+T = TypeVar('T', bound=BaseModel)
+
+insertBatchSize = GetHistogram("chatapi_insert_batch_size", "Rows written per multi-row INSERT", ["table"], buckets=DEFAULT_SIZE_BUCKETS)
+insertFlushLatency = GetHistogram("chatapi_insert_flush_seconds", "Time spent writing and committing one batch", ["table"])
+insertRows = GetCounter("chatapi_insert_rows_total", "Rows written by the batch inserter", ["table", "result"])
+insertQueueDepth = GetGauge("chatapi_insert_queue_depth", "Rows waiting for the next flush", ["table"])
+
+
+class BatchInserter(Generic[T]):
+    """
+    Write-behind inserter that coalesces concurrent inserts into multi-row INSERTs.
+
+    Callers await insert_record as before; it resolves only after the batch holding
+    their row has been committed. A batch is flushed once it reaches max_batch_size
+    rows or max_wait_ms after its first row arrived. The queue is bounded, so callers
+    wait (backpressure) when the DB falls behind.
+    """
+
+    def __init__(
+        self,
+        table: Table,
+        schema_model: type,
+        max_batch_size: int = CHAT_INSERT_BATCH_SIZE,
+        max_wait_ms: float = CHAT_INSERT_MAX_WAIT_MS,
+        max_queue_size: int = CHAT_INSERT_QUEUE_SIZE
+    ):
+        self.table = table
+        self.schema_model = schema_model
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_queue_size = max_queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher_task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    @property
+    def running(self) -> bool:
+        return self._flusher_task is not None and not self._flusher_task.done() and not self._closing
+
+    async def Start(self):
+        if self.running:
+            return
+        self._closing = False
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._flusher_task = asyncio.create_task(self._RunFlusher())
+
+    async def Stop(self):
+        if not self.running:
+            return
+        self._closing = True
+        await self._queue.put(None)
+        await self._flusher_task
+        self._flusher_task = None
+
+    @Timed("db_insert")
+    async def insert_record(self, data: T) -> None:
+        if not self.running:
+            # Not started (scripts) or draining: write directly
+            await self._InsertDirect(data)
+            return
+
+        flusher = self._flusher_task
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((data.model_dump(exclude_unset=True, by_alias=True), future))
+        insertQueueDepth.set(self._queue.qsize(), table=self.table.name)
+        if flusher.done() and not future.done():
+            # The flusher exited while this call waited for queue space; nothing will flush the row
+            await self._InsertDirect(data)
+            return
+        await future
+
+    async def _InsertDirect(self, data: T):
+        await GenericInserter[T].insert_record(
+            table=self.table,
+            schema_model=self.schema_model,
+            data=data,
+            returning_fields=[]
+        )
+
+    async def _RunFlusher(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        batch = []
+        try:
+            while not stopping:
+                item = await self._queue.get()
+                if item is None:
+                    break
+
+                batch = [item]
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    try:
+                        item = self._queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        timeout = deadline - loop.time()
+                        if timeout <= 0:
+                            break
+                        try:
+                            item = await asyncio.wait_for(self._queue.get(), timeout)
+                        except asyncio.TimeoutError:
+                            break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+
+                insertQueueDepth.set(self._queue.qsize(), table=self.table.name)
+                await self._Flush(batch)
+                batch = []
+
+            # Drain whatever was queued behind the stop marker
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is not None:
+                    batch.append(item)
+            for start in range(0, len(batch), self.max_batch_size):
+                await self._Flush(batch[start:start + self.max_batch_size])
+            batch = []
+        except Exception as ex:
+            # Later callers write directly instead of queueing behind a dead flusher
+            self._closing = True
+            await AddLogOrError(SystemLogErrorSchema(
+                Msg=f"{str(ex)}\n{traceback.format_exc()}",
+                Type="ERROR",
+                ModuleName="BatchInserter/_RunFlusher",
+                CreatedBy=""
+            ))
+        finally:
+            # However the flusher exits, no caller is left waiting on a row it will never write
+            self._FailPending(batch, RuntimeError(f"Batch inserter for {self.table.name} stopped before the row was written"))
+
+    def _FailPending(self, batch: List[Tuple[dict, asyncio.Future]], error: Exception):
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                batch.append(item)
+        failed = 0
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+                failed += 1
+        if failed:
+            insertRows.inc(failed, table=self.table.name, result="failed")
+        insertQueueDepth.set(0, table=self.table.name)
+
+    async def _Flush(self, batch: List[Tuple[dict, asyncio.Future]]):
+        started = time.perf_counter()
+        try:
+            await self._WriteRows([row for row, _ in batch])
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+            insertRows.inc(len(batch), table=self.table.name, result="ok")
+        except Exception as ex:
+            await AddLogOrError(SystemLogErrorSchema(
+                Msg=f"{str(ex)}\n{traceback.format_exc()}",
+                Type="ERROR",
+                ModuleName="BatchInserter/_Flush",
+                CreatedBy=""
+            ))
+            # Retry row by row so one bad row does not fail the whole batch
+            for row, future in batch:
+                try:
+                    await self._WriteRows([row])
+                    if not future.done():
+                        future.set_result(None)
+                    insertRows.inc(table=self.table.name, result="ok")
+                except Exception as row_ex:
+                    if not future.done():
+                        future.set_exception(ValueError(f"Database insert failed: {str(row_ex)}"))
+                    insertRows.inc(table=self.table.name, result="failed")
+        finally:
+            insertBatchSize.observe(len(batch), table=self.table.name)
+            insertFlushLatency.observe(time.perf_counter() - started, table=self.table.name)
+
+    async def _WriteRows(self, rows: List[dict]):
+        # Multi-row VALUES needs the same columns on every row
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(row.keys()), []).append(row)
+
+        async with AsyncSessionLocalChatBot() as session:
+            try:
+                for group in groups.values():
+                    await session.execute(insert(self.table).values(group))
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+
+chatMessageInserter = BatchInserter[CustomerChatMessageSchema](
+    table=customerChatMessages,
+    schema_model=CustomerChatMessageSchema
+)
@@ -19,4 +19,23 @@ async def sp_get_table_sl(conn, table_nm: str) -> int | None:
             ModuleName="CallChatBotSPServices/sp_get_table_sl",
             CreatedBy=""
         ))
-        return None
\ No newline at end of file
+        return None
+
+async def sp_get_table_sl_block(conn, table_nm: str, block_size: int) -> tuple[int, int] | None:
+    try:
+        result = await conn.execute(
+            text("CALL CHATBOT_GetTableSlBlock(:table_nm, :block_size)"),
+            {"table_nm": table_nm, "block_size": block_size}
+        )
+        row = result.fetchone()
+        return (row.output_start_sl, row.output_end_sl) if row else None
+
+    except Exception as ex:
+        error_msg = f"{str(ex)}\n{traceback.format_exc()}"
+        await AddLogOrError(SystemLogErrorSchema(
+            Msg=error_msg,
+            Type="ERROR",
+            ModuleName="CallChatBotSPServices/sp_get_table_sl_block",
+            CreatedBy=""
+        ))
+        return None
@@ -0,0 +1,253 @@
+"""
+Cold tier of CUSTOMER_CHAT_MESSAGES: Parquet files written by
+Workers/ChatArchiver and read by ChatHistory once a user pages past the rows
+still in MySQL.
+
+Each file holds one chunk of rows, sorted by (USER_KEY, CREATED_AT, ID) and
+compressed per column, so a user's messages sit in one or two row groups
+whose USER_KEY min/max statistics rule out the rest. Pages are cut on
+(CREATED_AT, ID) like ChatHistory, since IDs are not in time order across
+processes. manifest.json lists the files with their ID and CREATED_AT ranges,
+and whether their rows are deleted from MySQL yet; it is replaced atomically
+after a file is complete, so readers never see a partial file.
+CHAT_ARCHIVE_DIR must be shared by every ChatAPI replica and the archiver.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from Services.MetricsServices import GetCounter
+
+CHAT_ARCHIVE_ENABLED = os.getenv("CHAT_ARCHIVE_ENABLED", "true").lower() == "true"
+CHAT_ARCHIVE_DIR = os.getenv("CHAT_ARCHIVE_DIR", "/app/archive")
+CHAT_ARCHIVE_COMPRESSION = os.getenv("CHAT_ARCHIVE_COMPRESSION", "zstd")
+CHAT_ARCHIVE_ROW_GROUP_ROWS = int(os.getenv("CHAT_ARCHIVE_ROW_GROUP_ROWS", "2048"))
+CHAT_ARCHIVE_METADATA_CACHE = int(os.getenv("CHAT_ARCHIVE_METADATA_CACHE", "1024"))
+MANIFEST_NAME = "manifest.json"
+
+MESSAGE_COLUMNS = ["ID", "USER", "MESSAGE", "CREATED_AT", "IS_BOT", "RESPONSE_TO"]
+
+archiveRowGroupsRead = GetCounter("chatapi_archive_row_groups_read_total", "Archive row groups read for ChatHistory")
+
+
+def _Schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("ID", pa.int64()),
+        ("USER", pa.string()),
+        ("USER_KEY", pa.string()),
+        ("MESSAGE", pa.string()),
+        ("CREATED_AT", pa.timestamp("us")),
+        ("IS_BOT", pa.bool_()),
+        ("RESPONSE_TO", pa.int64())
+    ])
+
+
+def _RowOrderKey(row: dict) -> tuple:
+    return (row["CREATED_AT"] or datetime.min, row["ID"])
+
+
+class ArchiveFile(NamedTuple):
+    name: str
+    first_id: int
+    last_id: int
+    rows: int
+    bytes: int
+    created_at: str
+    # Oldest and newest CREATED_AT in the file, ISO format
+    first_at: str
+    last_at: str
+    # Set once the file's rows are gone from MySQL; until then the archiver deletes them by ID
+    deleted: bool = False
+
+    def Holds(self, before: Optional[Tuple[datetime, int]]) -> bool:
+        """Whether the file may hold a message older than the (CREATED_AT, ID) cursor."""
+        return before is None or datetime.fromisoformat(self.first_at) <= before[0]
+
+
+class _FileIndex(NamedTuple):
+    metadata: object
+    # (min USER_KEY, max USER_KEY, min CREATED_AT) per row group
+    row_groups: List[tuple]
+
+
+class ChatArchive:
+    def __init__(self, archive_dir: str = CHAT_ARCHIVE_DIR, metadata_cache: int = CHAT_ARCHIVE_METADATA_CACHE):
+        self.archive_dir = archive_dir
+        self.metadata_cache = metadata_cache
+        self.files: List[ArchiveFile] = []
+        self._manifest_mtime: Optional[float] = None
+        self._indexes: "OrderedDict[str, _FileIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _Path(self, name: str) -> str:
+        return os.path.join(self.archive_dir, name)
+
+    def Reload(self):
+        """Rereads manifest.json when the archiver has replaced it."""
+        try:
+            mtime = os.stat(self._Path(MANIFEST_NAME)).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._manifest_mtime:
+            return
+        with open(self._Path(MANIFEST_NAME)) as file:
+            manifest = json.load(file)
+        with self._lock:
+            self.files = sorted((ArchiveFile(**entry) for entry in manifest["files"]), key=lambda entry: entry.last_at, reverse=True)
+            self._manifest_mtime = mtime
+
+    def MayHoldBefore(self, before: Optional[Tuple[datetime, int]]) -> bool:
+        """Cheap check (one stat) for whether any archived message is older than the (CREATED_AT, ID) cursor."""
+        self.Reload()
+        return any(entry.Holds(before) for entry in self.files)
+
+    def WriteChunk(self, rows: List[dict]) -> ArchiveFile:
+        """Writes rows (with USER_KEY and CREATED_AT) to a new file; not visible until Commit."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        os.makedirs(self.archive_dir, exist_ok=True)
+        first_id, last_id = min(row["ID"] for row in rows), max(row["ID"] for row in rows)
+        times = [row["CREATED_AT"] for row in rows if row["CREATED_AT"] is not None] or [datetime.min]
+        # A row lives in one file only, so its smallest ID names the file uniquely
+        name = f"messages-{first_id:012d}-{last_id:012d}.parquet"
+        table = pa.Table.from_pylist(sorted(rows, key=lambda row: (row["USER_KEY"] or "", row["CREATED_AT"] or datetime.min, row["ID"])), schema=_Schema())
+        temp_path = self._Path(name + ".tmp")
+        pq.write_table(table, temp_path, compression=CHAT_ARCHIVE_COMPRESSION, row_group_size=CHAT_ARCHIVE_ROW_GROUP_ROWS)
+        os.replace(temp_path, self._Path(name))
+        return ArchiveFile(
+            name, first_id, last_id, len(rows), os.path.getsize(self._Path(name)), datetime.now().isoformat(timespec="seconds"),
+            min(times).isoformat(timespec="microseconds"), max(times).isoformat(timespec="microseconds")
+        )
+
+    def Commit(self, archive_file: ArchiveFile):
+        """Adds a written file to the manifest, making its rows readable."""
+        self.Reload()
+        self._WriteManifest([entry for entry in self.files if entry.name != archive_file.name] + [archive_file])
+
+    def MarkDeleted(self, names: List[str]):
+        """Records that the rows of these files are no longer in MySQL."""
+        self.Reload()
+        names = set(names)
+        self._WriteManifest([entry._replace(deleted=True) if entry.name in names else entry for entry in self.files])
+
+    def _WriteManifest(self, files: List[ArchiveFile]):
+        manifest = {"files": [entry._asdict() for entry in sorted(files, key=lambda entry: entry.first_id)]}
+        temp_path = self._Path(MANIFEST_NAME + ".tmp")
+        with open(temp_path, "w") as file:
+            json.dump(manifest, file, indent=1)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self._Path(MANIFEST_NAME))
+        # Not Reload: two writes within one mtime tick would look unchanged
+        with self._lock:
+            self.files = sorted(files, key=lambda entry: entry.last_at, reverse=True)
+            self._manifest_mtime = os.stat(self._Path(MANIFEST_NAME)).st_mtime_ns
+
+    def _Index(self, name: str) -> _FileIndex:
+        with self._lock:
+            index = self._indexes.get(name)
+            if index is not None:
+                self._indexes.move_to_end(name)
+                return index
+        import pyarrow.parquet as pq
+        metadata = pq.read_metadata(self._Path(name))
+        names = metadata.schema.names
+        user_key, created_at = names.index("USER_KEY"), names.index("CREATED_AT")
+        row_groups = []
+        for i in range(metadata.num_row_groups):
+            group = metadata.row_group(i)
+            keys, times = group.column(user_key).statistics, group.column(created_at).statistics
+            if keys is None or not keys.has_min_max:
+                row_groups.append((None, None, None))
+            else:
+                row_groups.append((keys.min, keys.max, times.min if times is not None and times.has_min_max else None))
+        index = _FileIndex(metadata, row_groups)
+        with self._lock:
+            self._indexes[name] = index
+            while len(self._indexes) > self.metadata_cache:
+                self._indexes.popitem(last=False)
+        return index
+
+    def ReadUserPage(self, user_key: str, before: Optional[Tuple[datetime, int]], limit: int) -> List[dict]:
+        """
+        Up to limit of the user's archived messages older than the (CREATED_AT, ID)
+        cursor before, newest page oldest first. Blocking; callers run it in a thread.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+        self.Reload()
+        found: List[dict] = []
+        for archive_file in self.files:
+            if not archive_file.Holds(before):
+                continue
+            # Files come newest first; once the page is full, a file ending before its oldest row cannot change it
+            if len(found) >= limit and datetime.fromisoformat(archive_file.last_at) < found[-limit]["CREATED_AT"]:
+                continue
+            index = self._Index(archive_file.name)
+            groups = [
+                i for i, (min_key, max_key, min_at) in enumerate(index.row_groups)
+                if min_key is None or (min_key <= user_key <= max_key and (before is None or min_at is None or min_at <= before[0]))
+            ]
+            if not groups:
+                continue
+            archiveRowGroupsRead.inc(len(groups))
+            table = pq.ParquetFile(self._Path(archive_file.name), metadata=index.metadata).read_row_groups(groups, columns=MESSAGE_COLUMNS + ["USER_KEY"])
+            mask = pc.equal(table["USER_KEY"], user_key)
+            if before is not None:
+                before_at = pa.scalar(before[0], pa.timestamp("us"))
+                older = pc.or_(
+                    pc.less(table["CREATED_AT"], before_at),
+                    pc.and_(pc.equal(table["CREATED_AT"], before_at), pc.less(table["ID"], before[1]))
+                )
+                mask = pc.and_(mask, older)
+            found.extend(table.filter(mask).select(MESSAGE_COLUMNS).to_pylist())
+            found.sort(key=_RowOrderKey)
+        return found[-limit:]
+
+    def ReadMessages(self, user_key: str, ids: List[int]) -> List[dict]:
+        """The user's archived messages with the given IDs, in no particular order. Blocking."""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+        self.Reload()
+        wanted = set(ids)
+        found: List[dict] = []
+        for archive_file in self.files:
+            file_ids = [message_id for message_id in wanted if archive_file.first_id <= message_id <= archive_file.last_id]
+            if not file_ids:
+                continue
+            index = self._Index(archive_file.name)
+            groups = [i for i, (min_key, max_key, _) in enumerate(index.row_groups) if min_key is None or min_key <= user_key <= max_key]
+            if not groups:
+                continue
+            archiveRowGroupsRead.inc(len(groups))
+            table = pq.ParquetFile(self._Path(archive_file.name), metadata=index.metadata).read_row_groups(groups, columns=MESSAGE_COLUMNS + ["USER_KEY"])
+            mask = pc.and_(pc.equal(table["USER_KEY"], user_key), pc.is_in(table["ID"], value_set=pa.array(file_ids, pa.int64())))
+            rows = table.filter(mask).select(MESSAGE_COLUMNS).to_pylist()
+            found.extend(rows)
+            wanted.difference_update(row["ID"] for row in rows)
+            if not wanted:
+                break
+        return found
+
+    def ReadFile(self, name: str, columns: List[str], user_key: Optional[str] = None) -> List[dict]:
+        """Every row of one archive file, optionally for one user only. Blocking."""
+        import pyarrow.parquet as pq
+        filters = [("USER_KEY", "=", user_key)] if user_key is not None else None
+        return pq.read_table(self._Path(name), columns=columns, filters=filters).to_pylist()
+
+    def Stats(self) -> Dict[str, int]:
+        self.Reload()
+        return {
+            "files": len(self.files),
+            "rows": sum(entry.rows for entry in self.files),
+            "bytes": sum(entry.bytes for entry in self.files),
+            "pending_delete": sum(1 for entry in self.files if not entry.deleted)
+        }
+
+
+chatArchive = ChatArchive()
@@ -0,0 +1,170 @@
+import asyncio
+import os
+import random
+import time
+from typing import Optional
+import httpx
+from Services.MetricsServices import GetCounter, GetGauge, GetHistogram
+
+CHAT_AUTH_URL = os.getenv("CHAT_AUTH_URL", "http://chatauth:1001")
+CHAT_AUTH_MAX_CONNECTIONS = int(os.getenv("CHAT_AUTH_MAX_CONNECTIONS", "100"))
+CHAT_AUTH_MAX_KEEPALIVE = int(os.getenv("CHAT_AUTH_MAX_KEEPALIVE", "20"))
+CHAT_AUTH_HTTP2 = os.getenv("CHAT_AUTH_HTTP2", "true").lower() == "true"
+CHAT_AUTH_CONNECT_TIMEOUT = float(os.getenv("CHAT_AUTH_CONNECT_TIMEOUT", "2"))
+CHAT_AUTH_READ_TIMEOUT = float(os.getenv("CHAT_AUTH_READ_TIMEOUT", "5"))
+CHAT_AUTH_RETRIES = int(os.getenv("CHAT_AUTH_RETRIES", "2"))
+CHAT_AUTH_RETRY_BACKOFF = float(os.getenv("CHAT_AUTH_RETRY_BACKOFF", "0.1"))
+CHAT_AUTH_BREAKER_THRESHOLD = int(os.getenv("CHAT_AUTH_BREAKER_THRESHOLD", "5"))
+CHAT_AUTH_BREAKER_COOLDOWN = float(os.getenv("CHAT_AUTH_BREAKER_COOLDOWN", "10"))
+
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+upstreamLatency = GetHistogram("chatapi_upstream_seconds", "Latency of calls to upstream services", ["upstream", "path", "status"])
+upstreamRetries = GetCounter("chatapi_upstream_retries_total", "Retried upstream calls", ["upstream"])
+breakerRejections = GetCounter("chatapi_upstream_breaker_rejections_total", "Calls rejected while the circuit was open", ["upstream"])
+
+
+class CircuitOpenError(httpx.RequestError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and lets one trial call through after `cooldown` seconds.
+
+    Every call admitted by Allow must end in RecordSuccess, RecordFailure or
+    Abandon; a trial that ends any other way would leave the breaker half open
+    with no trial left to close or reopen it.
+    """
+
+    def __init__(self, threshold: int = CHAT_AUTH_BREAKER_THRESHOLD, cooldown: float = CHAT_AUTH_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def Allow(self) -> Optional[str]:
+        """Returns the state the call was admitted in ("closed" or "half_open"), None when rejected."""
+        state = self.state
+        if state == "closed":
+            return state
+        if state == "half_open" and not self._trial_running:
+            self._trial_running = True
+            return state
+        return None
+
+    def RecordSuccess(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def RecordFailure(self):
+        self.failures += 1
+        if self._trial_running or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+        self._trial_running = False
+
+    def Abandon(self, admitted: Optional[str]):
+        # A trial that was cancelled or raised something unexpected counts as failed
+        if admitted == "half_open" and self._trial_running:
+            self.RecordFailure()
+
+
+chatAuthBreaker = CircuitBreaker()
+_client: Optional[httpx.AsyncClient] = None
+
+async def StartChatAuthClient():
+    global _client
+    if _client is not None:
+        return
+    _client = httpx.AsyncClient(
+        base_url=CHAT_AUTH_URL,
+        http2=CHAT_AUTH_HTTP2,
+        limits=httpx.Limits(
+            max_connections=CHAT_AUTH_MAX_CONNECTIONS,
+            max_keepalive_connections=CHAT_AUTH_MAX_KEEPALIVE
+        ),
+        timeout=httpx.Timeout(
+            connect=CHAT_AUTH_CONNECT_TIMEOUT,
+            read=CHAT_AUTH_READ_TIMEOUT,
+            write=CHAT_AUTH_READ_TIMEOUT,
+            pool=CHAT_AUTH_CONNECT_TIMEOUT
+        )
+    )
+
+async def StopChatAuthClient():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def _PoolConnections() -> list:
+    # httpx does not expose pool stats; read them from the httpcore pool when available
+    try:
+        return list(_client._transport._pool.connections) if _client else []
+    except AttributeError:
+        return []
+
+def GetPoolInUse() -> int:
+    return sum(1 for connection in _PoolConnections() if not connection.is_idle())
+
+async def RequestChatAuth(method: str, path: str, **kwargs) -> httpx.Response:
+    """
+    Calls ChatAuth through the shared pooled client.
+
+    Connection failures are retried with jittered backoff; read timeouts and 5xx
+    answers are only retried for GET, since a login code must not be replayed.
+    Raises CircuitOpenError (an httpx.RequestError) while the breaker is open.
+    """
+    if _client is None:
+        await StartChatAuthClient()
+
+    attempts = CHAT_AUTH_RETRIES + 1
+    for attempt in range(attempts):
+        admitted = chatAuthBreaker.Allow()
+        if not admitted:
+            breakerRejections.inc(upstream="chatauth")
+            raise CircuitOpenError("Authentication service circuit is open")
+
+        started = time.perf_counter()
+        status = "error"
+        recorded = False
+        try:
+            response = await _client.request(method, path, **kwargs)
+            status = str(response.status_code)
+        except httpx.RequestError as ex:
+            chatAuthBreaker.RecordFailure()
+            recorded = True
+            retryable = isinstance(ex, httpx.ConnectError) or (method == "GET" and isinstance(ex, httpx.TransportError))
+            if not retryable or attempt == attempts - 1:
+                raise
+        else:
+            recorded = True
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                chatAuthBreaker.RecordFailure()
+                if method != "GET" or attempt == attempts - 1:
+                    return response
+            else:
+                chatAuthBreaker.RecordSuccess()
+                return response
+        finally:
+            if not recorded:
+                chatAuthBreaker.Abandon(admitted)
+            upstreamLatency.observe(time.perf_counter() - started, upstream="chatauth", path=path, status=status)
+
+        upstreamRetries.inc(upstream="chatauth")
+        await asyncio.sleep(random.uniform(0, CHAT_AUTH_RETRY_BACKOFF * 2 ** attempt))
+
+
+GetGauge("chatapi_upstream_pool_connections", "Open connections in the ChatAuth pool", callback=lambda: len(_PoolConnections()))
+GetGauge("chatapi_upstream_pool_in_use", "ChatAuth pool connections serving a request", callback=GetPoolInUse)
+GetGauge("chatapi_upstream_breaker_open", "1 while the ChatAuth circuit breaker is open", callback=lambda: 1 if chatAuthBreaker.state == "open" else 0)
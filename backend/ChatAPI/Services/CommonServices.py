@@ -1,10 +1,9 @@
 import hashlib
 import traceback
 from Schemas.shared import SystemLogErrorSchema
-from Services.CallChatBotSPServices import sp_get_table_sl
+from Services.Instrumentation import Timed
+from Services.TableSlAllocator import GetTableSlAllocator
 from .LogServices import AddLogOrError
-from sqlalchemy.ext.asyncio import AsyncSession
-from Config.dbConnection import AsyncSessionLocalChatBot
 
 async def GetSha1Hash(raw_data: str) -> str:
     try:
@@ -50,11 +49,10 @@ def _GetMysqlException(msg):
     else:
         return "Exception occurred in database."
 
+@Timed("id_allocation")
 async def GetTableSl(tableNm:str):
-    db_session = None
     try:
-        db_session = AsyncSessionLocalChatBot()
-        return await sp_get_table_sl(db_session, tableNm)
+        return await GetTableSlAllocator(tableNm).NextSl()
     except Exception as ex:
         error_msg = f"{str(ex)}\n{traceback.format_exc()}"
         await AddLogOrError(SystemLogErrorSchema(
@@ -64,6 +62,7 @@ async def GetTableSl(tableNm:str):
             CreatedBy = ""
         ))
         return None
-    finally:
-        if db_session:
-            await db_session.close()
\ No newline at end of file
+
+def GetUserKey(user: str) -> str:
+    # Must match the USER_KEY generated column: LOWER(`USER`)
+    return (user or "").lower()
@@ -0,0 +1,164 @@
+import asyncio
+import itertools
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from fastapi import WebSocket
+from Schemas.shared import SystemLogErrorSchema
+from Services.LogServices import AddLogOrError
+from Services.MetricsServices import GetCounter, GetGauge, GetHistogram
+
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "DROP_OLDEST")
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+
+wsSendLatency = GetHistogram("chatapi_ws_send_seconds", "Time for one websocket send to complete")
+wsDropped = GetCounter("chatapi_ws_dropped_total", "Payloads dropped or sockets closed for slow consumers", ["policy"])
+
+_connection_ids = itertools.count(1)
+
+
+class ClientConnection:
+    """
+    One accepted socket with its own bounded outbound queue and writer task.
+
+    When the queue is full the slow-consumer policy decides: DROP_OLDEST discards
+    the oldest queued payload, DROP_NEWEST discards the new one and DISCONNECT
+    closes the socket so the client reconnects and reloads history.
+    """
+
+    def __init__(self, manager: "ConnectionManager", user_hash: str, websocket: WebSocket, queue_size: int, policy: str):
+        self.id = next(_connection_ids)
+        self.manager = manager
+        self.user_hash = user_hash
+        self.websocket = websocket
+        self.policy = policy.upper()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sent = 0
+        self.last_send_latency = 0.0
+        self.closed = False
+        self._writer_task = asyncio.create_task(self._RunWriter())
+
+    def Enqueue(self, payload: str) -> bool:
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            wsDropped.inc(policy=self.policy)
+            if self.policy == "DISCONNECT":
+                self.manager.DisconnectLater(self, code=1013)
+                return False
+            if self.policy == "DROP_NEWEST":
+                return False
+            self.queue.get_nowait()
+            self.queue.put_nowait(payload)
+            return True
+
+    async def _RunWriter(self):
+        while True:
+            payload = await self.queue.get()
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(payload), WS_SEND_TIMEOUT)
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                await AddLogOrError(SystemLogErrorSchema(
+                    Msg=f"Error sending websocket message: {str(ex)}",
+                    Type="ERROR",
+                    ModuleName="ConnectionManager/_RunWriter",
+                    CreatedBy=self.user_hash
+                ))
+                # Closing cancels the writer unless it runs in this task, so it is left to its own
+                self.manager.DisconnectLater(self)
+                return
+            self.last_send_latency = time.perf_counter() - started
+            self.sent += 1
+            wsSendLatency.observe(self.last_send_latency)
+
+    async def Close(self, code: int = 1000):
+        if self.closed:
+            return
+        self.closed = True
+        if self._writer_task is not asyncio.current_task():
+            self._writer_task.cancel()
+            await asyncio.gather(self._writer_task, return_exceptions=True)
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def Stats(self) -> dict:
+        return {
+            "id": self.id,
+            "user_hash": self.user_hash,
+            "queue_depth": self.queue.qsize(),
+            "sent": self.sent,
+            "last_send_ms": round(self.last_send_latency * 1000, 3)
+        }
+
+
+class ConnectionManager:
+    """Tracks every socket of every user on this node and queues outbound payloads per socket."""
+
+    def __init__(self, queue_size: int = WS_SEND_QUEUE_SIZE, policy: str = WS_SLOW_CONSUMER_POLICY):
+        self.queue_size = queue_size
+        self.policy = policy
+        self._connections: Dict[str, Set[ClientConnection]] = {}
+        # Referenced until done so the loop does not drop a pending disconnect
+        self._tasks: Set[asyncio.Task] = set()
+
+    def Connect(self, user_hash: str, websocket: WebSocket) -> ClientConnection:
+        connection = ClientConnection(self, user_hash, websocket, self.queue_size, self.policy)
+        self._connections.setdefault(user_hash, set()).add(connection)
+        return connection
+
+    async def Disconnect(self, connection: ClientConnection, code: int = 1000):
+        user_connections = self._connections.get(connection.user_hash)
+        if user_connections is not None:
+            user_connections.discard(connection)
+            if not user_connections:
+                del self._connections[connection.user_hash]
+        await connection.Close(code)
+
+    def DisconnectLater(self, connection: ClientConnection, code: int = 1000):
+        task = asyncio.create_task(self.Disconnect(connection, code))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def HasUser(self, user_hash: str) -> bool:
+        return user_hash in self._connections
+
+    def Send(self, user_hash: str, payload: str) -> int:
+        """Queues payload on every socket of the user; returns how many accepted it."""
+        return sum(connection.Enqueue(payload) for connection in list(self._connections.get(user_hash, ())))
+
+    def SendMany(self, items: Iterable[Tuple[str, str]]) -> int:
+        return sum(self.Send(user_hash, payload) for user_hash, payload in items if user_hash in self._connections)
+
+    async def CloseAll(self):
+        for connection in [c for connections in self._connections.values() for c in connections]:
+            await self.Disconnect(connection, code=1001)
+
+    def ConnectionCount(self) -> int:
+        return sum(len(connections) for connections in self._connections.values())
+
+    def UserCount(self) -> int:
+        return len(self._connections)
+
+    def MaxQueueDepth(self) -> int:
+        return max((c.queue.qsize() for connections in self._connections.values() for c in connections), default=0)
+
+    def Stats(self, user_hash: Optional[str] = None) -> List[dict]:
+        if user_hash is not None:
+            return [c.Stats() for c in self._connections.get(user_hash, ())]
+        return [c.Stats() for connections in self._connections.values() for c in connections]
+
+
+connectionManager = ConnectionManager()
+
+GetGauge("chatapi_ws_connections", "Open websocket connections on this node", callback=connectionManager.ConnectionCount)
+GetGauge("chatapi_ws_users", "Users with at least one open websocket on this node", callback=connectionManager.UserCount)
+GetGauge("chatapi_ws_queue_depth_max", "Deepest per-connection outbound queue", callback=connectionManager.MaxQueueDepth)
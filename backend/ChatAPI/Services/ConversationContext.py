@@ -0,0 +1,182 @@
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Dict, List
+from sqlalchemy import desc, select
+from Config.dbConnection import AsyncSessionLocalChatBot
+from Models.shared import customerChatMessages
+from Schemas.shared import CustomerChatMessageSchema
+from Services.MetricsServices import GetCounter, GetGauge
+
+CONTEXT_MAX_TURNS = int(os.getenv("CONTEXT_MAX_TURNS", "20"))
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "2000"))
+CONTEXT_MAX_USERS = int(os.getenv("CONTEXT_MAX_USERS", "10000"))
+CONTEXT_TTL = float(os.getenv("CONTEXT_TTL", "600"))
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+contextWarmups = GetCounter("chatapi_context_warmups_total", "Context windows loaded from CUSTOMER_CHAT_MESSAGES")
+contextBuilds = GetCounter("chatapi_context_builds_total", "Context payloads attached to Chat_message", ["source"])
+
+
+def EstimateTokens(text: str) -> int:
+    # Words and punctuation marks; close enough to BPE counts for budgeting
+    return len(_TOKEN_PATTERN.findall(text or ""))
+
+
+class _Turn:
+    __slots__ = ("id", "key", "is_bot", "content", "tokens")
+
+    def __init__(self, message: CustomerChatMessageSchema):
+        self.id = message.id
+        self.key = message.OrderKey()
+        self.is_bot = bool(message.is_bot)
+        self.content = message.message or ""
+        self.tokens = EstimateTokens(self.content)
+
+
+class ContextWindow:
+    """
+    The newest turns of one conversation that fit both max_turns and max_tokens.
+
+    Turns are dropped from the old end only, so the window is always the longest
+    suffix of the conversation within both limits; a single turn larger than
+    max_tokens empties it.
+    """
+
+    def __init__(self, max_turns: int, max_tokens: int):
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.turns: deque = deque()
+        self.ids = set()
+        self.tokens = 0
+        self.loaded_at = time.monotonic()
+
+    def Append(self, message: CustomerChatMessageSchema):
+        if message.id is not None and message.id in self.ids:
+            return
+        turn = _Turn(message)
+        # Turns written by another process can arrive after newer ones
+        position = len(self.turns)
+        while position and self.turns[position - 1].key > turn.key:
+            position -= 1
+        self.turns.insert(position, turn)
+        self.ids.add(turn.id)
+        self.tokens += turn.tokens
+        while self.turns and (len(self.turns) > self.max_turns or self.tokens > self.max_tokens):
+            dropped = self.turns.popleft()
+            self.ids.discard(dropped.id)
+            self.tokens -= dropped.tokens
+
+    def Payload(self) -> List[dict]:
+        return [
+            {"role": "assistant" if turn.is_bot else "user", "content": turn.content}
+            for turn in self.turns
+        ]
+
+
+async def _LoadRecentMessages(user_key: str, limit: int) -> List[CustomerChatMessageSchema]:
+    async with AsyncSessionLocalChatBot() as db_session:
+        c = customerChatMessages.c
+        result = await db_session.execute(
+            select(c.ID, c.USER, c.MESSAGE, c.CREATED_AT, c.IS_BOT, c.RESPONSE_TO)
+            .where(c.USER_KEY == user_key)
+            .order_by(desc(c.CREATED_AT), desc(c.ID))
+            .limit(limit)
+        )
+        return [CustomerChatMessageSchema(**dict(row._mapping)) for row in reversed(result.fetchall())]
+
+
+class ConversationContextBuilder:
+    """
+    Keeps a ContextWindow per recently active user so PostMessage can attach the
+    conversation so far to Chat_message without reading history per turn.
+
+    A user's window is loaded from the DB the first time they are seen (or after
+    ttl), then kept current by Append from PostMessage and ConsumeResponse, and
+    from the ws_delivery fan-out for messages written on other replicas.
+    Appends that arrive while the load is running are applied on top of it.
+    """
+
+    def __init__(
+        self,
+        max_turns: int = CONTEXT_MAX_TURNS,
+        max_tokens: int = CONTEXT_MAX_TOKENS,
+        max_users: int = CONTEXT_MAX_USERS,
+        ttl: float = CONTEXT_TTL,
+        loader: Callable[[str, int], Awaitable[List[CustomerChatMessageSchema]]] = _LoadRecentMessages
+    ):
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.max_users = max_users
+        self.ttl = ttl
+        self.loader = loader
+        self._windows: "OrderedDict[str, ContextWindow]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._pending: Dict[str, List[CustomerChatMessageSchema]] = {}
+
+    def __len__(self):
+        return len(self._windows)
+
+    async def Build(self, user_key: str) -> List[dict]:
+        """Context turns for the next message of user_key, oldest first."""
+        window = self._windows.get(user_key)
+        if window is not None and time.monotonic() - window.loaded_at > self.ttl:
+            del self._windows[user_key]
+            window = None
+        if window is None:
+            window = await self._Warm(user_key)
+            contextBuilds.inc(source="db")
+        else:
+            self._windows.move_to_end(user_key)
+            contextBuilds.inc(source="memory")
+        return window.Payload()
+
+    def Append(self, user_key: str, message: CustomerChatMessageSchema):
+        if user_key in self._loading:
+            self._pending[user_key].append(message)
+            return
+        window = self._windows.get(user_key)
+        if window is not None:
+            window.Append(message)
+
+    async def _Warm(self, user_key: str) -> ContextWindow:
+        # Concurrent first messages of one user share a single load
+        loading = self._loading.get(user_key)
+        if loading is not None:
+            return await asyncio.shield(loading)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[user_key] = future
+        self._pending[user_key] = []
+        try:
+            messages = await self.loader(user_key, self.max_turns)
+            window = ContextWindow(self.max_turns, self.max_tokens)
+            for message in messages + self._pending[user_key]:
+                window.Append(message)
+            self._windows[user_key] = window
+            self._windows.move_to_end(user_key)
+            while len(self._windows) > self.max_users:
+                self._windows.popitem(last=False)
+            contextWarmups.inc()
+            future.set_result(window)
+            return window
+        except Exception as ex:
+            future.set_exception(ex)
+            # Nobody else may be waiting; keep the loop from warning about it
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                # The loading request was cancelled; fail the requests sharing its load instead of leaving them waiting
+                future.set_exception(RuntimeError(f"Context load for {user_key} was cancelled"))
+                future.exception()
+            del self._loading[user_key]
+            del self._pending[user_key]
+
+
+contextBuilder = ConversationContextBuilder()
+
+GetGauge("chatapi_context_users", "Users with a conversation context window in memory", callback=lambda: len(contextBuilder))
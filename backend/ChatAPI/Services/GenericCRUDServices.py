@@ -5,6 +5,7 @@ from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 from Config.dbConnection import AsyncSessionLocalChatBot
 from Schemas.shared import SystemLogErrorSchema
+from Services.Instrumentation import Timed
 from Services.LogServices import AddLogOrError
 
 T = TypeVar('T', bound=BaseModel)
@@ -12,6 +13,7 @@ TableType = TypeVar('TableType', bound=Table)
 
 class GenericInserter(Generic[T]):
     @staticmethod
+    @Timed("generic_insert")
     async def insert_record(
         table: TableType,
         schema_model: Type[T],
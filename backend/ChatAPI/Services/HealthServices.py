@@ -0,0 +1,109 @@
+import asyncio
+import os
+import time
+from sqlalchemy import text
+from Config.dbConnection import async_engine_chatbot
+from Services import KafkaMessageProducer
+from Services.ChatAuthClient import chatAuthBreaker
+from Services.MetricsServices import GetGauge, GetHistogram
+from Services.RateLimiter import rateLimiter
+from Services.TaskSupervisor import taskSupervisor
+
+HEALTH_CACHE_TTL = float(os.getenv("HEALTH_CACHE_TTL", "5"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "2"))
+
+probeLatency = GetHistogram("chatapi_health_probe_seconds", "Latency of /health dependency probes", ["probe", "result"])
+
+# Pool of async_engine_chatbot; checked out beyond pool_size is overflow
+_pool = async_engine_chatbot.sync_engine.pool
+GetGauge("chatapi_db_pool_size", "Configured connections in the chatbot DB pool", callback=lambda: _pool.size())
+GetGauge("chatapi_db_pool_checked_out", "Chatbot DB connections currently checked out", callback=lambda: _pool.checkedout())
+GetGauge("chatapi_db_pool_overflow", "Chatbot DB connections open beyond pool_size", callback=lambda: max(0, _pool.overflow()))
+
+
+async def _ProbeDatabase():
+    async with async_engine_chatbot.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+async def _ProbeKafka():
+    if KafkaMessageProducer.producer is None:
+        raise RuntimeError("producer not started")
+    await KafkaMessageProducer.producer.partitions_for("Chat_message")
+
+async def _ProbeRedis():
+    await rateLimiter.Ping()
+
+async def _ProbeChatAuth():
+    # No network call: the breaker already tracks recent ChatAuth failures.
+    # Half open is not up either: no call has succeeded since it opened.
+    state = chatAuthBreaker.state
+    if state != "closed":
+        raise RuntimeError(f"circuit {state}")
+
+async def _ProbeConsumers():
+    stopped = [name for name, running in taskSupervisor.Running().items() if not running]
+    if stopped:
+        raise RuntimeError(f"restarting: {', '.join(stopped)}")
+
+# name -> (probe, critical); a failed critical probe makes /health return 503
+PROBES = {
+    "database": (_ProbeDatabase, True),
+    "kafka": (_ProbeKafka, True),
+    "chatauth": (_ProbeChatAuth, False),
+    "consumers": (_ProbeConsumers, False)
+}
+if hasattr(rateLimiter, "Ping"):
+    PROBES["redis"] = (_ProbeRedis, False)
+
+
+class HealthChecker:
+    """
+    Runs the dependency probes at most once per ttl seconds; concurrent /health
+    calls in between share the cached report instead of hitting each dependency.
+    """
+
+    def __init__(self, ttl: float = HEALTH_CACHE_TTL, timeout: float = HEALTH_PROBE_TIMEOUT):
+        self.ttl = ttl
+        self.timeout = timeout
+        self._report = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def Check(self) -> dict:
+        if self._report is not None and time.monotonic() - self._checked_at < self.ttl:
+            return self._report
+        async with self._lock:
+            if self._report is None or time.monotonic() - self._checked_at >= self.ttl:
+                self._report = await self._RunProbes()
+                self._checked_at = time.monotonic()
+        return self._report
+
+    async def _Probe(self, name: str, probe) -> dict:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(probe(), self.timeout)
+            result = {"status": "up"}
+        except Exception as ex:
+            result = {"status": "down", "error": str(ex) or type(ex).__name__}
+        elapsed = time.perf_counter() - started
+        probeLatency.observe(elapsed, probe=name, result=result["status"])
+        result["latency_ms"] = round(elapsed * 1000, 2)
+        return result
+
+    async def _RunProbes(self) -> dict:
+        names = list(PROBES)
+        results = await asyncio.gather(*(self._Probe(name, PROBES[name][0]) for name in names))
+        checks = dict(zip(names, results))
+        healthy = all(checks[name]["status"] == "up" for name in names if PROBES[name][1])
+        degraded = any(check["status"] != "up" for check in checks.values())
+        return {
+            "status": "API is running" if not degraded else ("degraded" if healthy else "unhealthy"),
+            "healthy": healthy,
+            "database_status": {
+                "chatbot": "connected" if checks["database"]["status"] == "up" else "unreachable"
+            },
+            "checks": checks
+        }
+
+
+healthChecker = HealthChecker()
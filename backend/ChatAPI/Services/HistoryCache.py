@@ -0,0 +1,148 @@
+import bisect
+import os
+import sys
+import time
+from collections import OrderedDict
+from typing import List, Optional, Set
+from Schemas.shared import CustomerChatMessageSchema
+from Services.MetricsServices import GetCounter, GetGauge
+
+HISTORY_CACHE_MESSAGES_PER_USER = int(os.getenv("HISTORY_CACHE_MESSAGES_PER_USER", "50"))
+HISTORY_CACHE_MAX_USERS = int(os.getenv("HISTORY_CACHE_MAX_USERS", "10000"))
+HISTORY_CACHE_MEMORY_BUDGET_MB = float(os.getenv("HISTORY_CACHE_MEMORY_BUDGET_MB", "64"))
+HISTORY_CACHE_TTL = float(os.getenv("HISTORY_CACHE_TTL", "300"))
+
+# Rough per-message overhead of the pydantic model on top of the message text
+MESSAGE_OVERHEAD_BYTES = 400
+
+historyCacheLookups = GetCounter("chatapi_history_cache_lookups_total", "First-page ChatHistory cache lookups", ["result"])
+
+
+def _MessageSize(message: CustomerChatMessageSchema) -> int:
+    return MESSAGE_OVERHEAD_BYTES + sys.getsizeof(message.message or "") + sys.getsizeof(message.user or "")
+
+
+class _UserHistory:
+    __slots__ = ("keys", "ids", "messages", "complete", "loaded_at", "size_bytes")
+
+    def __init__(self, complete: bool):
+        # (CREATED_AT, ID) of each message, parallel to messages
+        self.keys: List[tuple] = []
+        self.ids: Set[int] = set()
+        self.messages: List[CustomerChatMessageSchema] = []
+        self.complete = complete
+        self.loaded_at = time.monotonic()
+        self.size_bytes = 0
+
+
+class RecentHistoryCache:
+    """
+    Keeps the newest messages of recently active users so the first ChatHistory
+    page needs no DB round trip.
+
+    Each user holds a bounded window of messages in (CREATED_AT, ID) order, filled from the first
+    DB page and kept current by PostMessage and ConsumeResponse. Users are evicted
+    least-recently-used beyond max_users or the memory budget. Messages written on
+    other replicas arrive through the ws_delivery fan-out; entries also expire after
+    ttl seconds, which bounds staleness when a fan-out message is missed.
+    """
+
+    def __init__(
+        self,
+        messages_per_user: int = HISTORY_CACHE_MESSAGES_PER_USER,
+        max_users: int = HISTORY_CACHE_MAX_USERS,
+        memory_budget_bytes: int = int(HISTORY_CACHE_MEMORY_BUDGET_MB * 1024 * 1024),
+        ttl: float = HISTORY_CACHE_TTL
+    ):
+        self.messages_per_user = messages_per_user
+        self.max_users = max_users
+        self.memory_budget_bytes = memory_budget_bytes
+        self.ttl = ttl
+        self.total_bytes = 0
+        self._users: "OrderedDict[str, _UserHistory]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._users)
+
+    def GetLatestPage(self, user_key: str, page_size: int) -> Optional[List[CustomerChatMessageSchema]]:
+        """Newest page_size messages, oldest first, or None when the DB has to answer."""
+        entry = self._users.get(user_key)
+        if entry is not None and time.monotonic() - entry.loaded_at > self.ttl:
+            self._Remove(user_key)
+            entry = None
+        if entry is None or (len(entry.messages) < page_size and not entry.complete):
+            historyCacheLookups.inc(result="miss")
+            return None
+        self._users.move_to_end(user_key)
+        historyCacheLookups.inc(result="hit")
+        return entry.messages[-page_size:]
+
+    def Fill(self, user_key: str, messages: List[CustomerChatMessageSchema], complete: bool):
+        """Stores the newest DB page (oldest first); complete means the user has no older messages."""
+        previous = self._users.get(user_key)
+        self._Remove(user_key)
+        entry = self._users[user_key] = _UserHistory(complete)
+        for message in messages:
+            self._Insert(entry, message)
+        # Keep rows appended while the DB page was being read
+        if previous is not None:
+            oldest = messages[0].OrderKey() if messages else None
+            for message in previous.messages:
+                if oldest is None or message.OrderKey() > oldest:
+                    self._Insert(entry, message)
+        self._Trim(entry)
+        self._Evict()
+
+    def Append(self, user_key: str, message: CustomerChatMessageSchema):
+        # Only users already cached; anyone else is filled from the DB on their next visit
+        entry = self._users.get(user_key)
+        if entry is None:
+            return
+        self._Insert(entry, message)
+        self._Trim(entry)
+        self._users.move_to_end(user_key)
+        self._Evict()
+
+    def HitRatio(self) -> float:
+        hits = historyCacheLookups.value(result="hit")
+        total = hits + historyCacheLookups.value(result="miss")
+        return hits / total if total else 0.0
+
+    def _Insert(self, entry: _UserHistory, message: CustomerChatMessageSchema):
+        if message.id in entry.ids:
+            return
+        key = message.OrderKey()
+        position = bisect.bisect_left(entry.keys, key)
+        entry.keys.insert(position, key)
+        entry.ids.add(message.id)
+        entry.messages.insert(position, message)
+        size = _MessageSize(message)
+        entry.size_bytes += size
+        self.total_bytes += size
+
+    def _Trim(self, entry: _UserHistory):
+        while len(entry.messages) > self.messages_per_user:
+            entry.keys.pop(0)
+            dropped = entry.messages.pop(0)
+            entry.ids.discard(dropped.id)
+            size = _MessageSize(dropped)
+            entry.size_bytes -= size
+            self.total_bytes -= size
+            entry.complete = False
+
+    def _Remove(self, user_key: str):
+        entry = self._users.pop(user_key, None)
+        if entry is not None:
+            self.total_bytes -= entry.size_bytes
+
+    def _Evict(self):
+        while self._users and (len(self._users) > self.max_users or self.total_bytes > self.memory_budget_bytes):
+            user_key, entry = self._users.popitem(last=False)
+            self.total_bytes -= entry.size_bytes
+
+
+historyCache = RecentHistoryCache()
+
+GetGauge("chatapi_history_cache_users", "Users with cached recent history", callback=lambda: len(historyCache))
+GetGauge("chatapi_history_cache_bytes", "Estimated memory held by the history cache", callback=lambda: historyCache.total_bytes)
+GetGauge("chatapi_history_cache_hit_ratio", "Share of first-page ChatHistory requests served from cache", callback=historyCache.HitRatio)
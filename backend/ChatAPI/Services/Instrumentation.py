@@ -0,0 +1,78 @@
+import functools
+import time
+from typing import Callable
+from Services.MetricsServices import GetHistogram
+from Services.Tracing import FormatTraceparent, ParseTraceparent, TRACEPARENT, tracer
+
+operationLatency = GetHistogram("chatapi_operation_seconds", "Latency of instrumented hot-path operations", ["operation", "result"])
+requestLatency = GetHistogram("chatapi_http_request_seconds", "HTTP request latency per route", ["method", "route", "status"])
+
+
+def Timed(operation: str) -> Callable:
+    """
+    Records every call of the decorated coroutine function in
+    chatapi_operation_seconds{operation, result}; result is "error" when it raised.
+    Costs two perf_counter() calls and one histogram bucket search per call.
+    The call is also a span named after the operation in the active trace.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            result = "ok"
+            try:
+                with tracer.StartSpan(operation):
+                    return await func(*args, **kwargs)
+            except BaseException:
+                result = "error"
+                raise
+            finally:
+                operationLatency.observe(time.perf_counter() - started, operation=operation, result=result)
+        return wrapper
+    return decorator
+
+
+class RouteLatencyMiddleware:
+    """
+    Plain ASGI middleware timing each HTTP request by its route template, so
+    /initialize/{user} is one series rather than one per user. Requests that match
+    no route are grouped under "unmatched". WebSocket sessions are not timed.
+
+    Each request is also the http_receive span, continuing the caller's
+    traceparent header when there is one; the response carries the traceparent
+    of that span so a slow request can be looked up under /Tracing/Trace.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        parent = None
+        for key, value in scope.get("headers", ()):
+            if key == b"traceparent":
+                parent = ParseTraceparent(value)
+                break
+
+        with tracer.StartSpan("http_receive", parent=parent, method=scope["method"]) as span:
+            async def send_wrapper(message):
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    if span is not None:
+                        message["headers"] = list(message.get("headers", [])) + [(TRACEPARENT.encode("ascii"), FormatTraceparent(span.context).encode("ascii"))]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                requestLatency.observe(time.perf_counter() - started, method=scope["method"], route=route, status=str(status_code))
+                if span is not None:
+                    span.attributes.update(route=route, status=status_code)
@@ -1,37 +1,88 @@
+import asyncio
 import json
 import os
-import traceback
-from kafka import KafkaProducer
-from Schemas.shared import SystemLogErrorSchema, CustomerChatMessageSchema
-from Services.LogServices import AddLogOrError
-
-producer = KafkaProducer(
-    bootstrap_servers=os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'kafka:9092'),
-    value_serializer=lambda v: json.dumps(v).encode("utf-8"),
-    acks='all'
-)
-
-async def SendMessage(data:CustomerChatMessageSchema):
+from typing import Optional
+from aiokafka import AIOKafkaProducer
+from Schemas.shared import CustomerChatMessageSchema
+from Services.Instrumentation import Timed
+from Services.MetricsServices import GetCounter
+from Services.Tracing import KafkaTraceHeaders
+
+KAFKA_PRODUCER_LINGER_MS = int(os.getenv("KAFKA_PRODUCER_LINGER_MS", "5"))
+KAFKA_PRODUCER_MAX_BATCH_SIZE = int(os.getenv("KAFKA_PRODUCER_MAX_BATCH_SIZE", "65536"))
+KAFKA_PRODUCER_COMPRESSION = os.getenv("KAFKA_PRODUCER_COMPRESSION", "lz4")
+KAFKA_PRODUCER_IDEMPOTENCE = os.getenv("KAFKA_PRODUCER_IDEMPOTENCE", "true").lower() == "true"
+KAFKA_PRODUCER_SEND_TIMEOUT = float(os.getenv("KAFKA_PRODUCER_SEND_TIMEOUT", "10"))
+AUTH_INVALIDATION_TOPIC = "auth_invalidation"
+
+producerSendFailures = GetCounter("chatapi_producer_send_failures_total", "Chat_message sends that failed or timed out")
+
+producer: Optional[AIOKafkaProducer] = None
+
+async def StartProducer():
+    global producer
+    if producer is not None:
+        return
+    compression = KAFKA_PRODUCER_COMPRESSION.lower()
+    producer = AIOKafkaProducer(
+        bootstrap_servers=os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'kafka:9092'),
+        value_serializer=lambda v: json.dumps(v).encode("utf-8"),
+        acks='all',
+        linger_ms=KAFKA_PRODUCER_LINGER_MS,
+        max_batch_size=KAFKA_PRODUCER_MAX_BATCH_SIZE,
+        compression_type=None if compression in ("", "none") else compression,
+        enable_idempotence=KAFKA_PRODUCER_IDEMPOTENCE
+    )
+    await producer.start()
+
+async def StopProducer():
+    global producer
+    if producer is None:
+        return
+    try:
+        await producer.flush()
+    finally:
+        await producer.stop()
+        producer = None
+
+@Timed("kafka_send")
+async def SendMessage(data:CustomerChatMessageSchema, context: Optional[list] = None, context_digest: Optional[str] = None):
     try:
         # Send to Kafka
         if data:
-            kafkaAck = producer.send(
-                "Chat_message",
-                value=data.model_dump_json()
-            )
+            if producer is None:
+                raise RuntimeError("Kafka producer is not started.")
             try:
-                kafkaAck.get(timeout=10) 
+                # Keyed by user so one user's messages stay on one partition.
+                # context carries the earlier turns so the worker needs no history lookup.
+                # context_digest is echoed back on ai_response to key the response cache.
+                # The traceparent header links the worker's and the consumer's spans to this request.
+                payload = data.model_dump(mode="json")
+                payload["context"] = context or []
+                payload["context_digest"] = context_digest
+                await asyncio.wait_for(
+                    producer.send_and_wait(
+                        "Chat_message",
+                        value=json.dumps(payload),
+                        key=(data.user or "").encode("utf-8"),
+                        headers=KafkaTraceHeaders()
+                    ),
+                    timeout=KAFKA_PRODUCER_SEND_TIMEOUT
+                )
             except Exception as kafka_ex:
                 raise RuntimeError(f"Failed to send message to Kafka: {str(kafka_ex)}")
         else:
             raise ValueError("Topic or data is missing for kafka.")
-        
-    except Exception as ex:
-        error_msg = f"{str(ex)}\n{traceback.format_exc()}"
-        await AddLogOrError(SystemLogErrorSchema(
-            Msg=error_msg,
-            Type="ERROR",
-            ModuleName="KafkaMessageProducer/SendMessage",
-            CreatedBy=""
-        ))
-    return
\ No newline at end of file
+
+    except Exception:
+        # Raised so the caller can release the request's AI slot and report the failure
+        producerSendFailures.inc()
+        raise
+
+async def SendEvent(topic: str, value: dict, key: str = None):
+    if producer is None:
+        raise RuntimeError("Kafka producer is not started.")
+    await asyncio.wait_for(
+        producer.send_and_wait(topic, value=value, key=key.encode("utf-8") if key else None, headers=KafkaTraceHeaders()),
+        timeout=KAFKA_PRODUCER_SEND_TIMEOUT
+    )
@@ -1,15 +1,45 @@
 import os
-from datetime import datetime
+from typing import List
+from ChatShared.LogPipeline import LogPipeline, LogRecord
 from Config.dbConnection import AsyncSessionLocalChatBot
-from sqlalchemy.ext.asyncio import AsyncSession
 from Models.shared import systemLogError
 from Schemas.shared import SystemLogErrorSchema
+from Services.MetricsServices import GetGauge
 from dotenv import load_dotenv
 
-load_dotenv() 
+load_dotenv()
 
 AddLogOrErrorInFileOrDb = os.getenv("ADD_LOG_IN_FILE_OR_DB", "FILE")
 
+ERR_MSG_MAX_LENGTH = 4000
+
+
+async def _InsertLogRows(records: List[LogRecord]):
+    # The full text of messages cut to fit ERR_MSG still goes to the file
+    for record in records:
+        if len(record.message) > ERR_MSG_MAX_LENGTH:
+            logPipeline.Log(record.type, record.message, record.module_name, record.created_by)
+
+    async with AsyncSessionLocalChatBot() as db_session:
+        await db_session.execute(systemLogError.insert().values([
+            {
+                "ERR_DT": record.created_at,
+                "ERR_TYPE": record.type,
+                "ERR_MSG": record.message[:ERR_MSG_MAX_LENGTH - 1],
+                "MODULE_NAME": record.module_name,
+                "CREATED_BY": record.created_by.lower()
+            }
+            for record in records
+        ]))
+        await db_session.commit()
+
+logPipeline = LogPipeline("ChatAPI", db_writer=_InsertLogRows)
+
+GetGauge("chatapi_log_queue_depth", "Log records waiting to be written", callback=logPipeline.QueueDepth)
+GetGauge("chatapi_log_dropped_records", "Log records dropped because the log queue was full", callback=lambda: logPipeline.dropped)
+GetGauge("chatapi_log_db_failed_batches", "Log batches that fell back to the file after a DB error", callback=lambda: logPipeline.db_failures)
+
+
 async def  AddLogOrError(data: SystemLogErrorSchema):
     if  AddLogOrErrorInFileOrDb and AddLogOrErrorInFileOrDb.upper() ==  "FILE":
         await AddLogOrErrorInFile(data.Msg, data.Type)
@@ -19,46 +49,7 @@ async def  AddLogOrError(data: SystemLogErrorSchema):
         return None
 
 async def AddLogOrErrorInFile(message: str, type: str):
-    try:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_message = (
-            f"{timestamp} <======> {type} <======> {message}\n\n"
-            f"{'*' * 100}\n\n"
-        )
-
-        # Build path
-        log_dir = "/app/logs" #os.path.join("C:\\", "Clicknet.Log")
-        os.makedirs(log_dir, exist_ok=True)
+    logPipeline.Log(type, message)
 
-        # Log file name based on date
-        log_filename = f"ChatAPI - {datetime.now().strftime('%d-%m-%Y')}.txt"
-        log_path = os.path.join(log_dir, log_filename)
-
-        # Append log message
-        with open(log_path, "a", encoding="utf-8") as f:
-            f.write(log_message)
-    except Exception as ex:
-        print(f"Logging failed: {ex}")
-        
 async def  AddLogOrErrorInDB(data: SystemLogErrorSchema):
-    db_session = None
-    try:
-        db_session = AsyncSessionLocalChatBot()
-        
-        if len(data.Msg) > 4000:
-            AddLogOrErrorInFile(data.Msg, type)
-            data.Msg = data.Msg[:3999]
-
-        insert_stmt = systemLogError.insert().values(
-            ERR_DT=datetime.now(),
-            ERR_TYPE=data.Type,
-            ERR_MSG=data.Msg,
-            MODULE_NAME=data.ModuleName,
-            CREATED_BY=data.CreatedBy.lower()
-        )
-
-        await db_session.execute(insert_stmt)
-        await db_session.commit()
-
-    except Exception as ex:
-        await AddLogOrErrorInFile(f"DB Exception Error: {str(ex)}\nOriginal Message: {data.Msg}", "ERROR")
\ No newline at end of file
+    logPipeline.Log(data.Type, data.Msg, data.ModuleName, data.CreatedBy, to_db=True)
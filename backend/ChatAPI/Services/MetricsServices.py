@@ -0,0 +1,142 @@
+import bisect
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+
+    def _Key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(label_name, "")) for label_name in self.label_names)
+
+    def _FormatLabels(self, key: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.label_names, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+    def Render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._Key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._Key(labels), 0)
+
+    def Render(self) -> List[str]:
+        return [f"{self.name}{self._FormatLabels(key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (), callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels):
+        self._values[self._Key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._Key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        if self._callback and not self.label_names:
+            return self._callback()
+        return self._values.get(self._Key(labels), 0)
+
+    def Render(self) -> List[str]:
+        if self._callback and not self.label_names:
+            return [f"{self.name} {self._callback()}"]
+        return [f"{self.name}{self._FormatLabels(key)} {value}" for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._Key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._Key(labels))
+        return state[2] if state else 0
+
+    def sum(self, **labels) -> float:
+        state = self._values.get(self._Key(labels))
+        return state[1] if state else 0.0
+
+    def Render(self) -> List[str]:
+        lines = []
+        for key, (bucket_counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{self._FormatLabels(key, ('le', str(bound)))} {cumulative}")
+            lines.append(f"{self.name}_bucket{self._FormatLabels(key, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{self._FormatLabels(key)} {total}")
+            lines.append(f"{self.name}_count{self._FormatLabels(key)} {count}")
+        return lines
+
+
+_registry: Dict[str, _Metric] = {}
+
+def _Register(metric_class, name: str, *args, **kwargs):
+    metric = _registry.get(name)
+    if metric is None:
+        metric = _registry[name] = metric_class(name, *args, **kwargs)
+    elif not isinstance(metric, metric_class):
+        raise ValueError(f"Metric {name} is already registered as {metric.type_name}")
+    return metric
+
+def GetCounter(name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+    return _Register(Counter, name, help_text, label_names)
+
+def GetGauge(name: str, help_text: str, label_names: Sequence[str] = (), callback: Optional[Callable[[], float]] = None) -> Gauge:
+    return _Register(Gauge, name, help_text, label_names, callback=callback)
+
+def GetHistogram(name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+    return _Register(Histogram, name, help_text, label_names, buckets=buckets)
+
+def RenderMetrics() -> str:
+    lines = []
+    for metric in _registry.values():
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.type_name}")
+        lines.extend(metric.Render())
+    return "\n".join(lines) + "\n"
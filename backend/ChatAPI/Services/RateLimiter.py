@@ -0,0 +1,294 @@
+import math
+import os
+import time
+import traceback
+from typing import Any, Dict, Tuple
+from fastapi import Depends, HTTPException
+from Schemas.shared import SystemLogErrorSchema
+from Services.CommonServices import GetUserKey
+from Services.LogServices import AddLogOrError
+from Services.MetricsServices import GetCounter, GetGauge, GetHistogram
+from Services.VerifyAuth import GetCurrentUser
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "MEMORY")
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "1"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "10"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+AI_MAX_IN_FLIGHT = int(os.getenv("AI_MAX_IN_FLIGHT", "500"))
+AI_IN_FLIGHT_TIMEOUT = float(os.getenv("AI_IN_FLIGHT_TIMEOUT", "120"))
+AI_ADMISSION_RETRY_AFTER = int(os.getenv("AI_ADMISSION_RETRY_AFTER", "2"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+rateLimitDecisions = GetCounter("chatapi_rate_limit_decisions_total", "Per-user PostMessage rate limit decisions", ["decision"])
+rateLimitLatency = GetHistogram("chatapi_rate_limit_check_seconds", "Time spent deciding one rate limit check",
+                                buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05))
+admissionDecisions = GetCounter("chatapi_ai_admission_decisions_total", "In-flight AI request admission decisions", ["decision"])
+
+
+class InMemoryTokenBucket:
+    """
+    Token bucket per key, refilled lazily on each check; one dict lookup and a
+    little arithmetic per request. Limits apply per process.
+    """
+
+    def __init__(self, rate: float = RATE_LIMIT_PER_SECOND, burst: float = RATE_LIMIT_BURST, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: Dict[str, list] = {}
+
+    async def Start(self):
+        pass
+
+    async def Stop(self):
+        pass
+
+    async def Acquire(self, key: str) -> Tuple[bool, float]:
+        """Takes one token; returns (allowed, seconds until a token is available)."""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._DropFullBuckets(now)
+            bucket = self._buckets[key] = [self.burst, now]
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return True, 0.0
+        bucket[0] = tokens
+        return False, (1 - tokens) / self.rate
+
+    def _DropFullBuckets(self, now: float):
+        # A bucket that has refilled completely behaves exactly like a missing one
+        refill_time = self.burst / self.rate
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if now - bucket[1] < refill_time}
+        # Still full of active users: forget the oldest, which at worst grants them a fresh burst
+        for key in list(self._buckets)[:max(0, len(self._buckets) - self.max_keys + 1)]:
+            del self._buckets[key]
+
+
+# KEYS[1] bucket; ARGV rate, burst, ttl. Uses the Redis clock so replicas agree.
+_TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisTokenBucket:
+    """
+    The same bucket kept in Redis and updated by one Lua script call, so every
+    replica and worker draws from one bucket per user.
+
+    Any client exposing async register_script can be passed in.
+    """
+
+    def __init__(self, client: Any = None, url: str = REDIS_URL, rate: float = RATE_LIMIT_PER_SECOND,
+                 burst: float = RATE_LIMIT_BURST, prefix: str = "chatapi:ratelimit:"):
+        self.url = url
+        self.rate = rate
+        self.burst = burst
+        self.prefix = prefix
+        self._client = client
+        self._script = None
+
+    async def Start(self):
+        if self._client is None:
+            import redis.asyncio as redis
+            self._client = redis.from_url(self.url)
+        self._script = self._client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    async def Stop(self):
+        if self._client is not None and hasattr(self._client, "aclose"):
+            await self._client.aclose()
+
+    async def Ping(self):
+        await self._client.ping()
+
+    async def Acquire(self, key: str) -> Tuple[bool, float]:
+        ttl = max(1, math.ceil(self.burst / self.rate))
+        allowed, tokens = await self._script(keys=[self.prefix + key], args=[self.rate, self.burst, ttl])
+        if int(allowed):
+            return True, 0.0
+        return False, (1 - float(tokens)) / self.rate
+
+
+class InMemoryAdmission:
+    """
+    Caps AI requests waiting for a reply in this process. A request whose reply
+    never arrives here (lost, or consumed on another replica) frees its slot
+    after timeout seconds.
+    """
+
+    def __init__(self, max_in_flight: int = AI_MAX_IN_FLIGHT, timeout: float = AI_IN_FLIGHT_TIMEOUT):
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self._in_flight: Dict[str, float] = {}
+
+    async def Start(self):
+        pass
+
+    async def Stop(self):
+        pass
+
+    def __len__(self):
+        return len(self._in_flight)
+
+    async def Admit(self, request_id) -> bool:
+        now = time.monotonic()
+        if len(self._in_flight) >= self.max_in_flight:
+            # Insertion order is admission order, so expired entries sit at the front
+            for key, admitted_at in list(self._in_flight.items()):
+                if now - admitted_at <= self.timeout:
+                    break
+                del self._in_flight[key]
+            if len(self._in_flight) >= self.max_in_flight:
+                return False
+        self._in_flight[str(request_id)] = now
+        return True
+
+    async def Release(self, request_id):
+        self._in_flight.pop(str(request_id), None)
+
+
+# KEYS[1] sorted set of request ids scored by admission time; ARGV request_id, cap, timeout
+_ADMISSION_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - tonumber(ARGV[3]))
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now, ARGV[1])
+return 1
+"""
+
+
+class RedisAdmission:
+    """
+    In-flight AI requests of all replicas in one Redis sorted set. Any replica
+    that consumes the reply releases the slot.
+    """
+
+    def __init__(self, client: Any = None, url: str = REDIS_URL, max_in_flight: int = AI_MAX_IN_FLIGHT,
+                 timeout: float = AI_IN_FLIGHT_TIMEOUT, key: str = "chatapi:ai_in_flight"):
+        self.url = url
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.key = key
+        self._client = client
+        self._script = None
+
+    async def Start(self):
+        if self._client is None:
+            import redis.asyncio as redis
+            self._client = redis.from_url(self.url)
+        self._script = self._client.register_script(_ADMISSION_SCRIPT)
+
+    async def Stop(self):
+        if self._client is not None and hasattr(self._client, "aclose"):
+            await self._client.aclose()
+
+    async def Admit(self, request_id) -> bool:
+        return bool(int(await self._script(keys=[self.key], args=[str(request_id), self.max_in_flight, self.timeout])))
+
+    async def Release(self, request_id):
+        await self._client.zrem(self.key, str(request_id))
+
+
+def _CreateLimiters():
+    if RATE_LIMIT_BACKEND.upper() == "REDIS":
+        return RedisTokenBucket(), RedisAdmission()
+    return InMemoryTokenBucket(), InMemoryAdmission()
+
+
+rateLimiter, aiAdmission = _CreateLimiters()
+
+if isinstance(aiAdmission, InMemoryAdmission):
+    GetGauge("chatapi_ai_in_flight", "AI requests waiting for a reply in this process", callback=lambda: len(aiAdmission))
+
+
+async def StartRateLimiter():
+    await rateLimiter.Start()
+    await aiAdmission.Start()
+
+async def StopRateLimiter():
+    await rateLimiter.Stop()
+    await aiAdmission.Stop()
+
+def _TooManyRequests(detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+async def EnforceUserRateLimit(user: dict = Depends(GetCurrentUser)) -> dict:
+    """PostMessage dependency: the authenticated user, or 429 once their bucket is empty."""
+    if not RATE_LIMIT_ENABLED:
+        return user
+    started = time.perf_counter()
+    try:
+        allowed, retry_after = await rateLimiter.Acquire(GetUserKey(user.get("email")))
+    except Exception as ex:
+        # Fail open: a limiter outage must not take PostMessage down with it
+        rateLimitDecisions.inc(decision="error")
+        await AddLogOrError(SystemLogErrorSchema(
+            Msg=f"{str(ex)}\n{traceback.format_exc()}",
+            Type="ERROR",
+            ModuleName="RateLimiter/EnforceUserRateLimit",
+            CreatedBy=user.get("email") or ""
+        ))
+        return user
+    finally:
+        rateLimitLatency.observe(time.perf_counter() - started)
+
+    if not allowed:
+        rateLimitDecisions.inc(decision="limited")
+        raise _TooManyRequests("Too many messages, please slow down.", retry_after)
+    rateLimitDecisions.inc(decision="allowed")
+    return user
+
+async def AdmitAIRequest(request_id):
+    """Reserves an in-flight AI slot for request_id or raises 429 when all are taken."""
+    if not RATE_LIMIT_ENABLED:
+        return
+    try:
+        admitted = await aiAdmission.Admit(request_id)
+    except Exception as ex:
+        admissionDecisions.inc(decision="error")
+        await AddLogOrError(SystemLogErrorSchema(
+            Msg=f"{str(ex)}\n{traceback.format_exc()}",
+            Type="ERROR",
+            ModuleName="RateLimiter/AdmitAIRequest",
+            CreatedBy=""
+        ))
+        return
+    if not admitted:
+        admissionDecisions.inc(decision="rejected")
+        raise _TooManyRequests("The assistant is busy, please try again shortly.", AI_ADMISSION_RETRY_AFTER)
+    admissionDecisions.inc(decision="admitted")
+
+async def ReleaseAIRequest(request_id):
+    if not RATE_LIMIT_ENABLED or request_id is None:
+        return
+    try:
+        await aiAdmission.Release(request_id)
+    except Exception as ex:
+        await AddLogOrError(SystemLogErrorSchema(
+            Msg=f"{str(ex)}\n{traceback.format_exc()}",
+            Type="ERROR",
+            ModuleName="RateLimiter/ReleaseAIRequest",
+            CreatedBy=""
+        ))
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+import re
+import time
+import zlib
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+from Services.MetricsServices import GetCounter, GetGauge
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_SIMILARITY = os.getenv("RESPONSE_CACHE_SIMILARITY", "false").lower() == "true"
+RESPONSE_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("RESPONSE_CACHE_SIMILARITY_THRESHOLD", "0.92"))
+RESPONSE_CACHE_EMBEDDING_DIM = int(os.getenv("RESPONSE_CACHE_EMBEDDING_DIM", "512"))
+RESPONSE_CACHE_PENDING_MAX = int(os.getenv("RESPONSE_CACHE_PENDING_MAX", "10000"))
+RESPONSE_CACHE_MIN_WORDS = int(os.getenv("RESPONSE_CACHE_MIN_WORDS", "3"))
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+responseCacheLookups = GetCounter("chatapi_response_cache_lookups_total", "PostMessage response cache lookups", ["result"])
+responseCacheSaved = GetCounter("chatapi_response_cache_saved_seconds_total", "Estimated model round-trip time saved by cache hits")
+
+
+def NormalizeQuestion(message: str) -> str:
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", (message or "").lower())).strip()
+
+def ContextDigest(context: Optional[list]) -> str:
+    # Digest of the turns a reply was generated from; an empty context has a digest of its own
+    encoded = json.dumps(context or [], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+def _QuestionHash(normalized: str, context_digest: str) -> str:
+    return hashlib.sha1(f"{context_digest}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+class CacheHit(NamedTuple):
+    response: str
+    kind: str
+    similarity: float
+
+
+class HashingEmbedder:
+    """
+    CPU embedding without a model: word unigrams, bigrams and character trigrams
+    hashed into dim buckets, L2-normalised, so cosine similarity is a dot product.
+    """
+
+    def __init__(self, dim: int = RESPONSE_CACHE_EMBEDDING_DIM):
+        import numpy
+        self.np = numpy
+        self.dim = dim
+
+    def Embed(self, normalized: str):
+        vector = self.np.zeros(self.dim, dtype=self.np.float32)
+        words = normalized.split(" ")
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        padded = f" {normalized} "
+        features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+        for feature in features:
+            hashed = zlib.crc32(feature.encode("utf-8"))
+            vector[hashed % self.dim] += 1.0 if hashed & 0x80000000 else -1.0
+        norm = self.np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class _VectorIndex:
+    # Fixed-size matrix of embeddings; one slot per cached entry, searched with a single matmul
+    def __init__(self, embedder: HashingEmbedder, capacity: int):
+        np = embedder.np
+        self.np = np
+        self.matrix = np.zeros((capacity, embedder.dim), dtype=np.float32)
+        self.live = np.zeros(capacity, dtype=bool)
+        self.groups = np.zeros(capacity, dtype=np.int64)
+        self.keys = [None] * capacity
+        self.free = list(range(capacity - 1, -1, -1))
+        # Context digest -> small int, so Nearest only compares questions asked after the same turns
+        self._group_ids = {}
+
+    def _Group(self, context_digest: str) -> int:
+        return self._group_ids.setdefault(context_digest, len(self._group_ids) + 1)
+
+    def Add(self, key: str, vector, context_digest: str) -> int:
+        slot = self.free.pop()
+        self.matrix[slot] = vector
+        self.live[slot] = True
+        self.groups[slot] = self._Group(context_digest)
+        self.keys[slot] = key
+        return slot
+
+    def Remove(self, slot: int):
+        self.live[slot] = False
+        self.keys[slot] = None
+        self.free.append(slot)
+        if not self.live.any():
+            self._group_ids.clear()
+
+    def Nearest(self, vector, context_digest: str) -> Tuple[Optional[str], float]:
+        group = self._group_ids.get(context_digest)
+        if group is None:
+            return None, 0.0
+        candidates = self.live & (self.groups == group)
+        if not candidates.any():
+            return None, 0.0
+        scores = self.matrix @ vector
+        scores[~candidates] = -1.0
+        slot = int(self.np.argmax(scores))
+        return self.keys[slot], float(scores[slot])
+
+
+class _CacheEntry:
+    __slots__ = ("response", "expires_at", "slot")
+
+    def __init__(self, response: str, expires_at: float, slot: Optional[int]):
+        self.response = response
+        self.expires_at = expires_at
+        self.slot = slot
+
+
+class ResponseCache:
+    """
+    Bot replies keyed by the hash of the normalised question together with
+    the ContextDigest of the turns sent with it, checked by PostMessage before
+    the message goes to Kafka. A follow-up only hits a reply generated from
+    the same earlier turns; opening questions all share the empty-context
+    digest. Questions shorter than min_words ("why?", "tell me more") are
+    skipped.
+
+    Lookups try the exact hash first. With similarity on, a miss then takes the
+    nearest cached question with the same context digest by cosine similarity
+    of hashed embeddings and uses it at or above the threshold. Entries expire
+    after ttl and are evicted least-recently-used beyond max_entries.
+
+    Workers that echo the question and context_digest on ai_response fill the
+    cache on whichever replica consumes the reply. For the rest, PostMessage
+    remembers request_id -> (question, context digest) in a bounded pending
+    map until Store.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        ttl: float = RESPONSE_CACHE_TTL,
+        similarity: bool = RESPONSE_CACHE_SIMILARITY,
+        threshold: float = RESPONSE_CACHE_SIMILARITY_THRESHOLD,
+        pending_max: int = RESPONSE_CACHE_PENDING_MAX,
+        min_words: int = RESPONSE_CACHE_MIN_WORDS
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.pending_max = pending_max
+        self.min_words = min_words
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._pending: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self._embedder = HashingEmbedder() if similarity else None
+        self._index = _VectorIndex(self._embedder, max_entries) if similarity else None
+        # Running average of the model round trip, used to estimate time saved per hit
+        self.round_trip_seconds = 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def Lookup(self, message: str, context_digest: str) -> Optional[CacheHit]:
+        normalized = NormalizeQuestion(message)
+        if not self._Cacheable(normalized):
+            responseCacheLookups.inc(result="skipped")
+            return None
+        key = _QuestionHash(normalized, context_digest)
+        entry = self._Get(key)
+        if entry is not None:
+            return self._Hit(key, entry, "exact", 1.0)
+
+        if self._index is not None:
+            key, score = self._index.Nearest(self._embedder.Embed(normalized), context_digest)
+            if key is not None and score >= self.threshold:
+                entry = self._Get(key)
+                if entry is not None:
+                    return self._Hit(key, entry, "similar", score)
+        responseCacheLookups.inc(result="miss")
+        return None
+
+    def Remember(self, request_id, message: str, context_digest: str):
+        self._pending[str(request_id)] = (message, context_digest)
+        while len(self._pending) > self.pending_max:
+            self._pending.popitem(last=False)
+
+    def Store(
+        self,
+        request_id,
+        response: str,
+        question: Optional[str] = None,
+        context_digest: Optional[str] = None,
+        round_trip_seconds: Optional[float] = None
+    ):
+        pending = self._pending.pop(str(request_id), None)
+        if question is None or context_digest is None:
+            question, context_digest = pending or (None, None)
+        if round_trip_seconds is not None and round_trip_seconds >= 0:
+            self.round_trip_seconds = round_trip_seconds if not self.round_trip_seconds else 0.9 * self.round_trip_seconds + 0.1 * round_trip_seconds
+        normalized = NormalizeQuestion(question or "")
+        if not self._Cacheable(normalized) or not response or context_digest is None:
+            return
+
+        key = _QuestionHash(normalized, context_digest)
+        self._Remove(key)
+        while len(self._entries) >= self.max_entries:
+            self._Remove(next(iter(self._entries)))
+        slot = self._index.Add(key, self._embedder.Embed(normalized), context_digest) if self._index is not None else None
+        self._entries[key] = _CacheEntry(response, time.monotonic() + self.ttl, slot)
+
+    def HitRatio(self) -> float:
+        hits = responseCacheLookups.value(result="exact") + responseCacheLookups.value(result="similar")
+        total = hits + responseCacheLookups.value(result="miss")
+        return hits / total if total else 0.0
+
+    def _Cacheable(self, normalized: str) -> bool:
+        return bool(normalized) and len(normalized.split(" ")) >= self.min_words
+
+    def _Get(self, key: str) -> Optional[_CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at < time.monotonic():
+            self._Remove(key)
+            return None
+        return entry
+
+    def _Hit(self, key: str, entry: _CacheEntry, kind: str, similarity: float) -> CacheHit:
+        self._entries.move_to_end(key)
+        responseCacheLookups.inc(result=kind)
+        responseCacheSaved.inc(self.round_trip_seconds)
+        return CacheHit(entry.response, kind, similarity)
+
+    def _Remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry.slot is not None:
+            self._index.Remove(entry.slot)
+
+
+responseCache = ResponseCache()
+
+GetGauge("chatapi_response_cache_entries", "Replies held by the response cache", callback=lambda: len(responseCache))
+GetGauge("chatapi_response_cache_hit_ratio", "Share of PostMessage calls answered from the response cache", callback=responseCache.HitRatio)
+GetGauge("chatapi_response_cache_round_trip_seconds", "Average model round trip that a cache hit saves", callback=lambda: responseCache.round_trip_seconds)
@@ -0,0 +1,135 @@
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from Services.MetricsServices import GetCounter, GetGauge, GetHistogram
+
+RESPONSE_STREAM_TIMEOUT = float(os.getenv("RESPONSE_STREAM_TIMEOUT", "300"))
+
+# ai_response message types; messages without a type are complete replies
+STREAM_CHUNK = "chunk"
+STREAM_END = "end"
+
+streamFirstToken = GetHistogram("chatapi_stream_first_token_seconds", "Time from the user's message to the first streamed chunk")
+streamDuration = GetHistogram("chatapi_stream_duration_seconds", "Time from the first streamed chunk to the end of the reply")
+streamChunks = GetCounter("chatapi_stream_chunks_total", "Streamed reply chunks forwarded to websockets")
+streamIncomplete = GetCounter("chatapi_stream_incomplete_total", "End messages without a response whose chunks did not add up; the reply is not persisted")
+streamExpired = GetCounter("chatapi_stream_expired_total", "Streams dropped after RESPONSE_STREAM_TIMEOUT without an end message")
+
+
+def _ParseCreatedAt(value) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+class _OpenStream:
+    __slots__ = ("deltas", "next_seq", "started_at", "last_seen")
+
+    def __init__(self):
+        self.deltas: Dict[int, str] = {}
+        self.next_seq = 0
+        self.started_at = time.monotonic()
+        self.last_seen = self.started_at
+
+
+class ResponseStreamAssembler:
+    """
+    Collects the chunks of streamed replies per request_id until the end message.
+
+    All messages of one reply are keyed by user, so they land on one partition and
+    reach the same consumer in order; the assembled text only lives here. Chunks
+    carry a seq so a redelivered chunk is not appended twice.
+
+    The end message carries the full reply as response, or at least the number
+    of chunks sent as chunks. Chunks consumed before a rebalance are gone from
+    this process, so a reply is only rebuilt from the buffer when seqs
+    0..chunks-1 are all there.
+    """
+
+    def __init__(self, timeout: float = RESPONSE_STREAM_TIMEOUT):
+        self.timeout = timeout
+        self._streams: Dict[str, _OpenStream] = {}
+        self._last_sweep = time.monotonic()
+
+    def __len__(self):
+        return len(self._streams)
+
+    def AddChunk(self, data: dict) -> bool:
+        """Buffers one chunk; returns False for a chunk already seen."""
+        now = time.monotonic()
+        self._SweepExpired(now)
+        key = str(data.get("request_id"))
+        stream = self._streams.get(key)
+        if stream is None:
+            stream = self._streams[key] = _OpenStream()
+            created_at = _ParseCreatedAt(data.get("request_created_at"))
+            if created_at is not None:
+                streamFirstToken.observe(max(0.0, (datetime.now() - created_at).total_seconds()))
+        stream.last_seen = now
+
+        seq = int(data.setdefault("seq", stream.next_seq))
+        if seq in stream.deltas:
+            return False
+        stream.deltas[seq] = data.get("delta") or ""
+        stream.next_seq = max(stream.next_seq, seq + 1)
+        streamChunks.inc()
+        return True
+
+    def Assemble(self, data: dict) -> Optional[str]:
+        """
+        The full reply for an end message: its response when it carries one,
+        else the buffered chunks when all of them are here. None when the reply
+        cannot be rebuilt completely. The buffer is kept until Close, so an end
+        message replayed after a failed persist can still be assembled.
+        """
+        stream = self._streams.get(str(data.get("request_id")))
+        if stream is not None:
+            stream.last_seen = time.monotonic()
+        if data.get("response") is not None:
+            return data["response"]
+        if stream is None:
+            return None
+        try:
+            chunks = int(data["chunks"])
+        except (KeyError, TypeError, ValueError):
+            chunks = None
+        if chunks is None or any(seq not in stream.deltas for seq in range(chunks)):
+            streamIncomplete.inc()
+            return None
+        return "".join(stream.deltas[seq] for seq in range(chunks))
+
+    def Close(self, request_id):
+        """Drops the buffer of a reply that is persisted or cannot be rebuilt."""
+        stream = self._streams.pop(str(request_id), None)
+        if stream is not None:
+            streamDuration.observe(time.monotonic() - stream.started_at)
+
+    def _SweepExpired(self, now: float):
+        if now - self._last_sweep < self.timeout / 10:
+            return
+        self._last_sweep = now
+        expired: List[str] = [key for key, stream in self._streams.items() if now - stream.last_seen > self.timeout]
+        for key in expired:
+            del self._streams[key]
+        if expired:
+            streamExpired.inc(len(expired))
+
+
+def ChunkPayload(data: dict) -> str:
+    # What the browser gets per chunk; the final message is the usual CustomerChatMessageSchema
+    return json.dumps({
+        "type": STREAM_CHUNK,
+        "request_id": data.get("request_id"),
+        "seq": data.get("seq"),
+        "delta": data.get("delta") or ""
+    })
+
+
+responseStreams = ResponseStreamAssembler()
+
+GetGauge("chatapi_stream_open", "Streamed replies waiting for their end message", callback=lambda: len(responseStreams))
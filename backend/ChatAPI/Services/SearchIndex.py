@@ -0,0 +1,232 @@
+"""
+Per-user full-text search over chat messages.
+
+A message is split into lowercase word terms, without stop words and one-letter
+tokens. Each (user, term, message) becomes a CHAT_SEARCH_POSTINGS row with the
+term frequency and message length, and CHAT_SEARCH_DOCS holds one row per
+message. A query reads the postings of its terms for one user through the
+primary key and ranks the messages with BM25; any term may match, and
+messages matching more of them rank higher.
+
+New messages are indexed in the background by searchIndexer, fed from the same
+places that feed the history cache. Existing history is indexed by
+Workers/RebuildSearchIndex. Both insert with IGNORE, so they may overlap.
+"""
+import asyncio
+import math
+import os
+import re
+import traceback
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from Config.dbConnection import async_engine_chatbot
+from Models.shared import chatSearchDocs, chatSearchPostings, customerChatMessages
+from Schemas.shared import CustomerChatMessageSchema, SystemLogErrorSchema
+from Services.ChatArchive import chatArchive
+from Services.Instrumentation import Timed
+from Services.LogServices import AddLogOrError
+from Services.MetricsServices import GetCounter, GetGauge
+
+SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "true").lower() == "true"
+SEARCH_INDEX_BATCH_SIZE = int(os.getenv("SEARCH_INDEX_BATCH_SIZE", "200"))
+SEARCH_INDEX_MAX_WAIT_MS = float(os.getenv("SEARCH_INDEX_MAX_WAIT_MS", "50"))
+SEARCH_INDEX_QUEUE_SIZE = int(os.getenv("SEARCH_INDEX_QUEUE_SIZE", "20000"))
+SEARCH_MAX_QUERY_TERMS = int(os.getenv("SEARCH_MAX_QUERY_TERMS", "8"))
+SEARCH_BM25_K1 = float(os.getenv("SEARCH_BM25_K1", "1.2"))
+SEARCH_BM25_B = float(os.getenv("SEARCH_BM25_B", "0.75"))
+
+MAX_TERM_LENGTH = 64
+SMALLINT_MAX = 32767
+
+_TERM_PATTERN = re.compile(r"\w+")
+STOP_WORDS = frozenset((
+    "a an and are as at be but by can do does for from had has have how i if in into is it its me my "
+    "no not of on or our so than that the their them then there these they this to was we were what "
+    "when where which who why will with you your"
+).split())
+
+searchIndexedMessages = GetCounter("chatapi_search_indexed_messages_total", "Messages handed to the search indexer", ["result"])
+
+
+def Tokenize(text: Optional[str]) -> List[str]:
+    return [
+        term for term in _TERM_PATTERN.findall((text or "").lower())
+        if 1 < len(term) <= MAX_TERM_LENGTH and term not in STOP_WORDS
+    ]
+
+def IndexRows(user_key: str, message_id: int, text: Optional[str]) -> Tuple[Optional[dict], List[dict]]:
+    """The CHAT_SEARCH_DOCS row and CHAT_SEARCH_POSTINGS rows of one message; (None, []) when it has no terms."""
+    terms = Tokenize(text)
+    if not terms:
+        return None, []
+    length = min(len(terms), SMALLINT_MAX)
+    postings = [
+        {"USER_KEY": user_key, "TERM": term, "MESSAGE_ID": message_id, "TF": min(count, SMALLINT_MAX), "DOC_LENGTH": length}
+        for term, count in Counter(terms).items()
+    ]
+    return {"USER_KEY": user_key, "MESSAGE_ID": message_id, "LENGTH": len(terms)}, postings
+
+def _InsertIgnore(table, dialect: str):
+    if dialect == "mysql":
+        return insert(table).prefix_with("IGNORE")
+    if dialect == "sqlite":
+        return insert(table).prefix_with("OR IGNORE")
+    return insert(table)
+
+async def WriteIndexRows(conn: AsyncConnection, docs: List[dict], postings: List[dict]):
+    """Inserts index rows on conn, skipping ones already present; the caller commits."""
+    dialect = conn.dialect.name
+    for table, rows in ((chatSearchDocs, docs), (chatSearchPostings, postings)):
+        if rows:
+            # executemany: the driver batches the rows without compiling a statement per chunk
+            await conn.execute(_InsertIgnore(table, dialect), rows)
+
+
+class SearchIndexer:
+    """
+    Background writer of index rows for new messages.
+
+    Add only queues the message, so the chat path never waits for the index.
+    Queued messages are written in batches of up to max_batch_size, at most
+    max_wait_ms after the first one arrived. When the queue is full the
+    message is dropped and counted; a rebuild indexes it later.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine = async_engine_chatbot,
+        max_batch_size: int = SEARCH_INDEX_BATCH_SIZE,
+        max_wait_ms: float = SEARCH_INDEX_MAX_WAIT_MS,
+        max_queue_size: int = SEARCH_INDEX_QUEUE_SIZE
+    ):
+        self.engine = engine
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_queue_size = max_queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher_task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def Start(self):
+        if self._flusher_task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._flusher_task = asyncio.create_task(self._RunFlusher())
+
+    async def Stop(self):
+        if self._flusher_task is None:
+            return
+        await self._queue.put(None)
+        await self._flusher_task
+        self._flusher_task = None
+
+    def Add(self, user_key: str, message: CustomerChatMessageSchema):
+        if not SEARCH_INDEX_ENABLED or self._flusher_task is None:
+            return
+        try:
+            self._queue.put_nowait((user_key, message.id, message.message))
+        except asyncio.QueueFull:
+            searchIndexedMessages.inc(result="dropped")
+
+    async def _RunFlusher(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._Flush(batch)
+
+        remaining = [item for item in (self._queue.get_nowait() for _ in range(self._queue.qsize())) if item is not None]
+        for start in range(0, len(remaining), self.max_batch_size):
+            await self._Flush(remaining[start:start + self.max_batch_size])
+
+    async def _Flush(self, batch: List[tuple]):
+        docs, postings = [], []
+        for user_key, message_id, text in batch:
+            doc, rows = IndexRows(user_key, message_id, text)
+            if doc is not None:
+                docs.append(doc)
+                postings.extend(rows)
+        try:
+            async with self.engine.begin() as conn:
+                await WriteIndexRows(conn, docs, postings)
+            searchIndexedMessages.inc(len(batch), result="ok")
+        except Exception as ex:
+            searchIndexedMessages.inc(len(batch), result="failed")
+            await AddLogOrError(SystemLogErrorSchema(
+                Msg=f"{str(ex)}\n{traceback.format_exc()}",
+                Type="ERROR",
+                ModuleName="SearchIndex/_Flush",
+                CreatedBy=""
+            ))
+
+
+searchIndexer = SearchIndexer()
+
+GetGauge("chatapi_search_index_queue_depth", "Messages waiting to be indexed for search", callback=lambda: len(searchIndexer))
+
+
+def RankBM25(postings: Iterable[tuple], doc_count: int, total_length: int,
+             k1: float = SEARCH_BM25_K1, b: float = SEARCH_BM25_B) -> List[Tuple[int, float]]:
+    """(message id, score) best first, from (TERM, MESSAGE_ID, TF, DOC_LENGTH) postings of one user."""
+    postings = list(postings)
+    df = Counter(term for term, _, _, _ in postings)
+    doc_count = max(doc_count, max(df.values(), default=0))
+    average_length = total_length / doc_count if doc_count and total_length else 1.0
+    idf = {term: math.log(1 + (doc_count - count + 0.5) / (count + 0.5)) for term, count in df.items()}
+    scores: Dict[int, float] = defaultdict(float)
+    for term, message_id, tf, doc_length in postings:
+        scores[message_id] += idf[term] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_length / average_length))
+    return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+
+async def _LoadMessages(conn: AsyncConnection, user_key: str, ids: List[int]) -> Dict[int, CustomerChatMessageSchema]:
+    c = customerChatMessages.c
+    rows = (await conn.execute(
+        select(c.ID, c.USER, c.MESSAGE, c.CREATED_AT, c.IS_BOT, c.RESPONSE_TO)
+        .where(c.USER_KEY == user_key, c.ID.in_(ids))
+    )).fetchall()
+    messages = {row.ID: CustomerChatMessageSchema(**dict(row._mapping)) for row in rows}
+    missing = [message_id for message_id in ids if message_id not in messages]
+    if missing and chatArchive.MayHoldBefore(None):
+        for row in await asyncio.to_thread(chatArchive.ReadMessages, user_key, missing):
+            messages[row["ID"]] = CustomerChatMessageSchema(**row)
+    return messages
+
+@Timed("search")
+async def SearchUserMessages(user_key: str, query: str, page: int, page_size: int) -> Tuple[int, List[Tuple[CustomerChatMessageSchema, float]]]:
+    """Total matches and one page of (message, score), best first."""
+    terms = list(dict.fromkeys(Tokenize(query)))[:SEARCH_MAX_QUERY_TERMS]
+    if not terms:
+        return 0, []
+    d, p = chatSearchDocs.c, chatSearchPostings.c
+    async with async_engine_chatbot.connect() as conn:
+        doc_count, total_length = (await conn.execute(
+            select(func.count(), func.coalesce(func.sum(d.LENGTH), 0)).where(d.USER_KEY == user_key)
+        )).one()
+        postings = (await conn.execute(
+            select(p.TERM, p.MESSAGE_ID, p.TF, p.DOC_LENGTH).where(p.USER_KEY == user_key, p.TERM.in_(terms))
+        )).fetchall()
+        ranked = RankBM25(postings, doc_count, int(total_length))
+        page_hits = ranked[(page - 1) * page_size:page * page_size]
+        messages = await _LoadMessages(conn, user_key, [message_id for message_id, _ in page_hits]) if page_hits else {}
+    # A message that no longer exists in either tier is skipped rather than failing the page
+    return len(ranked), [(messages[message_id], score) for message_id, score in page_hits if message_id in messages]
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import traceback
+from typing import Dict, Optional, Tuple
+from sqlalchemy import insert, select, update
+from Config.dbConnection import AsyncSessionLocalChatBot
+from Models.shared import systemTableSl
+from Schemas.shared import SystemLogErrorSchema
+from Services.CallChatBotSPServices import sp_get_table_sl_block
+from Services.LogServices import AddLogOrError
+
+TABLE_SL_BLOCK_SIZE = int(os.getenv("TABLE_SL_BLOCK_SIZE", "1000"))
+TABLE_SL_REFILL_RATIO = float(os.getenv("TABLE_SL_REFILL_RATIO", "0.2"))
+
+
+class TableSlAllocator:
+    """
+    Hands out table serials from blocks reserved with CHATBOT_GetTableSlBlock.
+
+    Each process reserves a whole block with one locked round trip and then
+    serves serials from memory. When the current block runs low, the next one
+    is reserved in the background so callers never wait on the DB in steady
+    state. Serials are unique across processes but only increase per process,
+    so they say nothing about time order: anything that lists messages in order
+    sorts on (CREATED_AT, ID), with the serial only breaking ties.
+    """
+
+    def __init__(self, table_nm: str, block_size: int = TABLE_SL_BLOCK_SIZE, refill_ratio: float = TABLE_SL_REFILL_RATIO):
+        self.table_nm = table_nm
+        self.block_size = max(1, block_size)
+        self.refill_at = int(self.block_size * refill_ratio)
+        self._next_sl = 1
+        self._end_sl = 0
+        self._standby_block: Optional[Tuple[int, int]] = None
+        self._refill_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def remaining(self) -> int:
+        return self._end_sl - self._next_sl + 1
+
+    async def NextSl(self) -> int:
+        if self._next_sl > self._end_sl:
+            async with self._lock:
+                if self._next_sl > self._end_sl:
+                    await self._SwapInStandbyBlock()
+
+        sl = self._next_sl
+        self._next_sl += 1
+
+        if self.remaining <= self.refill_at:
+            self._StartRefill()
+        return sl
+
+    async def _ReserveBlock(self) -> Optional[Tuple[int, int]]:
+        db_session = None
+        try:
+            db_session = AsyncSessionLocalChatBot()
+            if db_session.bind.dialect.name != "mysql":
+                return await self._ReserveBlockWithoutProcedure(db_session)
+            return await sp_get_table_sl_block(db_session, self.table_nm, self.block_size)
+        finally:
+            if db_session:
+                await db_session.close()
+
+    async def _ReserveBlockWithoutProcedure(self, db_session) -> Tuple[int, int]:
+        # Same contract as CHATBOT_GetTableSlBlock (TABLE_SL is the next free serial),
+        # for databases without the procedure such as the SQLite benchmark stack
+        table = systemTableSl
+        async with db_session.begin():
+            updated = await db_session.execute(
+                update(table)
+                .where(table.c.TABLE_NM == self.table_nm)
+                .values(TABLE_SL=table.c.TABLE_SL + self.block_size)
+            )
+            if updated.rowcount == 0:
+                await db_session.execute(insert(table).values(TABLE_NM=self.table_nm, TABLE_SL=1 + self.block_size))
+                return 1, self.block_size
+            next_sl = (await db_session.execute(select(table.c.TABLE_SL).where(table.c.TABLE_NM == self.table_nm))).scalar_one()
+        start_sl = next_sl - self.block_size
+        return start_sl, start_sl + self.block_size - 1
+
+    def _StartRefill(self):
+        if self._standby_block is None and (self._refill_task is None or self._refill_task.done()):
+            self._refill_task = asyncio.create_task(self._Refill())
+
+    async def _Refill(self):
+        try:
+            block = await self._ReserveBlock()
+            if block:
+                self._standby_block = block
+        except Exception as ex:
+            error_msg = f"{str(ex)}\n{traceback.format_exc()}"
+            await AddLogOrError(SystemLogErrorSchema(
+                Msg=error_msg,
+                Type="ERROR",
+                ModuleName="TableSlAllocator/_Refill",
+                CreatedBy=""
+            ))
+
+    async def _SwapInStandbyBlock(self):
+        if self._standby_block is None and self._refill_task and not self._refill_task.done():
+            await self._refill_task
+
+        if self._standby_block is None:
+            self._standby_block = await self._ReserveBlock()
+
+        if self._standby_block is None:
+            raise RuntimeError(f"Unable to reserve table serial block for {self.table_nm}")
+
+        self._next_sl, self._end_sl = self._standby_block
+        self._standby_block = None
+
+
+_allocators: Dict[str, TableSlAllocator] = {}
+
+def GetTableSlAllocator(table_nm: str) -> TableSlAllocator:
+    allocator = _allocators.get(table_nm)
+    if allocator is None:
+        allocator = _allocators[table_nm] = TableSlAllocator(table_nm)
+    return allocator
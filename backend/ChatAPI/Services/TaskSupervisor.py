@@ -0,0 +1,87 @@
+import asyncio
+import os
+import time
+import traceback
+from typing import Awaitable, Callable, Dict
+from Schemas.shared import SystemLogErrorSchema
+from Services.LogServices import AddLogOrError
+from Services.MetricsServices import GetCounter
+
+BACKGROUND_TASK_RESTART_BACKOFF = float(os.getenv("BACKGROUND_TASK_RESTART_BACKOFF", "1"))
+BACKGROUND_TASK_RESTART_BACKOFF_MAX = float(os.getenv("BACKGROUND_TASK_RESTART_BACKOFF_MAX", "30"))
+
+taskRestarts = GetCounter("chatapi_background_task_restarts_total", "Background tasks restarted after they stopped", ["task"])
+
+
+class TaskSupervisor:
+    """
+    Keeps the lifespan's Kafka consumer loops running. A loop that ends while
+    the app is up, whether it raised or returned after logging its own error,
+    is logged and started again after a backoff. The backoff doubles up to
+    max_backoff and resets once a run has lasted longer than max_backoff.
+    """
+
+    def __init__(self, backoff: float = BACKGROUND_TASK_RESTART_BACKOFF, max_backoff: float = BACKGROUND_TASK_RESTART_BACKOFF_MAX):
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._factories: Dict[str, Callable[[], Awaitable]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._running: Dict[str, bool] = {}
+        self._started_at: Dict[str, float] = {}
+        self._delays: Dict[str, float] = {}
+        self._stopping = False
+
+    def Start(self, name: str, factory: Callable[[], Awaitable]):
+        self._stopping = False
+        self._factories[name] = factory
+        self._delays[name] = self.backoff
+        self._Launch(name)
+
+    async def Stop(self):
+        self._stopping = True
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._running.clear()
+
+    def Running(self) -> Dict[str, bool]:
+        return dict(self._running)
+
+    def _Launch(self, name: str):
+        task = asyncio.create_task(self._factories[name]())
+        self._tasks[name] = task
+        self._running[name] = True
+        self._started_at[name] = time.monotonic()
+        task.add_done_callback(lambda done: self._OnDone(name, done))
+
+    def _OnDone(self, name: str, task: asyncio.Task):
+        if self._stopping:
+            return
+        self._running[name] = False
+        self._tasks[name] = asyncio.create_task(self._Restart(name, task))
+
+    async def _Restart(self, name: str, task: asyncio.Task):
+        if time.monotonic() - self._started_at[name] > self.max_backoff:
+            self._delays[name] = self.backoff
+        delay = self._delays[name]
+        self._delays[name] = min(delay * 2, self.max_backoff)
+        if task.cancelled():
+            detail = "cancelled"
+        else:
+            ex = task.exception()
+            detail = "".join(traceback.format_exception(ex)) if ex is not None else "returned"
+        taskRestarts.inc(task=name)
+        await AddLogOrError(SystemLogErrorSchema(
+            Msg=f"Background task {name} stopped, restarting in {delay:.1f}s: {detail}",
+            Type="ERROR",
+            ModuleName="TaskSupervisor/_Restart",
+            CreatedBy=""
+        ))
+        await asyncio.sleep(delay)
+        if not self._stopping:
+            self._Launch(name)
+
+
+taskSupervisor = TaskSupervisor()
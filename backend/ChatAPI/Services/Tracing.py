@@ -0,0 +1,390 @@
+"""
+Request tracing across the ChatAPI -> Chat_message -> AI worker -> ai_response
+-> ConsumeResponse -> WebSocket hops.
+
+Trace context travels as a W3C traceparent header: on HTTP requests, and on
+Kafka messages as a message header. The active span lives in a ContextVar, so
+nested Timed operations become child spans without passing anything around.
+
+Finished spans go to a bounded in-memory buffer, which the /Tracing endpoints
+read, and to a SpanExporter. The exporter writes JSON lines to a daily file or
+posts OTLP/JSON to a collector from a background task, the same way LogPipeline
+handles log records.
+"""
+import asyncio
+import json
+import os
+import random
+import secrets
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional
+import httpx
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "ChatAPI")
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "FILE").upper()
+TRACE_DIR = os.getenv("TRACE_DIR", os.getenv("LOG_DIR", "/app/logs"))
+TRACE_OTLP_URL = os.getenv("TRACE_OTLP_URL", "http://otel-collector:4318/v1/traces")
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "20000"))
+TRACE_EXPORT_QUEUE_SIZE = int(os.getenv("TRACE_EXPORT_QUEUE_SIZE", "10000"))
+TRACE_EXPORT_BATCH_SIZE = int(os.getenv("TRACE_EXPORT_BATCH_SIZE", "500"))
+TRACE_EXPORT_INTERVAL_MS = int(os.getenv("TRACE_EXPORT_INTERVAL_MS", "1000"))
+
+TRACEPARENT = "traceparent"
+
+
+class SpanContext(NamedTuple):
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+
+class Span:
+    __slots__ = ("name", "context", "parent_id", "start_time", "duration", "status", "attributes", "service")
+
+    def __init__(self, name: str, context: SpanContext, parent_id: Optional[str], start_time: float, service: str, attributes: dict):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.start_time = start_time
+        self.duration = 0.0
+        self.status = "ok"
+        self.attributes = attributes
+        self.service = service
+
+    def ToDict(self) -> dict:
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.service,
+            "start": datetime.fromtimestamp(self.start_time).isoformat(),
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+
+_currentSpan: ContextVar[Optional[SpanContext]] = ContextVar("current_span", default=None)
+
+
+def ParseTraceparent(value) -> Optional[SpanContext]:
+    # version-traceid-spanid-flags, e.g. 00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01
+    if isinstance(value, bytes):
+        value = value.decode("ascii", "ignore")
+    parts = (value or "").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    return SpanContext(parts[1], parts[2], bool(flags & 1))
+
+def FormatTraceparent(context: SpanContext) -> str:
+    return f"00-{context.trace_id}-{context.span_id}-{'01' if context.sampled else '00'}"
+
+def CurrentSpan() -> Optional[SpanContext]:
+    return _currentSpan.get()
+
+def KafkaTraceHeaders(context: Optional[SpanContext] = None) -> Optional[list]:
+    """traceparent of context (default: the active span) as aiokafka headers, or None."""
+    context = context or _currentSpan.get()
+    if context is None:
+        return None
+    return [(TRACEPARENT, FormatTraceparent(context).encode("ascii"))]
+
+def ParseKafkaHeaders(headers) -> Optional[SpanContext]:
+    for key, value in headers or ():
+        if key == TRACEPARENT:
+            return ParseTraceparent(value)
+    return None
+
+@contextmanager
+def ContinueTrace(parent: Optional[SpanContext]) -> Iterator[None]:
+    """Makes parent (e.g. from a consumed message's headers) the active span for the block."""
+    token = _currentSpan.set(parent)
+    try:
+        yield
+    finally:
+        _currentSpan.reset(token)
+
+def _Percentile(ordered: List[float], pct: float) -> float:
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+class SpanExporter:
+    """
+    Ships finished spans in batches from a background task: TRACE_EXPORTER=FILE
+    appends JSON lines to "<service> - traces - <day>.jsonl", OTLP posts
+    OTLP/JSON to TRACE_OTLP_URL and NONE keeps spans in memory only. The queue
+    is bounded; spans beyond it are dropped and counted.
+    """
+
+    def __init__(
+        self,
+        service_name: str,
+        mode: str = TRACE_EXPORTER,
+        trace_dir: str = TRACE_DIR,
+        otlp_url: str = TRACE_OTLP_URL,
+        queue_size: int = TRACE_EXPORT_QUEUE_SIZE,
+        batch_size: int = TRACE_EXPORT_BATCH_SIZE,
+        interval: float = TRACE_EXPORT_INTERVAL_MS / 1000
+    ):
+        self.service_name = service_name
+        self.mode = mode
+        self.trace_dir = trace_dir
+        self.otlp_url = otlp_url
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.interval = interval
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def Export(self, span: Span):
+        if self._task is None:
+            return
+        try:
+            self._queue.put_nowait(span)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def Start(self):
+        if self._task is not None or self.mode == "NONE":
+            return
+        if self.mode == "OTLP":
+            self._client = httpx.AsyncClient(timeout=5)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._Run())
+
+    async def Stop(self):
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _Run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            span = await self._queue.get()
+            if span is None:
+                break
+            batch = [span]
+            deadline = loop.time() + self.interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    span = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+            await self._Flush(batch)
+
+        batch = []
+        while not self._queue.empty():
+            span = self._queue.get_nowait()
+            if span is not None:
+                batch.append(span)
+        if batch:
+            await self._Flush(batch)
+
+    async def _Flush(self, batch: List[Span]):
+        try:
+            if self.mode == "OTLP":
+                response = await self._client.post(self.otlp_url, json=self._OtlpPayload(batch))
+                response.raise_for_status()
+            else:
+                await asyncio.to_thread(self._WriteFile, batch)
+            self.exported += len(batch)
+        except Exception as ex:
+            self.failed += len(batch)
+            print(f"Span export failed: {ex}")
+
+    def _WriteFile(self, batch: List[Span]):
+        os.makedirs(self.trace_dir, exist_ok=True)
+        path = os.path.join(self.trace_dir, f"{self.service_name} - traces - {datetime.now().strftime('%d-%m-%Y')}.jsonl")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(span.ToDict()) + "\n" for span in batch))
+
+    def _OtlpPayload(self, batch: List[Span]) -> dict:
+        def attribute(key, value):
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+
+        spans = []
+        for span in batch:
+            start_ns = int(span.start_time * 1e9)
+            spans.append({
+                "traceId": span.context.trace_id,
+                "spanId": span.context.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(start_ns),
+                "endTimeUnixNano": str(start_ns + int(span.duration * 1e9)),
+                "attributes": [attribute(key, value) for key, value in span.attributes.items()],
+                "status": {"code": 2 if span.status == "error" else 1}
+            })
+        return {"resourceSpans": [{
+            "resource": {"attributes": [attribute("service.name", self.service_name)]},
+            "scopeSpans": [{"scope": {"name": "chatbot.tracing"}, "spans": spans}]
+        }]}
+
+
+class Tracer:
+    """
+    Creates spans for one service. Unsampled traces still propagate their
+    context but record nothing, so TRACE_SAMPLE_RATE bounds the overhead.
+    """
+
+    def __init__(
+        self,
+        service_name: str = TRACE_SERVICE_NAME,
+        exporter: Optional[SpanExporter] = None,
+        enabled: bool = TRACING_ENABLED,
+        sample_rate: float = TRACE_SAMPLE_RATE,
+        buffer_size: int = TRACE_BUFFER_SIZE
+    ):
+        self.service_name = service_name
+        self.exporter = exporter or SpanExporter(service_name)
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self._recent: deque = deque(maxlen=buffer_size)
+
+    async def Start(self):
+        if self.enabled:
+            await self.exporter.Start()
+
+    async def Stop(self):
+        await self.exporter.Stop()
+
+    def _NewContext(self, parent: Optional[SpanContext]) -> SpanContext:
+        if parent is None:
+            return SpanContext(secrets.token_hex(16), secrets.token_hex(8), random.random() < self.sample_rate)
+        return SpanContext(parent.trace_id, secrets.token_hex(8), parent.sampled)
+
+    @contextmanager
+    def StartSpan(self, name: str, parent: Optional[SpanContext] = None, **attributes) -> Iterator[Optional[Span]]:
+        """
+        Runs the block as a child of parent (default: the active span), or as a
+        new trace when there is none. Yields None when tracing is off.
+        """
+        if not self.enabled:
+            yield None
+            return
+        parent = parent or _currentSpan.get()
+        context = self._NewContext(parent)
+        span = Span(name, context, parent.span_id if parent else None, time.time(), self.service_name, attributes) if context.sampled else None
+        started = time.perf_counter()
+        token = _currentSpan.set(context)
+        try:
+            yield span
+        except BaseException:
+            if span is not None:
+                span.status = "error"
+            raise
+        finally:
+            _currentSpan.reset(token)
+            if span is not None:
+                span.duration = time.perf_counter() - started
+                self._Finish(span)
+
+    def RecordSpan(self, name: str, parent: Optional[SpanContext], start_time: float, duration: float, **attributes) -> Optional[SpanContext]:
+        """Records a span that already happened (e.g. one item of a batch) and returns its context."""
+        if not self.enabled:
+            return None
+        context = self._NewContext(parent)
+        if context.sampled:
+            span = Span(name, context, parent.span_id if parent else None, start_time, self.service_name, attributes)
+            span.duration = duration
+            self._Finish(span)
+        return context
+
+    def _Finish(self, span: Span):
+        self._recent.append(span)
+        self.exporter.Export(span)
+
+    def GetTrace(self, trace_id: str) -> List[dict]:
+        """Spans of one trace still in the buffer, in start order, with offsets from the first."""
+        spans = sorted((span for span in list(self._recent) if span.context.trace_id == trace_id), key=lambda span: span.start_time)
+        if not spans:
+            return []
+        origin = spans[0].start_time
+        return [dict(span.ToDict(), offset_ms=round((span.start_time - origin) * 1000, 3)) for span in spans]
+
+    def StageBreakdown(self, window_seconds: Optional[float] = None) -> Dict[str, dict]:
+        """
+        Latency per stage (span name) over the buffered spans, plus "ai_hop": the
+        gap between Chat_message being produced and its ai_response being
+        consumed in the same trace, i.e. queueing and generation in the worker.
+        """
+        spans = list(self._recent)
+        if window_seconds is not None:
+            since = time.time() - window_seconds
+            spans = [span for span in spans if span.start_time >= since]
+
+        stages: Dict[str, List[float]] = {}
+        produced: Dict[str, float] = {}
+        consumed: Dict[str, float] = {}
+        for span in spans:
+            stages.setdefault(span.name, []).append(span.duration)
+            if span.name == "kafka_send":
+                produced[span.context.trace_id] = span.start_time + span.duration
+            elif span.name == "consume_response":
+                consumed.setdefault(span.context.trace_id, span.start_time)
+        hops = [consumed[trace_id] - end for trace_id, end in produced.items() if trace_id in consumed]
+        if hops:
+            stages["ai_hop"] = hops
+
+        breakdown = {}
+        for name, durations in stages.items():
+            ordered = sorted(durations)
+            breakdown[name] = {
+                "count": len(ordered),
+                "p50_ms": round(_Percentile(ordered, 50) * 1000, 3),
+                "p95_ms": round(_Percentile(ordered, 95) * 1000, 3),
+                "p99_ms": round(_Percentile(ordered, 99) * 1000, 3),
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3)
+            }
+        return breakdown
+
+    def Stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "buffered_spans": len(self._recent),
+            "exporter": self.exporter.mode,
+            "exported": self.exporter.exported,
+            "dropped": self.exporter.dropped,
+            "failed": self.exporter.failed
+        }
+
+
+tracer = Tracer()
@@ -1,31 +1,48 @@
 import httpx
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from Services.AuthCache import tokenCache, GetTokenHash, GetTokenExpiry
+from Services.ChatAuthClient import RequestChatAuth
+from Services.Instrumentation import Timed
 
 security = HTTPBearer()
 
-CHAT_AUTH_URL = "http://chatauth:1001"
-
 async def _VerifyTokenWithAuthService(token: str):
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{CHAT_AUTH_URL}/GoogleAuth/VerifyToken",
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return None
-        except httpx.RequestError:
-            return None
+    """Returns (user_data, rejected). rejected is False when ChatAuth could not be reached."""
+    try:
+        response = await RequestChatAuth(
+            "GET",
+            "/GoogleAuth/VerifyToken",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        if response.status_code == 200:
+            return response.json(), False
+        else:
+            return None, response.status_code in (401, 403)
+    except httpx.RequestError:
+        return None, False
 
+@Timed("auth_verify")
 async def GetCurrentUser(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
-    user_data = await _VerifyTokenWithAuthService(token)
+    token_hash = GetTokenHash(token)
+
+    found, user = tokenCache.Get(token_hash)
+    if found:
+        if user is None:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        return user
+
+    user_data, rejected = await _VerifyTokenWithAuthService(token)
     if not user_data:
+        if rejected:
+            tokenCache.PutInvalid(token_hash)
         raise HTTPException(status_code=401, detail="Invalid token")
     if user_data["valid"] == True:
+        tokenCache.PutValid(token_hash, user_data["user"], GetTokenExpiry(token))
         return user_data["user"]
     else:
-        return None
\ No newline at end of file
+        return None
+
+def InvalidateToken(token_hash: str):
+    tokenCache.PutInvalid(token_hash)
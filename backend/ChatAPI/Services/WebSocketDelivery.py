@@ -0,0 +1,67 @@
+import os
+import socket
+import traceback
+import uuid
+from Schemas.shared import SystemLogErrorSchema, CustomerChatMessageSchema
+from Services.CommonServices import GetSha1Hash
+from Services.ConnectionManager import connectionManager
+from Services.Instrumentation import Timed
+from Services.KafkaMessageProducer import SendEvent
+from Services.LogServices import AddLogOrError
+from Services.MetricsServices import GetCounter
+
+WS_FANOUT_ENABLED = os.getenv("WS_FANOUT_ENABLED", "true").lower() == "true"
+WS_DELIVERY_TOPIC = "ws_delivery"
+NODE_ID = os.getenv("NODE_ID") or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+wsDeliveries = GetCounter("chatapi_ws_deliveries_total", "WebSocket payloads queued for sockets on this node", ["source"])
+wsFanoutPublished = GetCounter("chatapi_ws_fanout_published_total", "Payloads broadcast to the other nodes")
+
+
+def DeliverLocal(user_hash: str, payload: str, source: str = "local") -> int:
+    # Only queues the payload; each socket's writer task does the actual send
+    queued = connectionManager.Send(user_hash, payload)
+    if queued:
+        wsDeliveries.inc(queued, source=source)
+    return queued
+
+def DeliverLocalMany(items: list, source: str = "fanout") -> int:
+    queued = connectionManager.SendMany(items)
+    if queued:
+        wsDeliveries.inc(queued, source=source)
+    return queued
+
+async def _Broadcast(user_hash: str, event: dict):
+    if not WS_FANOUT_ENABLED:
+        return
+    try:
+        await SendEvent(WS_DELIVERY_TOPIC, {"origin": NODE_ID, "user_hash": user_hash, **event}, key=user_hash)
+        wsFanoutPublished.inc()
+    except Exception as ex:
+        error_msg = f"{str(ex)}\n{traceback.format_exc()}"
+        await AddLogOrError(SystemLogErrorSchema(
+            Msg=error_msg,
+            Type="ERROR",
+            ModuleName="WebSocketDelivery/_Broadcast",
+            CreatedBy=""
+        ))
+
+@Timed("ws_send")
+async def DeliverToUser(user: str, payload: str, message: bool = False):
+    """
+    Sends payload to every socket the user holds, on this node or any other.
+
+    The socket may live on another replica or worker than the one that consumed
+    the reply, so the payload is also broadcast on WS_DELIVERY_TOPIC, which every
+    node reads and filters against its own connections. message marks payload as
+    a persisted CustomerChatMessageSchema; the other nodes also add it to their
+    history cache and context windows.
+    """
+    user_hash = await GetSha1Hash(user)
+    DeliverLocal(user_hash, payload)
+    await _Broadcast(user_hash, {"payload": payload, "message": message})
+
+async def ShareMessage(message: CustomerChatMessageSchema):
+    """Hands a message no socket receives (the user's own question) to the other nodes' history cache and context windows."""
+    user_hash = await GetSha1Hash(message.user)
+    await _Broadcast(user_hash, {"payload": message.model_dump_json(), "message": True, "deliver": False})
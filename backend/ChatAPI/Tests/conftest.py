@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# Modules read their settings at import time; keep the tests off /app and MySQL
+os.environ.setdefault("LOG_DIR", tempfile.mkdtemp(prefix="chatapi-test-logs-"))
+os.environ.setdefault("DB_CHATBOT_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(prefix='chatapi-test-db-'), 'chatbot.db')}")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,38 @@
+import asyncio
+from Workers import AIWorker as AIWorkerModule
+from Workers.AIWorker import AIWorker
+
+
+class _Producer:
+    def __init__(self):
+        self.sent = []
+
+    async def send_and_wait(self, topic, value=None, key=None, headers=None):
+        self.sent.append((topic, value))
+
+
+class _FailingBackend:
+    async def Generate(self, requests):
+        raise RuntimeError("model unavailable")
+
+
+class _Logger:
+    def Log(self, *args):
+        pass
+
+
+def test_dead_lettered_request_gets_error_reply(monkeypatch):
+    monkeypatch.setattr(AIWorkerModule, "AI_WORKER_RETRY_BACKOFF", 0)
+    producer = _Producer()
+    worker = AIWorker(None, producer, _FailingBackend(), _Logger(), retries=0)
+    request = {"id": 5, "user": "someone@example.com", "message": "Where is my parcel?", "context": []}
+
+    replies = asyncio.run(worker._Generate([request]))
+    asyncio.run(worker._Deliver(request, replies[0]))
+
+    topics = [topic for topic, _ in producer.sent]
+    assert topics == [AIWorkerModule.AI_WORKER_DEAD_LETTER_TOPIC, "ai_response"]
+    reply = producer.sent[1][1]
+    assert reply["request_id"] == 5
+    assert reply["error"] is True
+    assert reply["response"] == AIWorkerModule.AI_WORKER_FALLBACK_REPLY
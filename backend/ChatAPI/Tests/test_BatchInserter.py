@@ -0,0 +1,32 @@
+import asyncio
+from Models.shared import customerChatMessages
+from Schemas.shared import CustomerChatMessageSchema
+from Services import BatchInserter as BatchInserterModule
+from Services.BatchInserter import BatchInserter
+
+
+def _Message(message_id: int) -> CustomerChatMessageSchema:
+    return CustomerChatMessageSchema(id=message_id, user="someone@example.com", message="hi", is_bot=False)
+
+
+def test_queued_rows_fail_when_flusher_dies(monkeypatch):
+    async def nothing(*args, **kwargs):
+        return None
+
+    async def broken_flush(batch):
+        raise RuntimeError("unexpected flusher failure")
+
+    monkeypatch.setattr(BatchInserterModule, "AddLogOrError", nothing)
+
+    async def run():
+        inserter = BatchInserter[CustomerChatMessageSchema](customerChatMessages, CustomerChatMessageSchema, max_wait_ms=20)
+        monkeypatch.setattr(inserter, "_Flush", broken_flush)
+        await inserter.Start()
+        results = await asyncio.wait_for(
+            asyncio.gather(*(inserter.insert_record(_Message(i)) for i in range(3)), return_exceptions=True),
+            timeout=1
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert not inserter.running
+
+    asyncio.run(run())
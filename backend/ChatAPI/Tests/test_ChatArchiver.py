@@ -0,0 +1,41 @@
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from Migrations.Migrate import RunMigrations
+from Models.shared import customerChatMessages
+from Services.ChatArchive import ChatArchive
+from Workers.ChatArchiver import ArchiveOnce
+
+
+def test_archives_by_created_at_and_deletes_only_archived_rows(tmp_path):
+    now = datetime.now()
+    # IDs come from per-process blocks, so a low ID can be newer than a high one
+    rows = [
+        {"ID": 500 + i, "USER": "someone@example.com", "MESSAGE": f"old {i}", "CREATED_AT": now - timedelta(days=100, minutes=i), "IS_BOT": False}
+        for i in range(7)
+    ] + [
+        {"ID": 1 + i, "USER": "someone@example.com", "MESSAGE": f"new {i}", "CREATED_AT": now - timedelta(minutes=i), "IS_BOT": False}
+        for i in range(3)
+    ]
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'chatbot.db'}")
+        try:
+            await RunMigrations(engine)
+            async with engine.begin() as conn:
+                await conn.execute(insert(customerChatMessages), rows)
+            archive = ChatArchive(str(tmp_path / "archive"))
+            stats = await ArchiveOnce(engine, archive, after_days=90, chunk_rows=3, delete_batch=2)
+            async with engine.connect() as conn:
+                remaining = set((await conn.execute(select(customerChatMessages.c.ID))).scalars())
+            return stats, archive, remaining
+        finally:
+            await engine.dispose()
+
+    stats, archive, remaining = asyncio.run(run())
+    assert remaining == {1, 2, 3}
+    assert stats["archived_rows"] == stats["deleted_rows"] == 7
+    assert archive.Stats()["pending_delete"] == 0
+    archived = archive.ReadMessages("someone@example.com", [500 + i for i in range(7)])
+    assert len(archived) == 7
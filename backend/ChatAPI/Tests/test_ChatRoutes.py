@@ -0,0 +1,44 @@
+import asyncio
+from Routes import ChatRoutes
+from Schemas.shared import ChatRequestSchema
+
+
+def test_failed_send_releases_slot_and_reports_failure(monkeypatch):
+    admitted = []
+    released = []
+
+    async def nothing(*args, **kwargs):
+        return None
+
+    async def next_id(table):
+        return 42
+
+    async def admit(request_id):
+        admitted.append(request_id)
+
+    async def release(request_id):
+        released.append(request_id)
+
+    async def broken_send(*args, **kwargs):
+        raise RuntimeError("Failed to send message to Kafka")
+
+    async def no_context(user_key):
+        return []
+
+    monkeypatch.setattr(ChatRoutes, "GetTableSl", next_id)
+    monkeypatch.setattr(ChatRoutes, "_BuildContext", no_context)
+    monkeypatch.setattr(ChatRoutes, "AdmitAIRequest", admit)
+    monkeypatch.setattr(ChatRoutes, "ReleaseAIRequest", release)
+    monkeypatch.setattr(ChatRoutes, "SendMessage", broken_send)
+    monkeypatch.setattr(ChatRoutes, "ShareMessage", nothing)
+    monkeypatch.setattr(ChatRoutes, "AddLogOrError", nothing)
+    monkeypatch.setattr(ChatRoutes.chatMessageInserter, "insert_record", nothing)
+
+    status = asyncio.run(ChatRoutes.PostMessage(
+        ChatRequestSchema(message="Where is my parcel right now?"),
+        user={"email": "someone@example.com"}
+    ))
+
+    assert status.Status == "FAILED"
+    assert admitted == [42]
+    assert released == [42]
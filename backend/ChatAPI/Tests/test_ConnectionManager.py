@@ -0,0 +1,38 @@
+import asyncio
+from Services import ConnectionManager as ConnectionManagerModule
+from Services.ConnectionManager import ConnectionManager
+
+
+class _BrokenSocket:
+    def __init__(self):
+        self.closed_with = None
+
+    async def send_text(self, payload):
+        raise ConnectionResetError("peer went away")
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+def test_failed_send_logs_and_disconnects(monkeypatch):
+    logged = []
+
+    async def log(error):
+        logged.append(error)
+
+    monkeypatch.setattr(ConnectionManagerModule, "AddLogOrError", log)
+
+    async def run():
+        manager = ConnectionManager()
+        socket = _BrokenSocket()
+        manager.Connect("user", socket)
+        assert manager.Send("user", "hello") == 1
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert not manager.HasUser("user")
+        assert not manager._tasks
+        return socket
+
+    socket = asyncio.run(run())
+    assert socket.closed_with == 1000
+    assert logged[0].ModuleName == "ConnectionManager/_RunWriter"
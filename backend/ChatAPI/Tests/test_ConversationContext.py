@@ -0,0 +1,25 @@
+import asyncio
+import pytest
+from Services.ConversationContext import ConversationContextBuilder
+
+
+def test_cancelled_load_fails_waiting_requests():
+    started = asyncio.Event()
+
+    async def slow_loader(user_key, max_turns):
+        started.set()
+        await asyncio.sleep(10)
+        return []
+
+    async def run():
+        builder = ConversationContextBuilder(loader=slow_loader)
+        first = asyncio.create_task(builder.Build("user"))
+        await started.wait()
+        second = asyncio.create_task(builder.Build("user"))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(second, timeout=1)
+        assert not builder._loading
+
+    asyncio.run(run())
@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+from Services.ResponseStream import responseStreams, STREAM_CHUNK, STREAM_END
+from Workers import KafkaMessageConsumer
+
+
+def test_streamed_reply_survives_failed_persist(monkeypatch):
+    persisted_replies = []
+    attempts = []
+
+    async def persist(response_data, response):
+        attempts.append(response)
+        if len(attempts) == 1:
+            raise RuntimeError("database unavailable")
+        persisted_replies.append(response)
+        return object()
+
+    async def nothing(*args, **kwargs):
+        return None
+
+    async def none_persisted(request_ids):
+        return set()
+
+    monkeypatch.setattr(KafkaMessageConsumer, "_PersistResponse", persist)
+    monkeypatch.setattr(KafkaMessageConsumer, "_PersistedRequestIds", none_persisted)
+    monkeypatch.setattr(KafkaMessageConsumer, "_DeliverResponse", nothing)
+    monkeypatch.setattr(KafkaMessageConsumer, "DeliverToUser", nothing)
+    monkeypatch.setattr(KafkaMessageConsumer, "ReleaseAIRequest", nothing)
+
+    async def run():
+        base = {"request_id": 41, "user": "a@example.com"}
+        for seq, delta in enumerate(["Hello ", "there ", "friend"]):
+            await KafkaMessageConsumer._ProcessResponse({**base, "type": STREAM_CHUNK, "seq": seq, "delta": delta})
+        end = {**base, "type": STREAM_END, "chunks": 3}
+        with pytest.raises(RuntimeError):
+            await KafkaMessageConsumer._ProcessResponse(dict(end))
+        # Only the end message is replayed; the chunks were committed
+        await KafkaMessageConsumer._ProcessResponse(dict(end))
+
+    asyncio.run(run())
+    assert attempts == ["Hello there friend", "Hello there friend"]
+    assert persisted_replies == ["Hello there friend"]
+    assert len(responseStreams) == 0
@@ -0,0 +1,34 @@
+import asyncio
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import create_async_engine
+from Config.dbConnection import meta
+from Migrations.Migrate import RunMigrations
+import Models.shared
+
+
+def _Schema(sync_conn, tables):
+    inspector = inspect(sync_conn)
+    return {
+        table: (
+            sorted(column["name"] for column in inspector.get_columns(table)),
+            sorted(index["name"] for index in inspector.get_indexes(table))
+        )
+        for table in tables
+    }
+
+
+def test_migrations_build_the_model_schema(tmp_path):
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'chatbot.db'}")
+        try:
+            await RunMigrations(engine)
+            async with engine.connect() as conn:
+                return await conn.run_sync(_Schema, list(meta.tables))
+        finally:
+            await engine.dispose()
+
+    migrated = asyncio.run(run())
+    for name, table in meta.tables.items():
+        columns, indexes = migrated[name]
+        assert columns == sorted(column.name for column in table.columns), name
+        assert indexes == sorted(index.name for index in table.indexes), name
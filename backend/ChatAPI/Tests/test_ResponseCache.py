@@ -0,0 +1,24 @@
+from Services.ResponseCache import ResponseCache, ContextDigest
+
+
+def test_follow_up_only_hits_reply_from_same_context():
+    cache = ResponseCache(similarity=False)
+    question = "What are your opening hours?"
+    first_turns = [{"role": "user", "content": "Hi, I need help with my order"}]
+    other_turns = [{"role": "user", "content": "Do you ship to Canada?"}]
+
+    cache.Remember(1, question, ContextDigest(first_turns))
+    cache.Store(1, "We are open 9 to 5.")
+
+    assert cache.Lookup(question, ContextDigest(first_turns)).response == "We are open 9 to 5."
+    assert cache.Lookup(question, ContextDigest(other_turns)) is None
+    assert cache.Lookup(question, ContextDigest([])) is None
+
+
+def test_echoed_digest_keys_reply_without_pending_entry():
+    cache = ResponseCache(similarity=False)
+    question = "How do I reset my password?"
+
+    cache.Store(7, "Use the link on the login page.", question=question, context_digest=ContextDigest([]))
+
+    assert cache.Lookup(question, ContextDigest([])).response == "Use the link on the login page."
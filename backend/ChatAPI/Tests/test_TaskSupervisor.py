@@ -0,0 +1,32 @@
+import asyncio
+from Services import TaskSupervisor as TaskSupervisorModule
+from Services.TaskSupervisor import TaskSupervisor
+
+
+def test_failed_task_is_logged_and_restarted(monkeypatch):
+    logged = []
+    runs = []
+
+    async def log(error):
+        logged.append(error)
+
+    monkeypatch.setattr(TaskSupervisorModule, "AddLogOrError", log)
+
+    async def consumer():
+        runs.append(1)
+        if len(runs) == 1:
+            raise ConnectionError("broker unreachable")
+        await asyncio.sleep(10)
+
+    async def run():
+        supervisor = TaskSupervisor(backoff=0.01, max_backoff=0.05)
+        supervisor.Start("ai_response", consumer)
+        await asyncio.sleep(0.1)
+        running = supervisor.Running()
+        await supervisor.Stop()
+        return running
+
+    running = asyncio.run(run())
+    assert len(runs) == 2
+    assert running == {"ai_response": True}
+    assert len(logged) == 1 and "broker unreachable" in logged[0].Msg
@@ -0,0 +1,306 @@
+"""
+Reference AI worker: consumes Chat_message, answers in micro-batches and
+publishes the replies to ai_response.
+
+    cd backend/ChatAPI
+    KAFKA_BOOTSTRAP_SERVERS=localhost:9092 python -m Workers.AIWorker
+
+Requests are grouped until AI_WORKER_MAX_BATCH_SIZE are waiting or
+AI_WORKER_MAX_WAIT_MS has passed since the first one, and at most
+AI_WORKER_CONCURRENCY batches are generated at once. AI_WORKER_BACKEND picks the
+GenerationBackend (see Workers/GenerationBackends.py).
+
+Each request becomes an ai_generate span in the trace carried by its
+Chat_message headers, and the reply is published with that span as parent.
+
+Generate and publish are retried AI_WORKER_RETRIES times. Requests that still
+fail go to AI_WORKER_DEAD_LETTER_TOPIC with the error, and AI_WORKER_FALLBACK_REPLY
+goes to ai_response in their place, flagged as an error, so ChatAPI releases the
+request's slot and the user sees that it failed. A batch counts as done
+only once every request in it is on one of the two topics; one that is not is
+fetched again rather than committed.
+"""
+import asyncio
+import json
+import os
+import signal
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Dict, List
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
+from ChatShared.LogPipeline import LogPipeline
+from Services.Tracing import KafkaTraceHeaders, ParseKafkaHeaders, SpanContext, Tracer, tracer as defaultTracer
+from Workers.GenerationBackends import GenerationBackend, LoadBackend
+
+AI_WORKER_MAX_BATCH_SIZE = int(os.getenv("AI_WORKER_MAX_BATCH_SIZE", "16"))
+AI_WORKER_MAX_WAIT_MS = int(os.getenv("AI_WORKER_MAX_WAIT_MS", "20"))
+AI_WORKER_CONCURRENCY = int(os.getenv("AI_WORKER_CONCURRENCY", "2"))
+AI_WORKER_GROUP = os.getenv("AI_WORKER_GROUP", "ai_worker_group")
+AI_WORKER_RETRIES = int(os.getenv("AI_WORKER_RETRIES", "2"))
+AI_WORKER_RETRY_BACKOFF = float(os.getenv("AI_WORKER_RETRY_BACKOFF", "0.2"))
+AI_WORKER_REPLAY_BACKOFF = float(os.getenv("AI_WORKER_REPLAY_BACKOFF", "1"))
+AI_WORKER_DEAD_LETTER_TOPIC = os.getenv("AI_WORKER_DEAD_LETTER_TOPIC", "ai_dead_letter")
+AI_WORKER_FALLBACK_REPLY = os.getenv("AI_WORKER_FALLBACK_REPLY", "Sorry, I could not answer that right now. Please try again.")
+AI_WORKER_IDLE_POLL_MS = 1000
+
+
+def DecodeChatMessage(raw: bytes):
+    # Chat_message values are JSON-encoded JSON strings; plain JSON objects work too
+    value = json.loads(raw.decode("utf-8"))
+    return json.loads(value) if isinstance(value, str) else value
+
+
+class AIWorker:
+    def __init__(
+        self,
+        consumer,
+        producer,
+        backend: GenerationBackend,
+        logger: LogPipeline,
+        max_batch_size: int = AI_WORKER_MAX_BATCH_SIZE,
+        max_wait_ms: int = AI_WORKER_MAX_WAIT_MS,
+        concurrency: int = AI_WORKER_CONCURRENCY,
+        retries: int = AI_WORKER_RETRIES,
+        tracer: Tracer = None
+    ):
+        self.consumer = consumer
+        self.producer = producer
+        self.backend = backend
+        self.logger = logger
+        self.tracer = tracer or defaultTracer
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.retries = max(0, retries)
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        # Batches in consumption order with the offsets they cover and start at;
+        # offsets are committed only once every earlier batch is done as well
+        self._inflight = deque()
+        self.batches = 0
+        self.requests = 0
+        self.failed_batches = 0
+        self.dead_lettered = 0
+        self.replayed_batches = 0
+
+    def Stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "failed_batches": self.failed_batches,
+            "dead_lettered": self.dead_lettered,
+            "replayed_batches": self.replayed_batches,
+            "average_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "inflight_batches": len(self._inflight)
+        }
+
+    async def Run(self):
+        try:
+            while True:
+                records = await self._CollectBatch()
+                await self._CommitCompleted()
+                if not records:
+                    continue
+                await self._slots.acquire()
+                offsets, starts = {}, {}
+                for tp, msg in records:
+                    starts.setdefault(tp, msg.offset)
+                    offsets[tp] = msg.offset + 1
+                self._inflight.append((asyncio.create_task(self._ProcessBatch(records)), offsets, starts))
+        finally:
+            # Let started batches publish, then commit what they covered
+            await asyncio.gather(*(task for task, _, _ in self._inflight), return_exceptions=True)
+            await self._CommitCompleted()
+
+    async def _CollectBatch(self) -> List:
+        records = []
+        deadline = None
+        loop = asyncio.get_running_loop()
+        while len(records) < self.max_batch_size:
+            if deadline is None:
+                timeout = AI_WORKER_IDLE_POLL_MS / 1000
+            else:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+            batches = await self.consumer.getmany(timeout_ms=int(timeout * 1000), max_records=self.max_batch_size - len(records))
+            for tp, messages in batches.items():
+                records.extend((tp, msg) for msg in messages)
+            if not records:
+                return records
+            if deadline is None:
+                deadline = loop.time() + self.max_wait
+        return records
+
+    async def _ProcessBatch(self, records: List):
+        """Raises when a request could be neither published nor dead-lettered, so the batch is replayed."""
+        try:
+            messages = [msg for _, msg in records if isinstance(msg.value, dict)]
+            if not messages:
+                return
+            requests = [msg.value for msg in messages]
+            started_at = time.time()
+            started = time.perf_counter()
+            replies = await self._Generate(requests)
+            duration = time.perf_counter() - started
+            # The batch is one generate call; every request in it gets its own span of that call
+            contexts = [
+                self.tracer.RecordSpan(
+                    "ai_generate", ParseKafkaHeaders(msg.headers), started_at, duration,
+                    batch_size=len(requests), queued_ms=round(max(0.0, started_at * 1000 - msg.timestamp), 3)
+                )
+                for msg in messages
+            ]
+            await asyncio.gather(*(
+                self._Deliver(request, reply, context) for request, reply, context in zip(requests, replies, contexts)
+            ))
+            self.batches += 1
+            self.requests += len(requests)
+        except Exception as ex:
+            self.failed_batches += 1
+            self.logger.Log("ERROR", f"{str(ex)}\n{traceback.format_exc()}", "AIWorker/_ProcessBatch")
+            # Holds the slot a moment so a broken producer is not hammered with replays
+            await asyncio.sleep(AI_WORKER_REPLAY_BACKOFF)
+            raise
+        finally:
+            self._slots.release()
+
+    async def _WithRetries(self, call, *args, **kwargs):
+        for attempt in range(self.retries + 1):
+            try:
+                return await call(*args, **kwargs)
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(AI_WORKER_RETRY_BACKOFF * 2 ** attempt)
+
+    async def _Generate(self, requests: List[dict]) -> List:
+        """One reply per request, or the exception that request failed with."""
+        try:
+            return await self._WithRetries(self.backend.Generate, requests)
+        except Exception as ex:
+            if len(requests) == 1:
+                return [ex]
+        # Generate the requests one by one so only the ones that fail on their own are lost
+        replies = []
+        for request in requests:
+            try:
+                replies.extend(await self.backend.Generate([request]))
+            except Exception as ex:
+                replies.append(ex)
+        return replies
+
+    async def _Deliver(self, request: dict, reply, trace_context: SpanContext = None):
+        if not isinstance(reply, Exception):
+            try:
+                await self._WithRetries(self._Publish, request, reply, trace_context)
+                return
+            except Exception as ex:
+                reply = ex
+        await self._DeadLetter(request, reply)
+
+    async def _DeadLetter(self, request: dict, error: Exception):
+        self.logger.Log("ERROR", f"Request {request.get('id')} dead-lettered: {str(error)}", "AIWorker/_DeadLetter")
+        await self._WithRetries(
+            self.producer.send_and_wait,
+            AI_WORKER_DEAD_LETTER_TOPIC,
+            value={"request": request, "error": f"{type(error).__name__}: {str(error)}", "failed_at": datetime.now().isoformat()},
+            key=(request.get("user") or "").encode("utf-8")
+        )
+        self.dead_lettered += 1
+        try:
+            await self._WithRetries(self._Publish, request, AI_WORKER_FALLBACK_REPLY, failed=True)
+        except Exception as ex:
+            # The request is on the dead-letter topic; ChatAPI frees its slot after AI_IN_FLIGHT_TIMEOUT
+            self.logger.Log("ERROR", f"Fallback reply for request {request.get('id')} not published: {str(ex)}", "AIWorker/_DeadLetter")
+
+    async def _Publish(self, request: dict, reply: str, trace_context: SpanContext = None, failed: bool = False):
+        user = request.get("user") or ""
+        await self.producer.send_and_wait(
+            "ai_response",
+            value={
+                "request_id": request.get("id"),
+                "user": user,
+                "response": reply,
+                "message": request.get("message"),
+                "context_digest": request.get("context_digest"),
+                "error": failed,
+                "request_created_at": request.get("created_at")
+            },
+            key=user.encode("utf-8"),
+            headers=KafkaTraceHeaders(trace_context) if trace_context else None
+        )
+
+    async def _CommitCompleted(self):
+        offsets: Dict = {}
+        while self._inflight and self._inflight[0][0].done():
+            task, batch_offsets, batch_starts = self._inflight.popleft()
+            if task.cancelled() or task.exception() is not None:
+                self._Replay(batch_starts)
+                continue
+            offsets.update(batch_offsets)
+        if not offsets:
+            return
+        try:
+            await self.consumer.commit(offsets)
+        except Exception as ex:
+            self.logger.Log("ERROR", f"Offset commit failed: {str(ex)}", "AIWorker/_CommitCompleted")
+
+    def _Replay(self, starts: Dict):
+        # Fetch the failed batch again. Later batches already fetched from the same
+        # partitions are fetched again with it, so their offsets must not be committed.
+        self.replayed_batches += 1
+        for tp, offset in starts.items():
+            self.consumer.seek(tp, offset)
+        for _, later_offsets, later_starts in self._inflight:
+            for tp in starts:
+                later_offsets.pop(tp, None)
+                later_starts.pop(tp, None)
+
+
+async def _Main():
+    logger = LogPipeline("AIWorker")
+    await logger.Start()
+    tracer = Tracer("AIWorker")
+    await tracer.Start()
+    bootstrap_servers = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092")
+    consumer = AIOKafkaConsumer(
+        "Chat_message",
+        bootstrap_servers=bootstrap_servers,
+        group_id=AI_WORKER_GROUP,
+        enable_auto_commit=False,
+        auto_offset_reset="earliest",
+        value_deserializer=DecodeChatMessage
+    )
+    producer = AIOKafkaProducer(
+        bootstrap_servers=bootstrap_servers,
+        value_serializer=lambda v: json.dumps(v).encode("utf-8"),
+        acks="all",
+        linger_ms=5
+    )
+    backend = LoadBackend()
+    await backend.Start()
+    await consumer.start()
+    await producer.start()
+    worker = AIWorker(consumer, producer, backend, logger, tracer=tracer)
+
+    run_task = asyncio.create_task(worker.Run())
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, run_task.cancel)
+    started = time.monotonic()
+    try:
+        await run_task
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await consumer.stop()
+        await producer.stop()
+        await backend.Stop()
+        logger.Log("INFO", f"AIWorker stopped after {time.monotonic() - started:.0f}s: {worker.Stats()}", "AIWorker/_Main")
+        await tracer.Stop()
+        await logger.Stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(_Main())
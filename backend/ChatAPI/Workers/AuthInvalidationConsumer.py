@@ -0,0 +1,44 @@
+import json
+import os
+import traceback
+from aiokafka import AIOKafkaConsumer
+from Schemas.shared import SystemLogErrorSchema
+from Services.KafkaMessageProducer import AUTH_INVALIDATION_TOPIC
+from Services.LogServices import AddLogOrError
+from Services.VerifyAuth import InvalidateToken
+
+def _Deserialize(raw: bytes):
+    # aiokafka raises deserializer errors out of the iterator, which would stop the consumer
+    try:
+        return json.loads(raw.decode('utf-8'))
+    except (UnicodeDecodeError, ValueError):
+        return None
+
+async def ConsumeAuthInvalidations():
+    # No group: every replica receives every logout and drops it from its cache
+    consumer = AIOKafkaConsumer(
+        AUTH_INVALIDATION_TOPIC,
+        bootstrap_servers=os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'kafka:9092'),
+        value_deserializer=_Deserialize,
+        group_id=None,
+        auto_offset_reset="latest"
+    )
+    try:
+        # A failed start raises to the TaskSupervisor, which restarts the consumer
+        await consumer.start()
+        async for msg in consumer:
+            # One bad message must not end the loop: every later logout would be missed
+            try:
+                token_hash = msg.value.get("token_hash") if isinstance(msg.value, dict) else None
+                if token_hash:
+                    InvalidateToken(str(token_hash))
+            except Exception as ex:
+                error_msg = f"{str(ex)}\n{traceback.format_exc()}"
+                await AddLogOrError(SystemLogErrorSchema(
+                    Msg=error_msg,
+                    Type="ERROR",
+                    ModuleName="AuthInvalidationConsumer/ConsumeAuthInvalidations",
+                    CreatedBy=""
+                ))
+    finally:
+        await consumer.stop()
@@ -0,0 +1,140 @@
+"""
+Moves CUSTOMER_CHAT_MESSAGES rows older than CHAT_ARCHIVE_AFTER_DAYS into the
+Parquet archive (Services/ChatArchive) and removes them from MySQL:
+
+    cd backend/ChatAPI
+    python -m Workers.ChatArchiver          # a pass every CHAT_ARCHIVE_INTERVAL seconds
+    python -m Workers.ChatArchiver --once   # a single pass, e.g. from cron
+
+Rows created before the cutoff are taken in (CREATED_AT, ID) order,
+CHAT_ARCHIVE_CHUNK_ROWS at a time. Each chunk is written to its own file and
+committed to the manifest before any row is removed; then exactly the IDs in
+it are deleted, CHAT_ARCHIVE_DELETE_BATCH per short transaction, and the file
+is marked deleted. A run that stops early deletes the rows of its unmarked
+files on its next pass. On MySQL a named lock keeps a second archiver from
+running the same pass.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import traceback
+from datetime import datetime, timedelta
+from typing import Dict, List
+from sqlalchemy import and_, delete, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from ChatShared.LogPipeline import LogPipeline
+from Config.dbConnection import async_engine_chatbot
+from Models.shared import customerChatMessages
+from Services.ChatArchive import ChatArchive, chatArchive
+
+CHAT_ARCHIVE_AFTER_DAYS = float(os.getenv("CHAT_ARCHIVE_AFTER_DAYS", "90"))
+CHAT_ARCHIVE_CHUNK_ROWS = int(os.getenv("CHAT_ARCHIVE_CHUNK_ROWS", "50000"))
+CHAT_ARCHIVE_DELETE_BATCH = int(os.getenv("CHAT_ARCHIVE_DELETE_BATCH", "5000"))
+CHAT_ARCHIVE_INTERVAL = float(os.getenv("CHAT_ARCHIVE_INTERVAL", "3600"))
+ARCHIVER_LOCK_NAME = "chatbot_chat_archiver"
+
+
+async def _Lock(conn: AsyncConnection) -> bool:
+    if conn.dialect.name != "mysql":
+        return True
+    return (await conn.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": ARCHIVER_LOCK_NAME})).scalar() == 1
+
+async def _Unlock(conn: AsyncConnection):
+    if conn.dialect.name == "mysql":
+        await conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": ARCHIVER_LOCK_NAME})
+        await conn.commit()
+
+async def _DeleteIds(conn: AsyncConnection, ids: List[int], batch: int) -> int:
+    """Deletes exactly these rows, batch IDs per short transaction."""
+    c = customerChatMessages.c
+    deleted = 0
+    for start in range(0, len(ids), batch):
+        result = await conn.execute(delete(customerChatMessages).where(c.ID.in_(ids[start:start + batch])))
+        await conn.commit()
+        deleted += result.rowcount
+    return deleted
+
+async def _DeletePending(conn: AsyncConnection, archive: ChatArchive, delete_batch: int, stats: Dict):
+    # Files whose rows may still be in MySQL because a pass stopped early
+    for entry in [entry for entry in archive.files if not entry.deleted]:
+        rows = await asyncio.to_thread(archive.ReadFile, entry.name, ["ID"])
+        stats["deleted_rows"] += await _DeleteIds(conn, [row["ID"] for row in rows], delete_batch)
+        await asyncio.to_thread(archive.MarkDeleted, [entry.name])
+
+async def ArchiveOnce(
+    engine: AsyncEngine = async_engine_chatbot,
+    archive: ChatArchive = chatArchive,
+    after_days: float = CHAT_ARCHIVE_AFTER_DAYS,
+    chunk_rows: int = CHAT_ARCHIVE_CHUNK_ROWS,
+    delete_batch: int = CHAT_ARCHIVE_DELETE_BATCH
+) -> Dict:
+    """One archiving pass; returns what it did."""
+    cutoff = datetime.now() - timedelta(days=after_days)
+    stats = {"archived_rows": 0, "files": 0, "bytes": 0, "deleted_rows": 0, "skipped": False}
+    c = customerChatMessages.c
+    async with engine.connect() as conn:
+        if not await _Lock(conn):
+            stats["skipped"] = True
+            return stats
+        try:
+            archive.Reload()
+            await _DeletePending(conn, archive, delete_batch, stats)
+
+            last_key = None
+            while True:
+                query = select(c.ID, c.USER, c.USER_KEY, c.MESSAGE, c.CREATED_AT, c.IS_BOT, c.RESPONSE_TO).where(c.CREATED_AT < cutoff)
+                if last_key is not None:
+                    query = query.where(or_(c.CREATED_AT > last_key[0], and_(c.CREATED_AT == last_key[0], c.ID > last_key[1])))
+                rows = (await conn.execute(query.order_by(c.CREATED_AT, c.ID).limit(chunk_rows))).fetchall()
+                await conn.commit()
+                if not rows:
+                    break
+                archive_file = await asyncio.to_thread(archive.WriteChunk, [dict(row._mapping) for row in rows])
+                await asyncio.to_thread(archive.Commit, archive_file)
+                stats["archived_rows"] += archive_file.rows
+                stats["files"] += 1
+                stats["bytes"] += archive_file.bytes
+
+                stats["deleted_rows"] += await _DeleteIds(conn, [row.ID for row in rows], delete_batch)
+                await asyncio.to_thread(archive.MarkDeleted, [archive_file.name])
+                last_key = (rows[-1].CREATED_AT, rows[-1].ID)
+                if len(rows) < chunk_rows:
+                    break
+        finally:
+            await _Unlock(conn)
+    return stats
+
+async def _Main(args):
+    logger = LogPipeline("ChatArchiver")
+    await logger.Start()
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    try:
+        while not stopping.is_set():
+            try:
+                stats = await ArchiveOnce()
+                logger.Log("INFO", f"Archive pass: {stats}", "ChatArchiver/_Main")
+            except Exception as ex:
+                logger.Log("ERROR", f"{str(ex)}\n{traceback.format_exc()}", "ChatArchiver/_Main")
+            if args.once:
+                break
+            try:
+                await asyncio.wait_for(stopping.wait(), CHAT_ARCHIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await async_engine_chatbot.dispose()
+        await logger.Stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    asyncio.run(_Main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import asyncio
+import hashlib
+import importlib
+import os
+import time
+from typing import List
+
+AI_WORKER_BACKEND = os.getenv("AI_WORKER_BACKEND", "STUB")
+AI_STUB_BATCH_LATENCY_MS = float(os.getenv("AI_STUB_BATCH_LATENCY_MS", "40"))
+AI_STUB_ITEM_CPU_MS = float(os.getenv("AI_STUB_ITEM_CPU_MS", "2"))
+AI_STUB_REPLY_TOKENS = int(os.getenv("AI_STUB_REPLY_TOKENS", "24"))
+
+
+class GenerationBackend:
+    """
+    What AIWorker calls once per micro-batch. Generate gets the Chat_message
+    payloads of the batch and returns one reply per payload, in the same order.
+    """
+
+    async def Start(self):
+        pass
+
+    async def Stop(self):
+        pass
+
+    async def Generate(self, requests: List[dict]) -> List[str]:
+        raise NotImplementedError
+
+
+class StubBackend(GenerationBackend):
+    """
+    Deterministic CPU stand-in for a model.
+
+    A batch costs a fixed latency, like one forward pass on an accelerator, plus
+    item_cpu_ms of hashing per request, so batching pays off the way it does with
+    a real model. The reply depends only on the message text.
+    """
+
+    def __init__(
+        self,
+        batch_latency_ms: float = AI_STUB_BATCH_LATENCY_MS,
+        item_cpu_ms: float = AI_STUB_ITEM_CPU_MS,
+        reply_tokens: int = AI_STUB_REPLY_TOKENS
+    ):
+        self.batch_latency = batch_latency_ms / 1000
+        self.item_cpu = item_cpu_ms / 1000
+        self.reply_tokens = reply_tokens
+
+    def _Reply(self, message: str, context_turns: int) -> str:
+        digest = hashlib.sha256(message.encode("utf-8")).hexdigest()
+        deadline = time.perf_counter() + self.item_cpu
+        while time.perf_counter() < deadline:
+            hashlib.sha256(digest.encode("utf-8")).digest()
+        tokens = [digest[(i * 4) % 60:(i * 4) % 60 + 4] for i in range(self.reply_tokens)]
+        return f"Stub reply to '{message}' after {context_turns} turns: " + " ".join(tokens)
+
+    def _GenerateSync(self, requests: List[dict]) -> List[str]:
+        return [self._Reply(request.get("message") or "", len(request.get("context") or [])) for request in requests]
+
+    async def Generate(self, requests: List[dict]) -> List[str]:
+        await asyncio.sleep(self.batch_latency)
+        return await asyncio.to_thread(self._GenerateSync, requests)
+
+
+def LoadBackend(spec: str = AI_WORKER_BACKEND) -> GenerationBackend:
+    # STUB or "package.module:ClassName" of a GenerationBackend subclass
+    if not spec or spec.upper() == "STUB":
+        return StubBackend()
+    module_name, _, class_name = spec.partition(":")
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    return backend_class()
@@ -1,53 +1,297 @@
 from datetime import datetime
+import asyncio
 import json
 import os
+import time
 import traceback
+import zlib
+from typing import Dict, Iterable, List, Optional, Set
 from aiokafka import AIOKafkaConsumer
 from sqlalchemy import select
+from Config.dbConnection import AsyncSessionLocalChatBot
 from Models.shared import customerChatMessages
 from Schemas.shared import SystemLogErrorSchema, CustomerChatMessageSchema
-from Services.CommonServices import GetSha1Hash, GetTableSl
-from Services.GenericCRUDServices import GenericInserter
+from Services.CommonServices import GetTableSl, GetUserKey
+from Services.BatchInserter import chatMessageInserter
+from Services.ConversationContext import contextBuilder
+from Services.HistoryCache import historyCache
+from Services.Instrumentation import Timed
+from Services.RateLimiter import ReleaseAIRequest
+from Services.SearchIndex import searchIndexer
+from Services.ResponseCache import responseCache
 from Services.LogServices import AddLogOrError
-from Config.dbConnection import ws_connections
+from Services.MetricsServices import GetCounter, GetGauge, GetHistogram, DEFAULT_SIZE_BUCKETS
+from Services.ResponseStream import ChunkPayload, responseStreams, STREAM_CHUNK, STREAM_END
+from Services.Tracing import ContinueTrace, ParseKafkaHeaders
+from Services.WebSocketDelivery import DeliverToUser
 
-consumer = AIOKafkaConsumer(
-    'ai_response',
-    bootstrap_servers=os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'kafka:9092'),
-    value_deserializer=lambda m: json.loads(m.decode('utf-8')),
-    group_id="ai_consumer_group"
-)
+KAFKA_CONSUMER_MODE = os.getenv("KAFKA_CONSUMER_MODE", "BATCH")
+KAFKA_CONSUMER_WORKERS = int(os.getenv("KAFKA_CONSUMER_WORKERS", "8"))
+KAFKA_CONSUMER_BATCH_SIZE = int(os.getenv("KAFKA_CONSUMER_BATCH_SIZE", "500"))
+KAFKA_CONSUMER_POLL_TIMEOUT_MS = int(os.getenv("KAFKA_CONSUMER_POLL_TIMEOUT_MS", "200"))
+KAFKA_CONSUMER_PERSIST_RETRIES = int(os.getenv("KAFKA_CONSUMER_PERSIST_RETRIES", "3"))
+KAFKA_CONSUMER_REPLAY_BACKOFF = float(os.getenv("KAFKA_CONSUMER_REPLAY_BACKOFF", "1"))
+
+consumedMessages = GetCounter("chatapi_consumer_messages_total", "ai_response messages handled", ["result"])
+consumedBatchSize = GetHistogram("chatapi_consumer_batch_size", "Messages returned by one getmany() call", buckets=DEFAULT_SIZE_BUCKETS)
+consumedBatchLatency = GetHistogram("chatapi_consumer_batch_seconds", "Time to persist and deliver one consumed batch")
+consumerLag = GetGauge("chatapi_consumer_lag", "Messages behind the partition high watermark", ["topic", "partition"])
+
+
+def _CreateConsumer(enable_auto_commit: bool) -> AIOKafkaConsumer:
+    return AIOKafkaConsumer(
+        'ai_response',
+        bootstrap_servers=os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'kafka:9092'),
+        value_deserializer=lambda m: json.loads(m.decode('utf-8')),
+        group_id="ai_consumer_group",
+        enable_auto_commit=enable_auto_commit
+    )
+
+@Timed("persist")
+async def _PersistResponse(response_data: dict, response: str) -> CustomerChatMessageSchema:
+    chat_response_msg = CustomerChatMessageSchema(
+        id= await GetTableSl("customerChatMessages"),
+        user=response_data['user'],
+        message = response,
+        is_bot = True,
+        response_to = response_data['request_id'],
+        created_at = datetime.now()
+    )
+    for attempt in range(KAFKA_CONSUMER_PERSIST_RETRIES):
+        try:
+            await chatMessageInserter.insert_record(chat_response_msg)
+            user_key = GetUserKey(chat_response_msg.user)
+            historyCache.Append(user_key, chat_response_msg)
+            contextBuilder.Append(user_key, chat_response_msg)
+            searchIndexer.Add(user_key, chat_response_msg)
+            return chat_response_msg
+        except Exception:
+            if attempt == KAFKA_CONSUMER_PERSIST_RETRIES - 1:
+                raise
+            await asyncio.sleep(0.1 * 2 ** attempt)
+
+async def _PersistedRequestIds(request_ids: Iterable) -> Set[int]:
+    """request_ids that already have a bot reply; a replayed reply must not be written twice."""
+    request_ids = [request_id for request_id in set(request_ids) if request_id is not None]
+    if not request_ids:
+        return set()
+    c = customerChatMessages.c
+    async with AsyncSessionLocalChatBot() as db_session:
+        result = await db_session.execute(
+            select(c.RESPONSE_TO).where(c.RESPONSE_TO.in_(request_ids), c.IS_BOT == True)
+        )
+        return set(result.scalars())
+
+def _RoundTripSeconds(response_data: dict):
+    try:
+        return (datetime.now() - datetime.fromisoformat(str(response_data['request_created_at']))).total_seconds()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+async def _DeliverResponse(chat_response_msg: CustomerChatMessageSchema):
+    # Send response over websocket, wherever the user's socket lives
+    await DeliverToUser(chat_response_msg.user, chat_response_msg.model_dump_json(), message=True)
+
+async def _LogFailure(ex: Exception):
+    consumedMessages.inc(result="failed")
+    await AddLogOrError(SystemLogErrorSchema(
+        Msg=f"{str(ex)}\n{traceback.format_exc()}",
+        Type="ERROR",
+        ModuleName="KafkaMessageConsumer/_ProcessResponse",
+        CreatedBy=""
+    ))
+
+@Timed("consume_response")
+async def _ProcessResponse(response_data: dict, persisted: Optional[Set[int]] = None):
+    """
+    Handles one ai_response message. A reply that cannot be persisted raises,
+    so its offset is not committed; anything else that fails is logged.
+    persisted holds the request_ids already answered in the DB.
+    """
+    if not response_data:
+        return
+    try:
+        message_type = response_data.get('type')
+        if message_type == STREAM_CHUNK:
+            # Forwarded as it arrives; only the assembled reply is persisted
+            if responseStreams.AddChunk(response_data):
+                await DeliverToUser(response_data['user'], ChunkPayload(response_data))
+            consumedMessages.inc(result="chunk")
+            return
+
+        # A streamed reply's chunks stay buffered until it is persisted: a failed
+        # persist replays only the end message, the chunk offsets are committed
+        response = responseStreams.Assemble(response_data) if message_type == STREAM_END else response_data['response']
+        request_id = response_data.get('request_id')
+        await ReleaseAIRequest(request_id)
+        if response is None:
+            # No response and the buffered chunks do not add up; a partial reply is never persisted
+            responseStreams.Close(request_id)
+            consumedMessages.inc(result="orphan_end")
+            return
+        if persisted is None:
+            persisted = await _PersistedRequestIds([request_id])
+    except Exception as ex:
+        await _LogFailure(ex)
+        return
+
+    if request_id is not None and request_id in persisted:
+        # Redelivered after a replay; the first delivery already wrote and sent it
+        responseStreams.Close(request_id)
+        consumedMessages.inc(result="duplicate")
+        return
+    try:
+        chat_response_msg = await _PersistResponse(response_data, response)
+    except Exception:
+        consumedMessages.inc(result="persist_failed")
+        raise
+    responseStreams.Close(request_id)
+    if request_id is not None:
+        persisted.add(request_id)
 
-async def ConsumeResponse():
-    await consumer.start()
     try:
-        async for msg in consumer:
-            try:
-                response_data = msg.value
-                if response_data:
-                    chat_response_msg = CustomerChatMessageSchema(
-                        id= await GetTableSl("customerChatMessages"),
-                        user=response_data['user'],
-                        message = response_data['response'],
-                        is_bot = True,
-                        response_to = response_data['request_id'],
-                        created_at = datetime.now()
-                    )
-                    await GenericInserter[CustomerChatMessageSchema].insert_record(
-                        table=customerChatMessages,
-                        schema_model=CustomerChatMessageSchema,
-                        data=chat_response_msg,
-                        returning_fields=[]
-                    )
-                    
-                    # Send response over websocket
-                    ws = ws_connections.get(await GetSha1Hash(chat_response_msg.user))
-                    if ws:
-                        payload = json.dumps(chat_response_msg)
-                        await ws.send_text(payload)
-            except Exception as ex:
-                print(f"Error consuming Kafka message: {str(ex)}")
-                continue
+        await _DeliverResponse(chat_response_msg)
+        if response_data.get('error'):
+            # The worker's fallback for a dead-lettered request; shown to the user, never cached
+            consumedMessages.inc(result="error_reply")
+            return
+        responseCache.Store(
+            request_id,
+            response,
+            question=response_data.get('message'),
+            context_digest=response_data.get('context_digest'),
+            round_trip_seconds=_RoundTripSeconds(response_data)
+        )
+        consumedMessages.inc(result="ok")
+    except Exception as ex:
+        await _LogFailure(ex)
+
+async def _ProcessMessage(msg, persisted: Optional[Set[int]] = None):
+    # Spans of this reply join the trace of the PostMessage that asked for it
+    with ContinueTrace(ParseKafkaHeaders(msg.headers)):
+        await _ProcessResponse(msg.value, persisted)
+
+async def _ProcessLane(messages: List[tuple], persisted: Set[int]) -> Dict[object, int]:
+    """
+    Processes (partition, message) pairs of one lane in order; returns the
+    offset of the first reply per partition that could not be persisted.
+    """
+    # One lane per user hash: a user's replies stay in order
+    failed: Dict[object, int] = {}
+    for tp, msg in messages:
+        if tp in failed:
+            # Replayed from the failed offset, so later replies keep their order
+            continue
+        try:
+            await _ProcessMessage(msg, persisted)
+        except Exception as ex:
+            failed[tp] = msg.offset
+            await AddLogOrError(SystemLogErrorSchema(
+                Msg=f"Reply at {tp} offset {msg.offset} not persisted, will be replayed: {str(ex)}\n{traceback.format_exc()}",
+                Type="ERROR",
+                ModuleName="KafkaMessageConsumer/_ProcessLane",
+                CreatedBy=""
+            ))
+    return failed
+
+def _LaneOf(msg, workers: int) -> int:
+    user = msg.value.get('user', '') if isinstance(msg.value, dict) else ''
+    return zlib.crc32(str(user).encode('utf-8')) % workers
+
+async def _ConsumeOneByOne(consumer: AIOKafkaConsumer):
+    # Offsets are auto-committed in this mode, so a reply that still fails after the persist retries is only logged
+    async for msg in consumer:
+        try:
+            await _ProcessMessage(msg)
+        except Exception as ex:
+            await AddLogOrError(SystemLogErrorSchema(
+                Msg=f"{str(ex)}\n{traceback.format_exc()}",
+                Type="ERROR",
+                ModuleName="KafkaMessageConsumer/_ConsumeOneByOne",
+                CreatedBy=""
+            ))
+
+def _FinalRequestIds(batches: dict) -> List:
+    return [
+        msg.value.get('request_id')
+        for messages in batches.values() for msg in messages
+        if isinstance(msg.value, dict) and msg.value.get('type') != STREAM_CHUNK
+    ]
+
+async def _ConsumeInBatches(consumer: AIOKafkaConsumer):
+    workers = max(1, KAFKA_CONSUMER_WORKERS)
+    while True:
+        batches = await consumer.getmany(
+            timeout_ms=KAFKA_CONSUMER_POLL_TIMEOUT_MS,
+            max_records=KAFKA_CONSUMER_BATCH_SIZE
+        )
+        if not batches:
+            continue
+
+        started = time.perf_counter()
+        lanes = [[] for _ in range(workers)]
+        total = 0
+        for tp, messages in batches.items():
+            total += len(messages)
+            for msg in messages:
+                lanes[_LaneOf(msg, workers)].append((tp, msg))
+
+        try:
+            persisted = await _PersistedRequestIds(_FinalRequestIds(batches))
+        except Exception as ex:
+            # Without the check a replayed reply could be written twice; replay the whole batch later
+            persisted = None
+            await AddLogOrError(SystemLogErrorSchema(
+                Msg=f"{str(ex)}\n{traceback.format_exc()}",
+                Type="ERROR",
+                ModuleName="KafkaMessageConsumer/_ConsumeInBatches",
+                CreatedBy=""
+            ))
+        failed: Dict[object, int] = {}
+        if persisted is None:
+            failed = {tp: messages[0].offset for tp, messages in batches.items()}
+        else:
+            for lane_failed in await asyncio.gather(*(_ProcessLane(lane, persisted) for lane in lanes if lane)):
+                for tp, offset in lane_failed.items():
+                    failed[tp] = min(offset, failed.get(tp, offset))
+
+        # Each partition is committed up to its first reply that is not in the DB; that one and
+        # everything after it in the partition is fetched again (already written replies are skipped)
+        offsets = {tp: failed.get(tp, messages[-1].offset + 1) for tp, messages in batches.items()}
+        for tp, offset in failed.items():
+            consumer.seek(tp, offset)
+        try:
+            await consumer.commit(offsets)
+        except Exception as ex:
+            await AddLogOrError(SystemLogErrorSchema(
+                Msg=f"Offset commit failed: {str(ex)}",
+                Type="ERROR",
+                ModuleName="KafkaMessageConsumer/_ConsumeInBatches",
+                CreatedBy=""
+            ))
+
+        consumedBatchSize.observe(total)
+        consumedBatchLatency.observe(time.perf_counter() - started)
+        for tp, messages in batches.items():
+            highwater = consumer.highwater(tp)
+            if highwater is not None:
+                consumerLag.set(max(0, highwater - offsets[tp]), topic=tp.topic, partition=tp.partition)
+        if failed:
+            # Give the DB a moment before the replay
+            await asyncio.sleep(KAFKA_CONSUMER_REPLAY_BACKOFF)
+
+async def ConsumeResponse(consumer=None):
+    # consumer: an already configured stand-in (benchmarks); created from the environment otherwise
+    batch_mode = KAFKA_CONSUMER_MODE.upper() == "BATCH"
+    consumer = consumer or _CreateConsumer(enable_auto_commit=not batch_mode)
+    try:
+        await consumer.start()
+        if batch_mode:
+            await _ConsumeInBatches(consumer)
+        else:
+            await _ConsumeOneByOne(consumer)
+    except asyncio.CancelledError:
+        raise
     except Exception as ex:
         error_msg = f"{str(ex)}\n{traceback.format_exc()}"
         await AddLogOrError(SystemLogErrorSchema(
@@ -56,6 +300,6 @@ async def ConsumeResponse():
             ModuleName="KafkaMessageConsumer/ConsumeResponse",
             CreatedBy=""
         ))
-    
+
     finally:
-        await consumer.stop()
\ No newline at end of file
+        await consumer.stop()
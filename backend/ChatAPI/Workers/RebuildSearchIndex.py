@@ -0,0 +1,115 @@
+"""
+Indexes existing chat history for /Chat/Search: the rows in
+CUSTOMER_CHAT_MESSAGES and the messages in the Parquet archive.
+
+    cd backend/ChatAPI
+    python -m Workers.RebuildSearchIndex                   # index whatever is missing
+    python -m Workers.RebuildSearchIndex --clear           # empty the index first
+    python -m Workers.RebuildSearchIndex --user a@b.com    # one user only
+
+Rows already indexed are skipped (INSERT IGNORE), so it can run while the API
+indexes new messages, and a run that was stopped can simply be started again.
+With --clear, searches miss older messages until the run completes.
+"""
+import argparse
+import asyncio
+import time
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+from Config.dbConnection import async_engine_chatbot
+from Models.shared import chatSearchDocs, chatSearchPostings, customerChatMessages
+from Services.ChatArchive import ChatArchive, chatArchive
+from Services.CommonServices import GetUserKey
+from Services.SearchIndex import IndexRows, WriteIndexRows
+
+REBUILD_BATCH_ROWS = 5000
+
+
+async def _IndexBatch(engine: AsyncEngine, messages: Iterable[Tuple[str, int, Optional[str]]]) -> int:
+    docs, postings = [], []
+    for user_key, message_id, text in messages:
+        doc, rows = IndexRows(user_key, message_id, text)
+        if doc is not None:
+            docs.append(doc)
+            postings.extend(rows)
+    async with engine.begin() as conn:
+        await WriteIndexRows(conn, docs, postings)
+    return len(postings)
+
+async def ClearIndex(engine: AsyncEngine = async_engine_chatbot, user_key: Optional[str] = None):
+    async with engine.begin() as conn:
+        for table in (chatSearchPostings, chatSearchDocs):
+            stmt = delete(table)
+            if user_key is not None:
+                stmt = stmt.where(table.c.USER_KEY == user_key)
+            await conn.execute(stmt)
+
+async def IndexTable(engine: AsyncEngine = async_engine_chatbot, user_key: Optional[str] = None,
+                     batch_rows: int = REBUILD_BATCH_ROWS, progress=None) -> Tuple[int, int]:
+    """Indexes CUSTOMER_CHAT_MESSAGES in ID order; returns (messages, postings)."""
+    c = customerChatMessages.c
+    last_id, messages, postings = 0, 0, 0
+    while True:
+        stmt = select(c.ID, c.USER_KEY, c.MESSAGE).where(c.ID > last_id).order_by(c.ID).limit(batch_rows)
+        if user_key is not None:
+            stmt = stmt.where(c.USER_KEY == user_key)
+        async with engine.connect() as conn:
+            rows = (await conn.execute(stmt)).fetchall()
+        if not rows:
+            return messages, postings
+        postings += await _IndexBatch(engine, ((row.USER_KEY, row.ID, row.MESSAGE) for row in rows))
+        messages += len(rows)
+        last_id = rows[-1].ID
+        if progress:
+            progress(messages, postings)
+
+async def IndexArchive(engine: AsyncEngine = async_engine_chatbot, archive: ChatArchive = chatArchive,
+                       user_key: Optional[str] = None, batch_rows: int = REBUILD_BATCH_ROWS, progress=None) -> Tuple[int, int]:
+    """Indexes every archived message; returns (messages, postings)."""
+    archive.Reload()
+    messages, postings = 0, 0
+    for archive_file in sorted(archive.files, key=lambda entry: entry.first_id):
+        rows = await asyncio.to_thread(archive.ReadFile, archive_file.name, ["ID", "USER_KEY", "MESSAGE"], user_key)
+        for start in range(0, len(rows), batch_rows):
+            chunk = rows[start:start + batch_rows]
+            postings += await _IndexBatch(engine, ((row["USER_KEY"], row["ID"], row["MESSAGE"]) for row in chunk))
+            messages += len(chunk)
+            if progress:
+                progress(messages, postings)
+    return messages, postings
+
+async def _Main(args):
+    user_key = GetUserKey(args.user) if args.user else None
+    started = time.perf_counter()
+
+    def progress(source: str):
+        def report(messages: int, postings: int):
+            elapsed = time.perf_counter() - started
+            print(f"\r{source}: {messages:,} messages, {postings:,} postings ({messages / elapsed:,.0f} messages/s)", end="", flush=True)
+        return report
+
+    try:
+        if args.clear:
+            await ClearIndex(user_key=user_key)
+        await IndexTable(user_key=user_key, batch_rows=args.batch_rows, progress=progress("table"))
+        print()
+        if not args.skip_archive:
+            await IndexArchive(user_key=user_key, batch_rows=args.batch_rows, progress=progress("archive"))
+            print()
+        print(f"Search index rebuilt in {time.perf_counter() - started:.1f}s")
+    finally:
+        await async_engine_chatbot.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clear", action="store_true", help="delete the existing index rows first")
+    parser.add_argument("--user", help="only this user's messages")
+    parser.add_argument("--batch-rows", type=int, default=REBUILD_BATCH_ROWS)
+    parser.add_argument("--skip-archive", action="store_true", help="index only CUSTOMER_CHAT_MESSAGES")
+    asyncio.run(_Main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Local stand-in for the AI side, for trying out streamed replies without a model.
+
+Reads Chat_message and answers every message on ai_response as a stream: one
+chunk per word of a canned reply, --token-delay seconds apart, then an end
+message carrying the full reply. With --complete it sends one complete reply instead, the way
+non-streaming workers do.
+
+    cd backend/ChatAPI
+    KAFKA_BOOTSTRAP_SERVERS=localhost:9092 python -m Workers.StandInAIProducer --token-delay 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
+from Services.ResponseStream import STREAM_CHUNK, STREAM_END
+
+
+def _Reply(message: str) -> str:
+    return f"You said: {message}. This reply is streamed one word at a time by the stand-in AI producer."
+
+async def _Answer(producer: AIOKafkaProducer, request: dict, token_delay: float, complete: bool):
+    user = request.get("user") or ""
+    key = user.encode("utf-8")
+    reply = _Reply(request.get("message") or "")
+    base = {"request_id": request.get("id"), "user": user, "request_created_at": request.get("created_at")}
+
+    if complete:
+        await producer.send_and_wait("ai_response", value={**base, "response": reply}, key=key)
+        return
+    words = reply.split(" ")
+    for seq, word in enumerate(words):
+        delta = word if seq == len(words) - 1 else word + " "
+        await producer.send_and_wait("ai_response", value={**base, "type": STREAM_CHUNK, "seq": seq, "delta": delta}, key=key)
+        await asyncio.sleep(token_delay)
+    await producer.send_and_wait("ai_response", value={**base, "type": STREAM_END, "response": reply, "chunks": len(words)}, key=key)
+
+async def _Run(args):
+    bootstrap_servers = os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'kafka:9092')
+    consumer = AIOKafkaConsumer(
+        "Chat_message",
+        bootstrap_servers=bootstrap_servers,
+        group_id="standin_ai_group",
+        # Chat_message values are JSON-encoded JSON strings
+        value_deserializer=lambda m: json.loads(json.loads(m.decode('utf-8')))
+    )
+    producer = AIOKafkaProducer(
+        bootstrap_servers=bootstrap_servers,
+        value_serializer=lambda v: json.dumps(v).encode("utf-8"),
+        linger_ms=0
+    )
+    await consumer.start()
+    await producer.start()
+    pending = set()
+    try:
+        async for msg in consumer:
+            task = asyncio.create_task(_Answer(producer, msg.value, args.token_delay, args.complete))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+    finally:
+        await asyncio.gather(*pending, return_exceptions=True)
+        await consumer.stop()
+        await producer.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--token-delay", type=float, default=0.05, help="seconds between chunks")
+    parser.add_argument("--complete", action="store_true", help="send one complete reply instead of a stream")
+    asyncio.run(_Run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import json
+import os
+import traceback
+from aiokafka import AIOKafkaConsumer
+from Schemas.shared import SystemLogErrorSchema, CustomerChatMessageSchema
+from Services.CommonServices import GetUserKey
+from Services.ConversationContext import contextBuilder
+from Services.HistoryCache import historyCache
+from Services.LogServices import AddLogOrError
+from Services.WebSocketDelivery import DeliverLocalMany, NODE_ID, WS_DELIVERY_TOPIC, WS_FANOUT_ENABLED
+
+def _Deserialize(raw: bytes):
+    try:
+        return json.loads(raw.decode('utf-8'))
+    except (UnicodeDecodeError, ValueError):
+        return None
+
+async def _RecordMessage(payload: str):
+    # Written by another node; keep this node's cached history and context in step with it
+    try:
+        message = CustomerChatMessageSchema.model_validate_json(payload)
+        user_key = GetUserKey(message.user)
+        historyCache.Append(user_key, message)
+        contextBuilder.Append(user_key, message)
+    except Exception as ex:
+        error_msg = f"{str(ex)}\n{traceback.format_exc()}"
+        await AddLogOrError(SystemLogErrorSchema(
+            Msg=error_msg,
+            Type="ERROR",
+            ModuleName="WebSocketFanoutConsumer/_RecordMessage",
+            CreatedBy=""
+        ))
+
+async def ConsumeWsDeliveries(consumer=None):
+    if not WS_FANOUT_ENABLED:
+        return
+    # No group: every node sees every payload and keeps the ones for its own sockets.
+    # consumer: an already configured stand-in (benchmarks); created from the environment otherwise
+    consumer = consumer or AIOKafkaConsumer(
+        WS_DELIVERY_TOPIC,
+        bootstrap_servers=os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'kafka:9092'),
+        value_deserializer=_Deserialize,
+        group_id=None,
+        auto_offset_reset="latest"
+    )
+    try:
+        await consumer.start()
+        while True:
+            batches = await consumer.getmany(timeout_ms=100, max_records=1000)
+            deliveries = []
+            for messages in batches.values():
+                for msg in messages:
+                    data = msg.value
+                    if not isinstance(data, dict) or data.get("origin") == NODE_ID:
+                        continue
+                    if data.get("deliver", True):
+                        deliveries.append((data.get("user_hash", ""), data.get("payload", "")))
+                    if data.get("message"):
+                        await _RecordMessage(data.get("payload", ""))
+            DeliverLocalMany(deliveries)
+    except Exception as ex:
+        error_msg = f"{str(ex)}\n{traceback.format_exc()}"
+        await AddLogOrError(SystemLogErrorSchema(
+            Msg=error_msg,
+            Type="ERROR",
+            ModuleName="WebSocketFanoutConsumer/ConsumeWsDeliveries",
+            CreatedBy=""
+        ))
+    finally:
+        await consumer.stop()
@@ -1,4 +1,3 @@
-import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -6,26 +5,56 @@ from Routes.ChatRoutes import ChatRoutes
 from Routes.ChatAuthRoutes import ChatAuthRoutes
 
 from Routes.WebSocketRoutes import WebSocketRoutes
+from Routes.MonitoringRoutes import MonitoringRoutes
 
 from Workers.KafkaMessageConsumer import ConsumeResponse
+from Workers.AuthInvalidationConsumer import ConsumeAuthInvalidations
+from Workers.WebSocketFanoutConsumer import ConsumeWsDeliveries, WS_FANOUT_ENABLED
+from Services.BatchInserter import chatMessageInserter
+from Services.SearchIndex import searchIndexer
+from Services.KafkaMessageProducer import StartProducer, StopProducer
+from Services.ChatAuthClient import StartChatAuthClient, StopChatAuthClient
+from Services.ConnectionManager import connectionManager
+from Services.Instrumentation import RouteLatencyMiddleware
+from Services.LogServices import logPipeline
+from Services.RateLimiter import StartRateLimiter, StopRateLimiter
+from Services.TaskSupervisor import taskSupervisor
+from Services.Tracing import tracer
 
-from Config.dbConnection import (
-    async_engine_chatbot,
-    sync_engine_chatbot,
-    AsyncSessionLocalChatBot
-)
+from Config.dbConnection import async_engine_chatbot
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    async with async_engine_chatbot.connect():
-        print("ChatBot database connection established")
-    
-    # Start background Kafka consumer
-    asyncio.create_task(ConsumeResponse())
+    await logPipeline.Start()
+    await tracer.Start()
+    # No DB round trip here: the schema is managed by `python -m Migrations.Migrate`,
+    # the pool connects on first use and /health reports whether MySQL is reachable
+
+    # Start ChatAuth client, Kafka producer, write-behind inserter and background Kafka consumers
+    await StartChatAuthClient()
+    await StartRateLimiter()
+    await StartProducer()
+    await chatMessageInserter.Start()
+    await searchIndexer.Start()
+    # Restarted with a backoff if they stop; /health reports one that is down
+    taskSupervisor.Start("ai_response", ConsumeResponse)
+    taskSupervisor.Start("auth_invalidation", ConsumeAuthInvalidations)
+    if WS_FANOUT_ENABLED:
+        taskSupervisor.Start("ws_delivery", ConsumeWsDeliveries)
     yield
 
     # Shutdown
+    await taskSupervisor.Stop()
+    await connectionManager.CloseAll()
+    await chatMessageInserter.Stop()
+    await searchIndexer.Stop()
+    print("Pending chat messages flushed")
+    await StopProducer()
+    await StopChatAuthClient()
+    await StopRateLimiter()
+    await tracer.Stop()
+    await logPipeline.Stop()
     await async_engine_chatbot.dispose()
     print("Database connections closed")
 
@@ -41,6 +70,7 @@ app.include_router(ChatAuthRoutes)
 app.include_router(ChatRoutes)
 
 app.include_router(WebSocketRoutes)
+app.include_router(MonitoringRoutes)
 
 app.add_middleware(
     CORSMiddleware,
@@ -49,12 +79,4 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-@app.get("/health")
-async def health_check():
-    return {
-        "status": "API is running",
-        "database_status": {
-            "chatbot": "connected"
-        }
-    }
\ No newline at end of file
+app.add_middleware(RouteLatencyMiddleware)
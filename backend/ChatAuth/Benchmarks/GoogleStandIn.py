@@ -0,0 +1,78 @@
+"""
+Local stand-in for Google's OAuth token endpoint and signing keys, so Login can
+be exercised and benchmarked without network access. The authorization code is
+the user's email; /token answers with an ID token for it, signed by a key
+generated at startup and published at /certs with a Cache-Control max-age.
+
+Run it and point ChatAuth at it:
+
+    cd backend/ChatAuth
+    python -m Benchmarks.GoogleStandIn --port 18300
+    GOOGLE_TOKEN_URL=http://127.0.0.1:18300/token GOOGLE_CERTS_URL=http://127.0.0.1:18300/certs \
+        uvicorn index:app --port 1001
+
+Benchmarks.LoginBenchmark mounts it in process instead.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from urllib.parse import parse_qs
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+STANDIN_ISSUER = "https://accounts.google.com"
+
+
+def CreateFakeGoogle(latency_ms: float = 0, max_age: int = 3600) -> FastAPI:
+    """/token and /certs with Google's response shapes. app.state.cert_fetches counts /certs calls."""
+    app = FastAPI()
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    kid = uuid.uuid4().hex
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": kid, "alg": "RS256", "use": "sig"})
+    app.state.cert_fetches = 0
+
+    @app.get("/certs")
+    async def Certs():
+        app.state.cert_fetches += 1
+        return JSONResponse({"keys": [jwk]}, headers={"Cache-Control": f"public, max-age={max_age}, must-revalidate, no-transform"})
+
+    @app.post("/token")
+    async def Token(request: Request):
+        await asyncio.sleep(latency_ms / 1000)
+        form = {key: values[0] for key, values in parse_qs((await request.body()).decode("utf-8")).items()}
+        email = form.get("code", "")
+        if "@" not in email or form.get("grant_type") != "authorization_code":
+            return JSONResponse({"error": "invalid_grant"}, status_code=400)
+        now = int(time.time())
+        id_token = jwt.encode(
+            {
+                "iss": STANDIN_ISSUER, "aud": form.get("client_id"), "sub": email, "email": email,
+                "email_verified": True, "name": email.split("@")[0], "picture": "", "iat": now, "exp": now + 3600
+            },
+            private_key,
+            algorithm="RS256",
+            headers={"kid": kid}
+        )
+        return {"access_token": uuid.uuid4().hex, "expires_in": 3599, "token_type": "Bearer", "id_token": id_token}
+
+    return app
+
+
+def main():
+    import uvicorn
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18300)
+    parser.add_argument("--latency-ms", type=float, default=0, help="added to every /token call")
+    parser.add_argument("--max-age", type=int, default=3600, help="Cache-Control max-age of /certs")
+    args = parser.parse_args()
+    uvicorn.run(CreateFakeGoogle(args.latency_ms, args.max_age), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Login latency of ChatAuth against Benchmarks.GoogleStandIn, with no network
+access: both apps run in this process and are called through httpx's ASGI
+transport, so the numbers cover the code exchange, ID-token verification and
+session creation, not sockets.
+
+    cd backend/ChatAuth
+    python -m Benchmarks.LoginBenchmark --logins 2000 --concurrency 50
+
+--google-latency-ms adds a delay to every /token call, standing in for the
+round trip to Google. The report includes how often the signing keys were
+fetched, which should stay at one per run.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+
+def _Percentile(samples: list, percent: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+async def _Run(args):
+    import httpx
+    from Benchmarks.GoogleStandIn import CreateFakeGoogle
+    from Helper import GoogleAuthClient
+    from index import app, lifespan
+
+    google = CreateFakeGoogle(args.google_latency_ms)
+    GoogleAuthClient._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=google))
+    latencies, failures = [], 0
+    remaining = iter(range(args.logins))
+
+    async with lifespan(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://chatauth") as client:
+            async def worker():
+                nonlocal failures
+                for i in remaining:
+                    started = time.perf_counter()
+                    response = await client.post("/GoogleAuth/Login", json={"token": f"login{i}@example.com"})
+                    latencies.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        failures += 1
+
+            started, cpu_started = time.perf_counter(), time.process_time()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            elapsed, cpu = time.perf_counter() - started, time.process_time() - cpu_started
+
+    print(
+        f"{len(latencies) - failures}/{len(latencies)} logins in {elapsed:.2f}s: {len(latencies) / elapsed:,.0f}/s wall, "
+        f"{len(latencies) / cpu:,.0f}/s per core, signing key fetches={google.state.cert_fetches}"
+    )
+    print(
+        f"latency p50={_Percentile(latencies, 50) * 1000:.1f}ms p95={_Percentile(latencies, 95) * 1000:.1f}ms "
+        f"p99={_Percentile(latencies, 99) * 1000:.1f}ms mean={statistics.fmean(latencies) * 1000:.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--google-latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    # Read at import time by the ChatAuth modules
+    os.environ.setdefault("SESSION_BACKEND", "MEMORY")
+    os.environ.setdefault("LOG_DIR", os.path.join(tempfile.gettempdir(), "chatauth-logs"))
+    os.environ.setdefault("ENCRYPTION_FIXED_KEY", "benchmark-fixed-key")
+    os.environ.setdefault("GOOGLE_CLIENT_ID", "benchmark-client.apps.googleusercontent.com")
+    os.environ.setdefault("GOOGLE_CLIENT_SECRET", "benchmark-client-secret-of-32-bytes")
+    os.environ["GOOGLE_TOKEN_URL"] = "http://google/token"
+    os.environ["GOOGLE_CERTS_URL"] = "http://google/certs"
+    asyncio.run(_Run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+In-process micro-benchmark of token verification, without HTTP. Calls
+VerifyJwtToken directly against the in-memory session store and reports
+verifications per second of wall time and per CPU-second, which is the
+throughput of one core:
+
+    cd backend/ChatAuth
+    python -m Benchmarks.VerifyCryptoBenchmark --verifications 20000
+
+Three paths are measured:
+- cached: the token's claims are in the claims cache (the steady state)
+- uncached: the cache is cleared before every call, so each one checks the
+  signature and decrypts the claims (the first call per token and process)
+- create: CreateJwtToken, the work done on every login
+
+--crypto-workers overrides CRYPTO_WORKERS (0 runs the crypto on the event loop).
+"""
+import argparse
+import asyncio
+import os
+import time
+
+
+def _Measure(label: str, count: int, wall: float, cpu: float):
+    print(f"{label:>9}: {count / wall:10,.0f}/s wall  {count / cpu:10,.0f}/s per core  ({count} calls, {cpu * 1e6 / count:7.1f}us CPU each)")
+
+async def _Run(args):
+    from fastapi.security import HTTPAuthorizationCredentials
+    from Helper.ClaimsCache import claimsCache
+    from Helper.Common import CreateJwtToken, StopCryptoPool, VerifyJwtToken
+    from Helper.SessionStore import sessionStore
+
+    users = [{"sub": str(i), "email": f"bench{i}@example.com", "name": f"Bench {i}", "picture": ""} for i in range(args.tokens)]
+
+    started, cpu_started = time.perf_counter(), time.process_time()
+    tokens = [await CreateJwtToken(users[i % len(users)]) for i in range(args.creations)]
+    _Measure("create", len(tokens), time.perf_counter() - started, time.process_time() - cpu_started)
+
+    credentials = [HTTPAuthorizationCredentials(scheme="Bearer", credentials=token) for token in tokens[:args.tokens]]
+    for label, clear in (("uncached", True), ("cached", False)):
+        started, cpu_started = time.perf_counter(), time.process_time()
+        for i in range(args.verifications):
+            if clear:
+                claimsCache.Clear()
+            await VerifyJwtToken(credentials[i % len(credentials)])
+        _Measure(label, args.verifications, time.perf_counter() - started, time.process_time() - cpu_started)
+
+    await sessionStore.Stop()
+    StopCryptoPool()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--creations", type=int, default=2000)
+    parser.add_argument("--verifications", type=int, default=20000)
+    parser.add_argument("--crypto-workers", type=int, help="overrides CRYPTO_WORKERS")
+    args = parser.parse_args()
+
+    # Read at import time by Helper.Common
+    os.environ.setdefault("SESSION_BACKEND", "MEMORY")
+    os.environ.setdefault("ENCRYPTION_FIXED_KEY", "benchmark-fixed-key")
+    os.environ.setdefault("GOOGLE_CLIENT_SECRET", "benchmark-client-secret-of-32-bytes")
+    if args.crypto_workers is not None:
+        os.environ["CRYPTO_WORKERS"] = str(args.crypto_workers)
+    asyncio.run(_Run(args))
+
+
+if __name__ == "__main__":
+    main()
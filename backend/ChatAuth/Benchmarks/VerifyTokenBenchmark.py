@@ -0,0 +1,68 @@
+"""
+Measures /GoogleAuth/VerifyToken throughput of a running ChatAuth.
+
+Tokens are minted with CreateJwtToken straight into the configured session store,
+so run it with the same SESSION_BACKEND/REDIS_URL and ENCRYPTION_FIXED_KEY as the
+server. Pass --workers with the server's worker count to get throughput per core:
+
+    cd backend/ChatAuth
+    SESSION_BACKEND=REDIS REDIS_URL=redis://localhost:6379/0 \
+        python -m Benchmarks.VerifyTokenBenchmark --url http://localhost:1001 --workers 4
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from Helper.Common import CreateJwtToken
+from Helper.SessionStore import sessionStore
+
+
+async def _MintTokens(count: int) -> list[str]:
+    await sessionStore.Start()
+    tokens = [
+        await CreateJwtToken({"sub": str(i), "email": f"bench{i}@example.com", "name": f"Bench {i}", "picture": ""})
+        for i in range(count)
+    ]
+    await sessionStore.Stop()
+    return tokens
+
+
+async def _Run(url: str, tokens: list[str], requests: int, concurrency: int) -> tuple[int, int, float]:
+    ok = failed = 0
+    remaining = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal ok, failed
+            for i in remaining:
+                response = await client.get(
+                    "/GoogleAuth/VerifyToken",
+                    headers={"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+                )
+                if response.status_code == 200:
+                    ok += 1
+                else:
+                    failed += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return ok, failed, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:1001")
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers serving --url")
+    args = parser.parse_args()
+
+    tokens = asyncio.run(_MintTokens(args.tokens))
+    ok, failed, elapsed = asyncio.run(_Run(args.url, tokens, args.requests, args.concurrency))
+    rate = (ok + failed) / elapsed
+    print(f"ok={ok} failed={failed} in {elapsed:.2f}s -> {rate:,.0f} verifications/s, {rate / args.workers:,.0f}/s per worker")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Tells ChatAPI replicas that a session ended before its token expired, so they
+drop the token from their verification caches (Workers/AuthInvalidationConsumer
+in ChatAPI). Wired to sessionStore.on_removed in index.py: every logout,
+rejected token and evicted session is published on auth_invalidation with the
+session key, which is the token hash ChatAPI caches under.
+
+Publish never waits on Kafka. Keys are sent by a background task; when Kafka
+is unreachable they are logged and dropped, and ChatAPI falls back to its
+AUTH_CACHE_MAX_TTL bound.
+"""
+import asyncio
+import json
+import os
+import traceback
+from typing import Optional
+from dotenv import load_dotenv
+from Helper.Common import AddLogOrErrorInFile
+
+load_dotenv()
+
+AUTH_INVALIDATION_ENABLED = os.getenv("AUTH_INVALIDATION_ENABLED", "true").lower() == "true"
+AUTH_INVALIDATION_TOPIC = "auth_invalidation"
+AUTH_INVALIDATION_QUEUE_SIZE = int(os.getenv("AUTH_INVALIDATION_QUEUE_SIZE", "10000"))
+KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092")
+
+
+class AuthInvalidationPublisher:
+    def __init__(self, producer=None, queue_size: int = AUTH_INVALIDATION_QUEUE_SIZE):
+        # producer: an already configured stand-in (benchmarks); created from the environment otherwise
+        self._producer = producer
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._sender_task: Optional[asyncio.Task] = None
+
+    async def Start(self):
+        if not AUTH_INVALIDATION_ENABLED or self._sender_task is not None:
+            return
+        if self._producer is None:
+            from aiokafka import AIOKafkaProducer
+            self._producer = AIOKafkaProducer(
+                bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
+                value_serializer=lambda value: json.dumps(value).encode("utf-8")
+            )
+        try:
+            await self._producer.start()
+        except Exception as ex:
+            # Logins keep working; only the early cache eviction in ChatAPI is lost
+            await AddLogOrErrorInFile(f"Auth invalidations disabled, Kafka unavailable: {str(ex)}\n{traceback.format_exc()}", "ERROR")
+            self._producer = None
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._sender_task = asyncio.create_task(self._RunSender())
+
+    async def Stop(self):
+        if self._sender_task is not None:
+            await self._queue.put(None)
+            await self._sender_task
+            self._sender_task = None
+        if self._producer is not None:
+            await self._producer.stop()
+            self._producer = None
+
+    def Publish(self, session_key: str):
+        if self._sender_task is None:
+            return
+        try:
+            self._queue.put_nowait(session_key)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _RunSender(self):
+        while True:
+            session_key = await self._queue.get()
+            if session_key is None:
+                break
+            try:
+                await self._producer.send_and_wait(AUTH_INVALIDATION_TOPIC, {"token_hash": session_key})
+            except Exception as ex:
+                await AddLogOrErrorInFile(f"Auth invalidation not sent: {str(ex)}\n{traceback.format_exc()}", "ERROR")
+
+
+authInvalidations = AuthInvalidationPublisher()
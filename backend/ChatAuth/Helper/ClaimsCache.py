@@ -0,0 +1,66 @@
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CLAIMS_CACHE_MAX_ENTRIES = int(os.getenv("CLAIMS_CACHE_MAX_ENTRIES", "100000"))
+
+
+class TokenClaims(NamedTuple):
+    user_id: str
+    session_id: str
+    expiry_date: Optional[datetime]
+
+
+class ClaimsCache:
+    """
+    LRU cache of decoded and decrypted token claims keyed by token hash, kept
+    until the token's ExpiryDate. Only the signature check and decryption are
+    skipped on a hit; VerifyJwtToken still reads the session store every time,
+    so Logout takes effect immediately.
+    """
+
+    def __init__(self, max_entries: int = CLAIMS_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        # token hash -> (expires at monotonic, claims)
+        self._entries: "OrderedDict[str, tuple[float, TokenClaims]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def Get(self, token_hash: str) -> Optional[TokenClaims]:
+        entry = self._entries.get(token_hash)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[token_hash]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token_hash)
+        self.hits += 1
+        return entry[1]
+
+    def Put(self, token_hash: str, claims: TokenClaims):
+        if claims.expiry_date is None:
+            return
+        ttl = (claims.expiry_date - datetime.now()).total_seconds()
+        if ttl <= 0:
+            return
+        self._entries[token_hash] = (time.monotonic() + ttl, claims)
+        self._entries.move_to_end(token_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def Invalidate(self, token_hash: str):
+        self._entries.pop(token_hash, None)
+
+    def Clear(self):
+        self._entries.clear()
+
+
+claimsCache = ClaimsCache()
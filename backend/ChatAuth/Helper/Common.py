@@ -1,7 +1,8 @@
+import asyncio
 import base64
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import hashlib
-from math import dist
 import os
 import random
 import string
@@ -10,22 +11,29 @@ import uuid
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 import jwt
+from ChatShared.LogPipeline import LogPipeline
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad, unpad
 from Crypto.Random import get_random_bytes
 from dotenv import load_dotenv
+from Helper.ClaimsCache import TokenClaims, claimsCache
+from Helper.SessionStore import sessionStore
 
 load_dotenv() 
 
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
 ENCRYPTION_FIXED_KEY = os.getenv("ENCRYPTION_FIXED_KEY")
 ALGORITHM = "HS256"
-
-user_sessions = {}
+# Threads for token signing/decryption on a claims cache miss; 0 runs it on the event loop
+CRYPTO_WORKERS = int(os.getenv("CRYPTO_WORKERS", "2"))
 
 # Security
 security = HTTPBearer()
 
+logPipeline = LogPipeline("ChatAuth")
+
+cryptoPool = ThreadPoolExecutor(max_workers=CRYPTO_WORKERS, thread_name_prefix="chatauth-crypto") if CRYPTO_WORKERS > 0 else None
+
 def GetSha1Hash(raw_data: str) -> str:
     try:
         sha1_hash = hashlib.sha1()
@@ -36,90 +44,103 @@ def GetSha1Hash(raw_data: str) -> str:
         raise Exception(error_msg)
 
 
-async def _GenerateRandomString(length: int = 32) -> str:
-    try:
-        return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
-    except Exception as ex:
-        error_msg = f"{str(ex)}\n{traceback.format_exc()}"
-        raise Exception(error_msg)
+def _GenerateRandomString(length: int = 32) -> str:
+    return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
 
-async def _AES_Encrypt(plain_text: str, key: bytes) -> str:
-    try:
-        if len(key) not in (16, 24, 32):
-            raise ValueError(f"Invalid AES key length: {len(key)} bytes")
-
-        iv = get_random_bytes(16)
-        cipher = AES.new(key, AES.MODE_CBC, iv)
-        padded_data = pad(plain_text.encode('utf-16le'), AES.block_size)
-        encrypted = cipher.encrypt(padded_data)
-        return base64.b64encode(iv + encrypted).decode()
-    except Exception as ex:
-        error_msg = f"{str(ex)}\n{traceback.format_exc()}"
-        raise Exception(error_msg)
+def _AES_Encrypt(plain_text: str, key: bytes) -> str:
+    if len(key) not in (16, 24, 32):
+        raise ValueError(f"Invalid AES key length: {len(key)} bytes")
 
-async def _AES_Decrypt(encrypted_text: str, key: bytes) -> str:
-    try:
-        if len(key) not in (16, 24, 32):
-            raise ValueError(f"Invalid AES key length: {len(key)} bytes")
-
-        decoded = base64.b64decode(encrypted_text)
-        iv = decoded[:16]
-        cipher_text = decoded[16:]
-        cipher = AES.new(key, AES.MODE_CBC, iv)
-        decrypted = unpad(cipher.decrypt(cipher_text), AES.block_size)
-        return decrypted.decode('utf-16le')
-    except Exception as ex:
-        error_msg = f"{str(ex)}\n{traceback.format_exc()}"
-        raise Exception(error_msg)
+    iv = get_random_bytes(16)
+    cipher = AES.new(key, AES.MODE_CBC, iv)
+    padded_data = pad(plain_text.encode('utf-16le'), AES.block_size)
+    encrypted = cipher.encrypt(padded_data)
+    return base64.b64encode(iv + encrypted).decode()
+
+def _AES_Decrypt(encrypted_text: str, key: bytes) -> str:
+    if len(key) not in (16, 24, 32):
+        raise ValueError(f"Invalid AES key length: {len(key)} bytes")
+
+    decoded = base64.b64decode(encrypted_text)
+    iv = decoded[:16]
+    cipher_text = decoded[16:]
+    cipher = AES.new(key, AES.MODE_CBC, iv)
+    decrypted = unpad(cipher.decrypt(cipher_text), AES.block_size)
+    return decrypted.decode('utf-16le')
 
-async def _DeriveAESKey(key_str: str, length=32) -> bytes:
+def _DeriveAESKey(key_str: str, length=32) -> bytes:
     return hashlib.sha256(key_str.encode('utf-8')).digest()[:length]
 
-async def GetEncryptedText(plain_text: str) -> str:
-    try:
-        random_key_str = await _GenerateRandomString()  # e.g. 32 chars
-        random_key = await _DeriveAESKey(random_key_str, 32)
-        fixed_key = await _DeriveAESKey(ENCRYPTION_FIXED_KEY, 32)
+# Derived once; every token encrypts its random key with it
+_FIXED_KEY = _DeriveAESKey(ENCRYPTION_FIXED_KEY, 32) if ENCRYPTION_FIXED_KEY else None
+
+def _FixedKey() -> bytes:
+    if _FIXED_KEY is None:
+        raise ValueError("ENCRYPTION_FIXED_KEY is not set")
+    return _FIXED_KEY
+
+def _EncryptText(plain_text: str) -> str:
+    random_key_str = _GenerateRandomString()  # e.g. 32 chars
+    random_key = _DeriveAESKey(random_key_str, 32)
+
+    e_text = _AES_Encrypt(plain_text, random_key)
+    e_key = _AES_Encrypt(random_key_str, _FixedKey())
+
+    return base64.b64encode((e_key + '::' + e_text).encode('utf-8')).decode('utf-8')
+
+def _DecryptText(encrypted_text: str) -> str:
+    if not encrypted_text:
+        return ''
+    decoded = base64.b64decode(encrypted_text).decode('utf-8')
+    e_key, e_text = decoded.split('::', 1)
+
+    plain_random_key = _AES_Decrypt(e_key, _FixedKey())
+    random_key = _DeriveAESKey(plain_random_key, 32)
 
-        e_text = await _AES_Encrypt(plain_text, random_key)
-        e_key = await _AES_Encrypt(random_key_str, fixed_key)
+    return _AES_Decrypt(e_text, random_key)
 
-        return base64.b64encode((e_key + '::' + e_text).encode('utf-8')).decode('utf-8')
+def _IssueToken(email: str, start_date: datetime, expiry_date: datetime) -> str:
+    payload = {
+        "UserId": _EncryptText(email),
+        "SessionID": _EncryptText(f"{str(uuid.uuid4())}#{start_date.strftime('%Y-%m-%d %H:%M:%S')}"),
+        "StartDate": start_date.isoformat(),
+        "ExpiryDate": expiry_date.isoformat()
+    }
+    return jwt.encode(payload, GOOGLE_CLIENT_SECRET, algorithm=ALGORITHM)
+
+def _DecodeClaims(token: str) -> TokenClaims:
+    payload = jwt.decode(token, GOOGLE_CLIENT_SECRET, algorithms=ALGORITHM)
+    expiry_date_str = payload.get("ExpiryDate")
+    return TokenClaims(
+        user_id=_DecryptText(payload.get("UserId")),
+        session_id=_DecryptText(payload.get("SessionID")),
+        expiry_date=datetime.fromisoformat(expiry_date_str) if expiry_date_str else None
+    )
+
+async def _RunCrypto(func, *args):
+    if cryptoPool is None:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(cryptoPool, func, *args)
+
+async def GetEncryptedText(plain_text: str) -> str:
+    try:
+        return await _RunCrypto(_EncryptText, plain_text)
     except Exception as ex:
         error_msg = f"{str(ex)}\n{traceback.format_exc()}"
         raise Exception(error_msg)
 
 async def GetDecryptedText(encrypted_text: str) -> str | None:
     try:
-        if encrypted_text:
-            decoded = base64.b64decode(encrypted_text).decode('utf-8')
-            e_key, e_text = decoded.split('::', 1)
-
-            fixed_key = await _DeriveAESKey(ENCRYPTION_FIXED_KEY, 32)
-            plain_random_key = await _AES_Decrypt(e_key, fixed_key)
-            random_key = await _DeriveAESKey(plain_random_key, 32)
-
-            return await _AES_Decrypt(e_text, random_key)
-        return ''
+        return await _RunCrypto(_DecryptText, encrypted_text)
     except Exception as ex:
         error_msg = f"{str(ex)}\n{traceback.format_exc()}"
         raise Exception(error_msg)
     
-async def CreateJwtToken(user_data: dist) -> str:
+async def CreateJwtToken(user_data: dict) -> str:
     start_date = datetime.now()
     expiry_date = start_date + timedelta(minutes=60)
-    payload = {
-        "UserId": await GetEncryptedText(user_data.get("email")),
-        "SessionID": await GetEncryptedText(f"{str(uuid.uuid4())}#{start_date.strftime('%Y-%m-%d %H:%M:%S')}"),
-        "StartDate": start_date.isoformat(),
-        "ExpiryDate": expiry_date.isoformat()
-    }
-    token = jwt.encode(
-        payload,
-        GOOGLE_CLIENT_SECRET,
-        algorithm=ALGORITHM
-    )
-    user_sessions[GetSha1Hash(token)] = user_data
+    token = await _RunCrypto(_IssueToken, user_data.get("email"), start_date, expiry_date)
+    await sessionStore.Set(GetSha1Hash(token), user_data, (expiry_date - start_date).total_seconds())
 
     return token
 
@@ -128,59 +149,40 @@ async def VerifyJwtToken(credentials: HTTPAuthorizationCredentials = Depends(sec
     try:
         now_date = datetime.now()
         token = credentials.credentials
-        
-        payload = jwt.decode(token, GOOGLE_CLIENT_SECRET, algorithms=ALGORITHM)
-        
-        user_id = await GetDecryptedText(payload.get("UserId"))
-        expiry_date_str = payload.get("ExpiryDate")
-        if expiry_date_str:
-            try:
-                expiry_date = datetime.strptime(expiry_date_str, '%Y-%m-%dT%H:%M:%S.%f')
-            except ValueError:
-                expiry_date = datetime.strptime(expiry_date_str, '%Y-%m-%dT%H:%M:%S')
-            
-        session_id = await GetDecryptedText(payload.get("SessionID"))
-        
-        if GetSha1Hash(token) not in user_sessions:
+        token_hash = GetSha1Hash(token)
+
+        claims = claimsCache.Get(token_hash)
+        if claims is None:
+            claims = await _RunCrypto(_DecodeClaims, token)
+            claimsCache.Put(token_hash, claims)
+
+        session = await sessionStore.Get(token_hash)
+        if session is None:
             raise HTTPException(status_code=401, detail="Invalid or expired session")
         
-        if not user_id or not session_id:
-            del user_sessions[GetSha1Hash(token)]
+        if not claims.user_id or not claims.session_id:
+            await sessionStore.Delete(token_hash)
             raise HTTPException(status_code=401, detail="Valid token required")
 
-        if now_date > expiry_date:
-            del user_sessions[GetSha1Hash(token)]
+        if claims.expiry_date is None or now_date > claims.expiry_date:
+            claimsCache.Invalidate(token_hash)
+            await sessionStore.Delete(token_hash)
             raise HTTPException(status_code=401, detail="Token expired")
         
-        return user_sessions[GetSha1Hash(token)]
+        return session
     except Exception as ex:
         error_msg = f"{str(ex)}\n{traceback.format_exc()}"
         raise HTTPException(status_code=401, detail=f"Valid token required. {error_msg}")
     
 async def Logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
-    if GetSha1Hash(token) in user_sessions:
-        del user_sessions[GetSha1Hash(token)]
+    token_hash = GetSha1Hash(credentials.credentials)
+    claimsCache.Invalidate(token_hash)
+    await sessionStore.Delete(token_hash)
     return True
 
+def StopCryptoPool():
+    if cryptoPool is not None:
+        cryptoPool.shutdown(wait=False, cancel_futures=True)
+
 async def  AddLogOrErrorInFile(message: str, type: str):
-    try:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_message = (
-            f"{timestamp} <======> {type} <======> {message}\n\n"
-            f"{'*' * 100}\n\n"
-        )
-
-        # Build path
-        log_dir = "/app/logs"
-        os.makedirs(log_dir, exist_ok=True)
-
-        # Log file name based on date
-        log_filename = f"ChatAuth - {datetime.now().strftime('%d-%m-%Y')}.txt"
-        log_path = os.path.join(log_dir, log_filename)
-
-        # Append log message
-        with open(log_path, "a", encoding="utf-8") as f:
-            f.write(log_message)
-    except Exception as ex:
-        print(f"Logging failed: {ex}")
\ No newline at end of file
+    logPipeline.Log(type, message)
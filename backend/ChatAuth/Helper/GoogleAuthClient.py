@@ -0,0 +1,155 @@
+import asyncio
+import os
+import re
+import time
+import traceback
+from typing import Dict, Optional
+import httpx
+import jwt
+from dotenv import load_dotenv
+from Helper.Common import AddLogOrErrorInFile
+
+load_dotenv()
+
+GOOGLE_TOKEN_URL = os.getenv("GOOGLE_TOKEN_URL", "https://oauth2.googleapis.com/token")
+GOOGLE_CERTS_URL = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v3/certs")
+GOOGLE_HTTP_MAX_CONNECTIONS = int(os.getenv("GOOGLE_HTTP_MAX_CONNECTIONS", "50"))
+GOOGLE_HTTP_TIMEOUT = float(os.getenv("GOOGLE_HTTP_TIMEOUT", "5"))
+GOOGLE_CERTS_DEFAULT_MAX_AGE = float(os.getenv("GOOGLE_CERTS_DEFAULT_MAX_AGE", "3600"))
+# Floor for background refreshes and for refetching on an unknown key id
+GOOGLE_CERTS_MIN_REFRESH = float(os.getenv("GOOGLE_CERTS_MIN_REFRESH", "60"))
+GOOGLE_CLOCK_SKEW = int(os.getenv("GOOGLE_CLOCK_SKEW", "30"))
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+_client: Optional[httpx.AsyncClient] = None
+
+async def StartGoogleClient():
+    global _client
+    if _client is not None:
+        return
+    _client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=GOOGLE_HTTP_MAX_CONNECTIONS, max_keepalive_connections=GOOGLE_HTTP_MAX_CONNECTIONS),
+        timeout=GOOGLE_HTTP_TIMEOUT
+    )
+
+async def StopGoogleClient():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def _Client() -> httpx.AsyncClient:
+    if _client is None:
+        await StartGoogleClient()
+    return _client
+
+def _MaxAge(cache_control: str) -> Optional[float]:
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return float(match.group(1)) if match else None
+
+
+class GoogleSigningKeys:
+    """
+    Google's ID-token signing keys (JWKS) held in memory by key id.
+
+    A background task refetches them shortly before the Cache-Control max-age
+    runs out. A token signed with a key id not in the set triggers one refetch,
+    at most every min_refresh seconds, since Google publishes new keys ahead of
+    using them.
+    """
+
+    def __init__(self, certs_url: str = GOOGLE_CERTS_URL, default_max_age: float = GOOGLE_CERTS_DEFAULT_MAX_AGE,
+                 min_refresh: float = GOOGLE_CERTS_MIN_REFRESH):
+        self.certs_url = certs_url
+        self.default_max_age = default_max_age
+        self.min_refresh = min_refresh
+        self.keys: Dict[str, jwt.PyJWK] = {}
+        self.expires_at = 0.0
+        self.fetched_at: Optional[float] = None
+        self.fetches = 0
+        self._lock = asyncio.Lock()
+        self._refresher_task: Optional[asyncio.Task] = None
+
+    async def Start(self):
+        try:
+            await self.Refresh()
+        except Exception as ex:
+            # Login fetches the keys on demand if Google was unreachable at startup
+            await AddLogOrErrorInFile(f"{str(ex)}\n{traceback.format_exc()}", "ERROR")
+        if self._refresher_task is None:
+            self._refresher_task = asyncio.create_task(self._RunRefresher())
+
+    async def Stop(self):
+        if self._refresher_task is not None:
+            self._refresher_task.cancel()
+            await asyncio.gather(self._refresher_task, return_exceptions=True)
+            self._refresher_task = None
+
+    async def Refresh(self):
+        client = await _Client()
+        response = await client.get(self.certs_url)
+        response.raise_for_status()
+        key_set = jwt.PyJWKSet.from_dict(response.json())
+        max_age = _MaxAge(response.headers.get("cache-control"))
+        self.keys = {key.key_id: key for key in key_set.keys}
+        self.fetched_at = time.monotonic()
+        self.expires_at = self.fetched_at + (max_age if max_age is not None else self.default_max_age)
+        self.fetches += 1
+
+    async def GetKey(self, kid: str) -> jwt.PyJWK:
+        key = self.keys.get(kid)
+        if key is not None and time.monotonic() < self.expires_at:
+            return key
+        async with self._lock:
+            # Another login may have refreshed while this one waited
+            now = time.monotonic()
+            stale = now >= self.expires_at
+            may_refetch = self.fetched_at is None or now - self.fetched_at >= self.min_refresh
+            if stale or (kid not in self.keys and may_refetch):
+                await self.Refresh()
+        key = self.keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f"Unknown Google signing key {kid}")
+        return key
+
+    async def _RunRefresher(self):
+        while True:
+            remaining = self.expires_at - time.monotonic()
+            await asyncio.sleep(max(self.min_refresh, remaining - min(300, remaining * 0.1)))
+            try:
+                await self.Refresh()
+            except Exception as ex:
+                await AddLogOrErrorInFile(f"{str(ex)}\n{traceback.format_exc()}", "ERROR")
+
+
+googleSigningKeys = GoogleSigningKeys()
+
+
+async def ExchangeCodeForTokens(auth_code: str, client_id: str, client_secret: str, redirect_uri: str) -> dict:
+    client = await _Client()
+    response = await client.post(GOOGLE_TOKEN_URL, data={
+        "code": auth_code,
+        "client_id": client_id,
+        "client_secret": client_secret,
+        "redirect_uri": redirect_uri,
+        "grant_type": "authorization_code"
+    })
+    if response.status_code != 200:
+        raise ValueError("Failed to exchange code for tokens")
+    return response.json()
+
+async def VerifyGoogleIdToken(id_jwt_token: str, audience: str) -> dict:
+    """Checks signature, audience, issuer and expiry of a Google ID token against the cached keys."""
+    kid = jwt.get_unverified_header(id_jwt_token).get("kid")
+    key = await googleSigningKeys.GetKey(kid)
+    id_info = jwt.decode(
+        id_jwt_token,
+        key.key,
+        algorithms=["RS256"],
+        audience=audience,
+        leeway=GOOGLE_CLOCK_SKEW,
+        options={"require": ["exp", "iat", "iss", "aud", "sub"]}
+    )
+    if id_info["iss"] not in GOOGLE_ISSUERS:
+        raise jwt.InvalidIssuerError(f"Wrong issuer {id_info['iss']}")
+    return id_info
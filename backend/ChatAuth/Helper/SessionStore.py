@@ -0,0 +1,150 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "MEMORY")
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "100000"))
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+
+class SessionStore:
+    """
+    Where CreateJwtToken, VerifyJwtToken and Logout keep sessions, keyed by token hash.
+
+    on_removed, when set, is called with the key of every session deleted or
+    evicted before its expiry, so caches outside ChatAuth can drop the token.
+    Sessions that simply expire need no notice: those caches stop at the
+    token's ExpiryDate anyway.
+    """
+
+    on_removed: Optional[Callable[[str], None]] = None
+
+    async def Start(self):
+        pass
+
+    async def Stop(self):
+        pass
+
+    async def Get(self, key: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def Set(self, key: str, value: dict, ttl: float):
+        raise NotImplementedError
+
+    async def Delete(self, key: str):
+        raise NotImplementedError
+
+    def _Removed(self, key: str):
+        if self.on_removed is not None:
+            self.on_removed(key)
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Per-process store with TTL expiry, a background sweeper and a size cap.
+
+    Only safe with a single worker: sessions created in one process are not
+    visible to the others.
+    """
+
+    def __init__(self, max_entries: int = SESSION_MAX_ENTRIES, sweep_interval: float = SESSION_SWEEP_INTERVAL):
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        # key -> (expires at monotonic, session)
+        self._sessions: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+        self._sweeper_task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    async def Start(self):
+        if self._sweeper_task is None:
+            self._sweeper_task = asyncio.create_task(self._RunSweeper())
+
+    async def Stop(self):
+        if self._sweeper_task is not None:
+            self._sweeper_task.cancel()
+            await asyncio.gather(self._sweeper_task, return_exceptions=True)
+            self._sweeper_task = None
+
+    async def Get(self, key: str) -> Optional[dict]:
+        entry = self._sessions.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._sessions[key]
+            return None
+        return entry[1]
+
+    async def Set(self, key: str, value: dict, ttl: float):
+        self._sessions[key] = (time.monotonic() + ttl, value)
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.max_entries:
+            evicted, _ = self._sessions.popitem(last=False)
+            self._Removed(evicted)
+
+    async def Delete(self, key: str):
+        self._sessions.pop(key, None)
+        self._Removed(key)
+
+    def Sweep(self) -> int:
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self._sessions.items() if expires_at <= now]
+        for key in expired:
+            del self._sessions[key]
+        return len(expired)
+
+    async def _RunSweeper(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.Sweep()
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Store shared by all workers and replicas. Expiry is left to Redis.
+
+    Any client exposing async get/set(ex=)/delete can be passed in, which lets a
+    local stand-in replace Redis.
+    """
+
+    def __init__(self, client: Any = None, url: str = REDIS_URL, prefix: str = "chatauth:session:"):
+        self.url = url
+        self.prefix = prefix
+        self._client = client
+
+    async def Start(self):
+        if self._client is None:
+            import redis.asyncio as redis
+            self._client = redis.from_url(self.url, decode_responses=True)
+
+    async def Stop(self):
+        if self._client is not None and hasattr(self._client, "aclose"):
+            await self._client.aclose()
+
+    async def Get(self, key: str) -> Optional[dict]:
+        value = await self._client.get(self.prefix + key)
+        return json.loads(value) if value else None
+
+    async def Set(self, key: str, value: dict, ttl: float):
+        await self._client.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl)))
+
+    async def Delete(self, key: str):
+        await self._client.delete(self.prefix + key)
+        self._Removed(key)
+
+
+def CreateSessionStore() -> SessionStore:
+    if SESSION_BACKEND.upper() == "REDIS":
+        return RedisSessionStore()
+    return InMemorySessionStore()
+
+
+sessionStore = CreateSessionStore()
@@ -1,10 +1,8 @@
 import os
 import traceback
 from fastapi import APIRouter, Depends, HTTPException
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
-import httpx
 from Helper.Common import AddLogOrErrorInFile, CreateJwtToken, VerifyJwtToken, Logout
+from Helper.GoogleAuthClient import ExchangeCodeForTokens, VerifyGoogleIdToken
 from Schema.shared import AuthResponse, GoogleAuthRequest, UserInfo, VerifyResponse
 from dotenv import load_dotenv
 
@@ -19,19 +17,7 @@ REDIRECT_URI = os.getenv("REDIRECT_URI")
 
 async def _ExchangeCodeForTokens(auth_code: str):
     try:
-        token_url = "https://oauth2.googleapis.com/token"
-        payload = {
-            "code": auth_code,
-            "client_id": GOOGLE_CLIENT_ID,
-            "client_secret": GOOGLE_CLIENT_SECRET,
-            "redirect_uri": f'{REDIRECT_URI}/Login',
-            "grant_type": "authorization_code"
-        }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(token_url, data=payload)
-            if response.status_code != 200:
-                raise ValueError("Failed to exchange code for tokens")
-            return response.json()
+        return await ExchangeCodeForTokens(auth_code, GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, f'{REDIRECT_URI}/Login')
     
     except Exception as e:
         error_msg = f"{str(e)}\n{traceback.format_exc()}"
@@ -45,12 +31,7 @@ async def Login(request: GoogleAuthRequest):
         id_jwt_token = tokens["id_token"]
 
         # Verify ID token
-        id_info = id_token.verify_oauth2_token(
-            id_jwt_token,
-            google_requests.Request(),
-            GOOGLE_CLIENT_ID,
-            clock_skew_in_seconds=30
-        )
+        id_info = await VerifyGoogleIdToken(id_jwt_token, GOOGLE_CLIENT_ID)
         
         # Create user data
         user_data = {
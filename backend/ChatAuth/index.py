@@ -1,8 +1,34 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from Routes.GoogleAuthRoutes import GoogleAuthRoutes
+from Helper.AuthInvalidations import authInvalidations
+from Helper.Common import logPipeline, StopCryptoPool
+from Helper.GoogleAuthClient import StartGoogleClient, StopGoogleClient, googleSigningKeys
+from Helper.SessionStore import sessionStore
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup
+    await logPipeline.Start()
+    await sessionStore.Start()
+    await authInvalidations.Start()
+    # Logouts and evictions made here reach the ChatAPI verification caches
+    sessionStore.on_removed = authInvalidations.Publish
+    await StartGoogleClient()
+    await googleSigningKeys.Start()
+    yield
+
+    # Shutdown
+    await googleSigningKeys.Stop()
+    await StopGoogleClient()
+    sessionStore.on_removed = None
+    await authInvalidations.Stop()
+    await sessionStore.Stop()
+    StopCryptoPool()
+    await logPipeline.Stop()
+
+app = FastAPI(lifespan=lifespan)
 
 # Include all routers
 app.include_router(GoogleAuthRoutes)
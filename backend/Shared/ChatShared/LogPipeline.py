@@ -0,0 +1,213 @@
+"""
+Queue-backed log writer shared by ChatAPI and ChatAuth.
+
+Callers enqueue records without blocking the event loop. A single background
+task drains the queue in batches. File lines are written from a worker thread
+to daily files capped at LOG_FILE_MAX_MB. DB records go to the service's
+db_writer as one batch. The queue is bounded: records beyond LOG_QUEUE_SIZE are
+dropped and counted, and the count is written to the file on the next flush.
+
+Lives in backend/Shared, which both images install (see their Dockerfiles).
+"""
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Awaitable, Callable, List, NamedTuple, Optional
+
+LOG_DIR = os.getenv("LOG_DIR", "/app/logs")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "TEXT").upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "200"))
+LOG_FLUSH_INTERVAL_MS = int(os.getenv("LOG_FLUSH_INTERVAL_MS", "500"))
+LOG_FILE_MAX_MB = float(os.getenv("LOG_FILE_MAX_MB", "50"))
+
+
+class LogRecord(NamedTuple):
+    created_at: datetime
+    type: str
+    message: str
+    module_name: str = ""
+    created_by: str = ""
+    to_db: bool = False
+
+
+class LogPipeline:
+    def __init__(
+        self,
+        service_name: str,
+        db_writer: Optional[Callable[[List[LogRecord]], Awaitable[None]]] = None,
+        log_dir: str = LOG_DIR,
+        queue_size: int = LOG_QUEUE_SIZE,
+        batch_size: int = LOG_BATCH_SIZE,
+        flush_interval: float = LOG_FLUSH_INTERVAL_MS / 1000,
+        file_max_bytes: int = int(LOG_FILE_MAX_MB * 1024 * 1024),
+        log_format: str = LOG_FORMAT
+    ):
+        self.service_name = service_name
+        self.db_writer = db_writer
+        self.log_dir = log_dir
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.file_max_bytes = file_max_bytes
+        self.log_format = log_format
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.db_failures = 0
+        self._reported_dropped = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._file = None
+        self._file_day = None
+        self._file_part = 0
+
+    def Log(self, type: str, message: str, module_name: str = "", created_by: str = "", to_db: bool = False) -> bool:
+        """Enqueues a record; returns False when it was dropped because the queue is full."""
+        record = LogRecord(datetime.now(), type, message, module_name or "", created_by or "", to_db)
+        if self._task is None:
+            # Not started (scripts, migrations): write straight through
+            self._WriteFile([record])
+            return True
+        try:
+            self._queue.put_nowait(record)
+            self.enqueued += 1
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    def QueueDepth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def Stats(self) -> dict:
+        return {
+            "queue_depth": self.QueueDepth(),
+            "queue_size": self.queue_size,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "db_failures": self.db_failures
+        }
+
+    async def Start(self):
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._Run())
+
+    async def Stop(self):
+        """Stops the writer once everything queued so far has been flushed."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        await asyncio.to_thread(self._CloseFile)
+
+    async def _Run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            record = await self._queue.get()
+            if record is None:
+                break
+            batch = [record]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+            await self._Flush(batch)
+
+        # Stop() was called: flush what is left behind the sentinel
+        batch = []
+        while not self._queue.empty():
+            record = self._queue.get_nowait()
+            if record is not None:
+                batch.append(record)
+        await self._Flush(batch)
+
+    async def _Flush(self, batch: List[LogRecord]):
+        if self.dropped > self._reported_dropped:
+            batch.append(LogRecord(
+                datetime.now(), "WARNING",
+                f"Log queue full: dropped {self.dropped - self._reported_dropped} records",
+                "LogPipeline/_Flush"
+            ))
+            self._reported_dropped = self.dropped
+        if not batch:
+            return
+
+        file_records = [record for record in batch if not record.to_db or self.db_writer is None]
+        db_records = [record for record in batch if record.to_db and self.db_writer is not None]
+        if db_records:
+            try:
+                await self.db_writer(db_records)
+                self.written += len(db_records)
+            except Exception as ex:
+                self.db_failures += 1
+                file_records.extend(
+                    record._replace(message=f"DB Exception Error: {str(ex)}\nOriginal Message: {record.message}")
+                    for record in db_records
+                )
+        if file_records:
+            await asyncio.to_thread(self._WriteFile, file_records)
+
+    def _FormatRecord(self, record: LogRecord) -> str:
+        if self.log_format == "JSON":
+            return json.dumps({
+                "ts": record.created_at.isoformat(),
+                "service": self.service_name,
+                "type": record.type,
+                "module": record.module_name,
+                "user": record.created_by,
+                "msg": record.message
+            }) + "\n"
+        timestamp = record.created_at.strftime("%Y-%m-%d %H:%M:%S")
+        return (
+            f"{timestamp} <======> {record.type} <======> {record.message}\n\n"
+            f"{'*' * 100}\n\n"
+        )
+
+    def _OpenFile(self):
+        # One file per day; past the size cap the next part is opened
+        day = datetime.now().strftime('%d-%m-%Y')
+        if self._file is not None and self._file_day == day and self._file.tell() < self.file_max_bytes:
+            return self._file
+        if self._file_day != day:
+            self._file_part = 0
+        self._CloseFile()
+        os.makedirs(self.log_dir, exist_ok=True)
+        while True:
+            suffix = f".{self._file_part}" if self._file_part else ""
+            log_path = os.path.join(self.log_dir, f"{self.service_name} - {day}{suffix}.txt")
+            if not os.path.exists(log_path) or os.path.getsize(log_path) < self.file_max_bytes:
+                break
+            self._file_part += 1
+        self._file = open(log_path, "a", encoding="utf-8")
+        self._file_day = day
+        return self._file
+
+    def _WriteFile(self, records: List[LogRecord]):
+        try:
+            f = self._OpenFile()
+            f.write("".join(self._FormatRecord(record) for record in records))
+            f.flush()
+            self.written += len(records)
+        except Exception as ex:
+            print(f"Logging failed: {ex}")
+
+    def _CloseFile(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -25,4 +25,30 @@ END $$
 
 DELIMITER ;
 
+DELIMITER $$
+
+CREATE PROCEDURE CHATBOT_GetTableSlBlock (
+    IN input_table_nm VARCHAR(500),
+    IN input_block_size INT
+)
+BEGIN
+    DECLARE current_sl INT;
+
+    SELECT TABLE_SL INTO current_sl
+    FROM SYSTEM_TABLE_SL
+    WHERE TABLE_NM = input_table_nm
+    FOR UPDATE;
 
+    IF current_sl IS NULL THEN
+        SET current_sl = 1;
+        INSERT INTO SYSTEM_TABLE_SL (TABLE_NM, TABLE_SL) VALUES (input_table_nm, current_sl + input_block_size);
+    ELSE
+        UPDATE SYSTEM_TABLE_SL SET TABLE_SL = current_sl + input_block_size WHERE TABLE_NM = input_table_nm;
+    END IF;
+
+    SELECT current_sl AS output_start_sl, current_sl + input_block_size - 1 AS output_end_sl;
+
+    COMMIT;
+END $$
+
+DELIMITER ;
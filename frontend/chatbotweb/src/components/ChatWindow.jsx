@@ -36,6 +36,38 @@ const ChatWindow = () => {
     return responses[Math.floor(Math.random() * responses.length)];
   };
 
+  // Streamed chunks grow one bubble per request; the final bot message replaces it
+  const handleSocketMessage = useCallback((event) => {
+    const data = JSON.parse(event.data);
+    if (data.type === 'chunk') {
+      const streamId = `stream-${data.request_id}`;
+      setMessages(prev => {
+        const index = prev.findIndex(message => message.ID === streamId);
+        if (index === -1) {
+          return [...prev, { ID: streamId, MESSAGE: data.delta, IS_BOT: true, CREATED_AT: new Date().toISOString() }];
+        }
+        const updated = [...prev];
+        updated[index] = { ...updated[index], MESSAGE: updated[index].MESSAGE + data.delta };
+        return updated;
+      });
+      setShouldScrollToBottom(true);
+      return;
+    }
+    if (data.IS_BOT || data.is_bot) {
+      const botMessage = {
+        ID: data.id || `bot-${Date.now()}`,
+        MESSAGE: data.response || data.message,
+        IS_BOT: true,
+        CREATED_AT: new Date().toISOString()
+      };
+      const streamId = `stream-${data.response_to}`;
+      setMessages(prev => prev.some(message => message.ID === streamId)
+        ? prev.map(message => message.ID === streamId ? botMessage : message)
+        : [...prev, botMessage]);
+      setShouldScrollToBottom(true);
+    }
+  }, []);
+
   // Initialize WebSocket only for non-demo users
   const initializeChat = useCallback(async () => {
     if (isDemoUser) {
@@ -56,19 +88,7 @@ const ChatWindow = () => {
         setConnectionStatus('connected');
       };
 
-      newSocket.onmessage = (event) => {
-        const data = JSON.parse(event.data);
-        if (data.IS_BOT === 'True' || data.is_bot === 'True') {
-          const botMessage = {
-            ID: `bot-${Date.now()}`,
-            MESSAGE: data.response || data.message,
-            IS_BOT: true,
-            CREATED_AT: new Date().toISOString()
-          };
-          setMessages(prev => [...prev, botMessage]);
-          setShouldScrollToBottom(true);
-        }
-      };
+      newSocket.onmessage = handleSocketMessage;
       
       newSocket.onclose = () => {
         setConnectionStatus('disconnected');
@@ -82,7 +102,7 @@ const ChatWindow = () => {
       
       setSocket(newSocket);
     }
-  }, [setConnectionStatus, socket, socketId, userInfo?.email, isDemoUser]);
+  }, [setConnectionStatus, socket, socketId, userInfo?.email, isDemoUser, handleSocketMessage]);
 
   useEffect(() => {
     initializeChat();
@@ -229,20 +249,7 @@ const ChatWindow = () => {
           }
           
           if (socket) {
-            socket.onmessage = (event) => {
-              const data = JSON.parse(event.data);
-              console.log('WebSocket message:', data);
-              if (data.IS_BOT || data.is_bot) {
-                const botMessage = {
-                  ID: `bot-${Date.now()}`,
-                  MESSAGE: data.response || data.message,
-                  IS_BOT: true,
-                  CREATED_AT: new Date().toISOString()
-                };
-                setMessages(prev => [...prev, botMessage]);
-                setShouldScrollToBottom(true);
-              }
-            };
+            socket.onmessage = handleSocketMessage;
           }
         }
       } catch (error) {